@@ -0,0 +1,34 @@
+"""Add composite index for keyset pagination of projects
+
+Revision ID: projects_listing_index
+Revises: migrate_legacy_technologies
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'projects_listing_index'
+down_revision: Union[str, Sequence[str], None] = 'migrate_legacy_technologies'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Index matching the listing order (order_index DESC, created_at DESC, id DESC).
+
+    A B-tree can be scanned backwards, so an ascending index serves the
+    all-descending ORDER BY and the (order_index, created_at, id) < cursor
+    row comparison used for keyset pagination.
+    """
+    op.create_index('ix_projects_listing', 'projects', ['order_index', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_projects_listing', table_name='projects')
@@ -0,0 +1,53 @@
+"""Add full-text search vector and trigram index to projects
+
+Revision ID: projects_search_vector
+Revises: projects_listing_index
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'projects_search_vector'
+down_revision: Union[str, Sequence[str], None] = 'projects_listing_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Generated, weighted tsvector over the searchable project fields.
+
+    Weights: A = title and technology names, B = tags and short description,
+    C = description. The 'simple' configuration is used because content
+    mixes Spanish, English and technology names (no stemming, no stopwords).
+    Technology icons/flags are left out: only the "name" of each object is
+    indexed.
+    """
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("""
+        ALTER TABLE projects ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(jsonb_to_tsvector('simple', jsonb_path_query_array(coalesce(technologies::jsonb, '[]'::jsonb), '$[*].name'), '["string"]'), 'A') ||
+            setweight(jsonb_to_tsvector('simple', coalesce(tags::jsonb, '[]'::jsonb), '["string"]'), 'B') ||
+            setweight(to_tsvector('simple', coalesce(short_description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.create_index('ix_projects_search_vector', 'projects', ['search_vector'], unique=False, postgresql_using='gin')
+    # Fuzzy fallback (typos) on the title
+    op.create_index(
+        'ix_projects_title_trgm', 'projects', ['title'], unique=False,
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_projects_title_trgm', table_name='projects')
+    op.drop_index('ix_projects_search_vector', table_name='projects')
+    op.drop_column('projects', 'search_vector')
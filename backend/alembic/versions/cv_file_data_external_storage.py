@@ -0,0 +1,37 @@
+"""Store CV file_data uncompressed out of line for chunked reads
+
+Revision ID: cv_external_storage
+Revises: d6a918be551d
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cv_external_storage'
+down_revision: Union[str, Sequence[str], None] = 'd6a918be551d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Use EXTERNAL storage for cv.file_data.
+
+    With EXTERNAL (out of line, uncompressed) TOAST storage, substring() only
+    fetches the TOAST chunks covering the requested byte range, so the download
+    endpoint can stream the PDF in chunks without detoasting the whole value.
+    PDFs are already compressed, so nothing is lost by skipping pglz.
+    """
+    op.execute("ALTER TABLE cv ALTER COLUMN file_data SET STORAGE EXTERNAL")
+    # SET STORAGE only affects new values: rewrite the existing row(s)
+    op.execute("UPDATE cv SET file_data = file_data || ''::bytea")
+
+
+def downgrade() -> None:
+    """Restore default EXTENDED storage for cv.file_data."""
+    op.execute("ALTER TABLE cv ALTER COLUMN file_data SET STORAGE EXTENDED")
@@ -0,0 +1,50 @@
+"""Convert legacy string technologies to objects in one pass
+
+Revision ID: migrate_legacy_technologies
+Revises: refresh_tokens
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'migrate_legacy_technologies'
+down_revision: Union[str, Sequence[str], None] = 'refresh_tokens'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Data migration: projects.technologies ["Python", ...] -> [{"name": "Python", "icon": "", "enabled": true}, ...]
+
+    Replaces the per-row conversion that used to run (and commit) on every
+    read of a legacy project. Elements that are already objects are kept
+    as they are and the array order is preserved.
+    """
+    op.execute("""
+        UPDATE projects
+        SET technologies = (
+            SELECT json_agg(
+                CASE WHEN json_typeof(tech) = 'string'
+                    THEN json_build_object('name', tech #>> '{}', 'icon', '', 'enabled', true)
+                    ELSE tech
+                END
+                ORDER BY position
+            )
+            FROM json_array_elements(technologies) WITH ORDINALITY AS t(tech, position)
+        )
+        WHERE CASE WHEN json_typeof(technologies) = 'array' THEN EXISTS (
+            SELECT 1 FROM json_array_elements(technologies) AS tech
+            WHERE json_typeof(tech) = 'string'
+        ) ELSE false END
+    """)
+
+
+def downgrade() -> None:
+    """The object format is a superset of the legacy one: nothing to undo."""
+    pass
@@ -1,29 +1,42 @@
 """
 Endpoints de autenticación
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.deps import get_current_active_user, get_current_admin_user
-from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
+from app.core.rate_limit import get_client_ip, login_rate_limit, login_throttle
+from app.schemas.user import UserCreate, UserLogin, UserResponse, Token, RefreshTokenRequest
 from app.services.auth_service import AuthService
+from app.services.token_service import TokenService
 
 router = APIRouter()
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(login_rate_limit)])
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(), 
     db: Session = Depends(get_db)
 ):
     """Iniciar sesión"""
     auth_service = AuthService(db)
+    client_ip = get_client_ip(request)
+    
+    # Rechazo inmediato (sin bcrypt) si la cuenta o la IP acumulan fallos
+    await login_throttle.check(client_ip, form_data.username)
     
     login_data = UserLogin(email=form_data.username, password=form_data.password)
-    token = auth_service.login(login_data)
+    try:
+        token = await auth_service.login(login_data)
+    except HTTPException as e:
+        if e.status_code == status.HTTP_401_UNAUTHORIZED:
+            await login_throttle.record_failure(client_ip, form_data.username)
+        raise
     
+    await login_throttle.record_success(form_data.username)
     return token
 
 
@@ -35,7 +48,7 @@ async def register(
 ):
     """Registrar nuevo usuario (solo admin)"""
     auth_service = AuthService(db)
-    user = auth_service.create_user(user_data)
+    user = await auth_service.create_user(user_data)
     
     return UserResponse.model_validate(user)
 
@@ -54,7 +67,7 @@ async def create_super_admin_user(db: Session = Depends(get_db)):
     auth_service = AuthService(db)
     
     try:
-        super_admin = auth_service.create_super_admin()
+        super_admin = await auth_service.create_super_admin()
         return UserResponse.model_validate(super_admin)
     except HTTPException as e:
         if "ya está registrado" in str(e.detail):
@@ -67,21 +80,21 @@ async def create_super_admin_user(db: Session = Depends(get_db)):
 
 @router.post("/refresh", response_model=Token)
 async def refresh_token(
-    current_user = Depends(get_current_active_user)
+    body: RefreshTokenRequest,
+    db: Session = Depends(get_db)
 ):
-    """Refrescar token de acceso"""
-    from app.core.security import create_access_token
-    from datetime import timedelta
-    from app.core.config import settings
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": current_user.email}, 
-        expires_delta=access_token_expires
-    )
+    """Renovar el access token con un refresh token (que se rota)"""
+    token_service = TokenService(db)
+    return token_service.refresh(body.refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: RefreshTokenRequest,
+    db: Session = Depends(get_db)
+):
+    """Cerrar sesión: revoca el refresh token y los access tokens de la sesión"""
+    token_service = TokenService(db)
+    token_service.logout(body.refresh_token)
     
-    return Token(
-        access_token=access_token,
-        token_type="bearer",
-        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-    )
+    return None
@@ -1,70 +1,91 @@
 """
 Chatbot endpoints for NikoiDev assistant
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Awaitable, TypeVar
+from datetime import datetime
+import asyncio
+import json
+import logging
+import time
+import uuid
 
 from app.core.database import get_db
+from app.core.deps import get_current_admin_user
+from app.core.rate_limit import chatbot_rate_limit, get_client_ip, get_rate_limit_backend
 from app.schemas.chatbot import ChatRequest, ChatResponse
-from app.services.chatbot_service import chatbot_service
+from app.services.chatbot_cache import response_cache
+from app.services.chat_session_store import session_store
+from app.services.chatbot_service import ChatbotService, get_chatbot_service
+from app.services.portfolio_index import portfolio_index
 from app.core.config import settings
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
+T = TypeVar("T")
 
-# Simple in-memory rate limiter
-# For production, consider using Redis
-class RateLimiter:
-    def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
-    
-    def is_allowed(self, identifier: str) -> tuple[bool, Optional[str]]:
-        """Check if request is allowed based on rate limit"""
-        now = datetime.utcnow()
-        window_start = now - timedelta(seconds=settings.CHATBOT_RATE_WINDOW)
-        
-        # Clean old requests
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier]
-            if req_time > window_start
-        ]
-        
-        # Check limit
-        if len(self.requests[identifier]) >= settings.CHATBOT_RATE_LIMIT:
-            wait_time = int((self.requests[identifier][0] - window_start).total_seconds())
-            return False, f"Rate limit exceeded. Try again in {wait_time} seconds."
-        
-        # Add current request
-        self.requests[identifier].append(now)
-        return True, None
+# How often to check whether the client is still connected (seconds)
+DISCONNECT_POLL_INTERVAL = 0.5
 
+# Non-standard status used by nginx for "client closed request"
+CLIENT_CLOSED_REQUEST = 499
 
-rate_limiter = RateLimiter()
 
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready"""
 
-def get_client_ip(request: Request) -> str:
-    """Get client IP address"""
-    # Check for forwarded IP (behind proxy)
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects meanwhile
     
-    real_ip = request.headers.get("X-Real-IP")
-    if real_ip:
-        return real_ip
+    Raises:
+        ClientDisconnected: If the client disconnected (the work was cancelled)
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def check_chat_request(chat_request: ChatRequest, request: Request) -> str:
+    """
+    Apply message validation (rate limiting is the `chatbot_rate_limit` dependency)
     
-    # Fallback to direct connection IP
-    if request.client:
-        return request.client.host
+    Returns:
+        Client IP address
+    """
+    client_ip = get_client_ip(request)
     
-    return "unknown"
+    # Validate message
+    is_valid, validation_error = ChatbotService.validate_message(chat_request.message)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=validation_error
+        )
+    
+    return client_ip
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
-@router.post("/chat", response_model=ChatResponse)
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(chatbot_rate_limit)])
 async def chat(
     chat_request: ChatRequest,
     request: Request,
@@ -74,47 +95,76 @@ async def chat(
     Send a message to NikoiDev chatbot
     
     - **message**: The user's message (1-1000 characters)
-    - **conversation_history**: Optional previous messages for context
-    - **session_id**: Optional session identifier
+    - **conversation_history**: Optional; only used to seed a session the server does not know
+    - **session_id**: Optional session identifier (the server keeps the history per session)
     
     Returns the assistant's response with metadata.
     
     Rate limited to {CHATBOT_RATE_LIMIT} messages per {CHATBOT_RATE_WINDOW} seconds per IP.
     """
-    
-    # Rate limiting
-    client_ip = get_client_ip(request)
-    allowed, error_msg = rate_limiter.is_allowed(client_ip)
-    
-    if not allowed:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=error_msg
-        )
-    
-    # Validate message
-    is_valid, validation_error = chatbot_service.validate_message(chat_request.message)
-    if not is_valid:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=validation_error
-        )
+    client_ip = check_chat_request(chat_request, request)
     
     try:
-        # Process chat (sync call)
-        response = chatbot_service.chat(chat_request, db)
+        # Process chat (async, cancelled if the client disconnects)
+        response = await run_until_disconnected(request, get_chatbot_service().chat(chat_request, db))
         return response
         
+    except ClientDisconnected:
+        logger.info(f"Chat cancelled: client {client_ip} disconnected")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
-        print(f"Chat error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"Chat error: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error processing your message. Please try again later."
         )
 
 
+@router.post("/chat/stream", dependencies=[Depends(chatbot_rate_limit)])
+async def chat_stream(
+    chat_request: ChatRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Send a message to NikoiDev chatbot and stream the answer (Server-Sent Events)
+    
+    Same input and rate limit as `/chat`. Emits:
+    - `token` events: `{"content": "..."}` as the answer is generated
+    - a final `done` event: `{"session_id", "timestamp", "first_token_ms", "total_ms"}`
+    
+    The generation is cancelled if the client disconnects.
+    """
+    client_ip = check_chat_request(chat_request, request)
+    session_id = chat_request.session_id or str(uuid.uuid4())
+    
+    async def event_stream() -> AsyncIterator[str]:
+        started = time.perf_counter()
+        first_token_ms = None
+        
+        async for content in get_chatbot_service().stream_chat(chat_request, session_id, db):
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started) * 1000)
+            yield sse_event("token", {"content": content})
+        
+        yield sse_event("done", {
+            "session_id": session_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "first_token_ms": first_token_ms,
+            "total_ms": round((time.perf_counter() - started) * 1000)
+        })
+        logger.debug(f"Chat stream for {client_ip} finished")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # disable proxy buffering (nginx)
+        }
+    )
+
+
 @router.get("/info")
 async def get_chatbot_info():
     """
@@ -123,7 +173,8 @@ async def get_chatbot_info():
     return {
         "name": settings.CHATBOT_NAME,
         "version": "1.0.0",
-        "model": "gemini-2.0-flash-exp",
+        "model": "gemini-2.0-flash-exp" if settings.CHATBOT_LLM_PROVIDER == "gemini" else settings.CHATBOT_LLM_PROVIDER,
+        "streaming": True,
         "rate_limit": {
             "max_requests": settings.CHATBOT_RATE_LIMIT,
             "window_seconds": settings.CHATBOT_RATE_WINDOW
@@ -138,15 +189,57 @@ async def get_chatbot_info():
     }
 
 
+@router.get("/cache/stats")
+async def get_chatbot_cache_stats(
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Get response cache metrics (Admin only)
+    
+    Metrics are per worker process.
+    """
+    return response_cache.stats()
+
+
+@router.get("/rate-limit/stats")
+async def get_rate_limit_stats(
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Get rate limiter backend metrics (Admin only)
+    """
+    return get_rate_limit_backend().stats()
+
+
+@router.get("/sessions/stats")
+async def get_chatbot_session_stats(
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Get chat session store metrics (Admin only)
+    """
+    return session_store.stats()
+
+
+@router.get("/index/stats")
+async def get_chatbot_index_stats(
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Get size and age of the portfolio retrieval index (Admin only)
+    """
+    return portfolio_index.stats()
+
+
 @router.get("/health")
 async def chatbot_health():
     """Health check for chatbot service"""
     try:
-        # Simple check if API key is configured
-        if not settings.GOOGLE_API_KEY:
+        # Simple check if API key is configured (without building the LLM client)
+        if settings.CHATBOT_LLM_PROVIDER == "gemini" and not settings.GOOGLE_API_KEY:
             return {
-                "status": "unhealthy",
-                "message": "Google API key not configured"
+                "status": "degraded",
+                "message": "Google API key not configured: the chatbot replies with contact information only"
             }
         
         return {
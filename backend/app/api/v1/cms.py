@@ -1,11 +1,13 @@
 """
 Endpoints para el CMS (Content Management System)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.core.database import get_db
+from app.core.etag import get_if_none_match, etag_matches, not_modified_response
 from app.core.deps import get_current_active_user, require_permission
 from app.models.enums import Permission
 from app.models.user import User
@@ -17,6 +19,7 @@ from app.schemas.cms import (
     PagePublic,
     PageInfo,
     CMSStats,
+    CMSCacheStats,
     ReorderSectionRequest
 )
 from app.services.cms_service import CMSService
@@ -29,30 +32,32 @@ router = APIRouter()
 @router.get("/pages/{page_key}/public", response_model=PagePublic)
 async def get_page_public(
     page_key: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Obtener contenido público de una página (para mostrar en el sitio)"""
     cms_service = CMSService(db)
-    sections = cms_service.get_page_sections(page_key, active_only=True)
     
-    if not sections:
+    # Petición condicional: responder 304 sin cargar ni serializar las secciones
+    if_none_match = get_if_none_match(request)
+    if if_none_match:
+        etag = cms_service.get_public_page_etag(page_key)
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    
+    page = cms_service.get_public_page(page_key)
+    
+    if page is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Página '{page_key}' no encontrada o sin contenido"
         )
     
-    sections_public = [
-        PageSectionPublic(
-            section_key=s.section_key,
-            title=s.title,
-            content=s.content,
-            styles=s.styles or {},
-            order_index=s.order_index
-        )
-        for s in sections
-    ]
-    
-    return PagePublic(page_key=page_key, sections=sections_public)
+    return Response(
+        content=page.body,
+        media_type="application/json",
+        headers={"ETag": page.etag}
+    )
 
 
 @router.get("/sections/{page_key}/{section_key}/public", response_model=PageSectionPublic)
@@ -180,6 +185,17 @@ async def get_cms_stats(
     return CMSStats(**stats)
 
 
+@router.get("/cache/stats", response_model=CMSCacheStats)
+async def get_cms_cache_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission(Permission.READ_CONTENT))
+):
+    """Obtener métricas de la caché de páginas públicas"""
+    cms_service = CMSService(db)
+    
+    return CMSCacheStats(**cms_service.get_cache_stats())
+
+
 @router.post("/seed", response_model=List[PageContentResponse])
 async def seed_default_content(
     db: Session = Depends(get_db),
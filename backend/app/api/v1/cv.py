@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 import logging
 
 from app.core.deps import get_db, get_current_admin_user
+from app.core.etag import make_etag
+from app.core.ranges import parse_range_header, RangeNotSatisfiable
 from app.schemas.cv import CVResponse, CVDeleteResponse
-from app.services.cv_service import CVService
+from app.services.cv_service import CVService, iter_cv_file
 
 logger = logging.getLogger(__name__)
 
@@ -170,31 +172,59 @@ async def delete_cv(
 # ============================================================================
 
 @router.get("/download", tags=["CV - Public"])
-async def download_cv(db: Session = Depends(get_db)):
+async def download_cv(request: Request, db: Session = Depends(get_db)):
     """
     Download CV (Public - No authentication required)
     
     This endpoint allows anyone to download the CV directly.
-    Returns the PDF file as a download response.
+    The PDF is streamed from the database in chunks and supports
+    HTTP Range requests (single range) for resumable downloads.
     """
     cv_service = CVService(db)
-    result = cv_service.get_cv_file_data()
+    info = cv_service.get_cv_download_info()
     
-    if not result:
+    if not info:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="CV not available for download"
         )
     
-    file_data, filename = result
+    etag = make_etag("cv", info.id, info.updated_at)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{info.filename}"',
+        "Accept-Ranges": "bytes",
+        "ETag": etag
+    }
+    
+    # Only honour Range if the client's copy is still current (If-Range)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != etag:
+        range_header = None
+    
+    try:
+        byte_range = parse_range_header(range_header, info.file_size)
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{info.file_size}"}
+        )
+    
+    if byte_range is None:
+        start, end = 0, info.file_size - 1
+        status_code = status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.file_size}"
+    
+    headers["Content-Length"] = str(end - start + 1)
     
-    return Response(
-        content=file_data,
+    return StreamingResponse(
+        iter_cv_file(info.id, start, end),
+        status_code=status_code,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"',
-            "Content-Length": str(len(file_data))
-        }
+        headers=headers
     )
 
 
@@ -1,62 +1,138 @@
 """
 Endpoints para gestión de proyectos
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.core.database import get_db
 from app.core.deps import get_current_admin_user, get_optional_user
+from app.core.etag import make_etag, get_if_none_match, etag_matches, not_modified_response
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.schemas.project import (
     ProjectCreate, 
     ProjectUpdate, 
     ProjectResponse, 
     ProjectPublic,
+    ProjectSearchHit,
+    ProjectSearchResponse,
     ProjectStats
 )
 from app.services.project_service import ProjectService
+from app.services.project_search import ProjectSearchService
+from app.services.view_counter import view_counter
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[ProjectPublic])
 async def get_projects(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     featured_only: bool = Query(False),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor)"),
     db: Session = Depends(get_db),
     current_user = Depends(get_optional_user)
 ):
-    """Obtener proyectos públicos"""
+    """
+    Obtener proyectos públicos
+    
+    La respuesta incluye la cabecera X-Next-Cursor mientras haya más páginas;
+    pasarla como `cursor` da la página siguiente con coste constante.
+    """
     project_service = ProjectService(db)
     
     # Solo admin puede ver proyectos no publicados
-    include_unpublished = current_user and current_user.is_admin
-    
-    projects = project_service.get_projects(
+    include_unpublished = bool(current_user and current_user.is_admin)
+    params = dict(
         skip=skip,
         limit=limit,
         include_unpublished=include_unpublished,
         featured_only=featured_only,
-        search=search
+        search=search,
+        cursor=cursor
+    )
+    
+    # Petición condicional: responder 304 sin cargar ni serializar los proyectos
+    if_none_match = get_if_none_match(request)
+    if if_none_match:
+        fingerprint, has_more = project_service.get_projects_fingerprint(**params)
+        etag = make_etag("projects", params, fingerprint, has_more)
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    
+    projects, cursor_next = project_service.get_projects_page(**params)
+    
+    # El ETag cubre también si hay página siguiente (cabecera X-Next-Cursor)
+    response.headers["ETag"] = make_etag(
+        "projects", params, [ProjectService.etag_key(p) for p in projects], cursor_next is not None
     )
+    response.headers["Vary"] = "Authorization"
+    
+    if cursor_next:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_next
     
     return [ProjectPublic.model_validate(project) for project in projects]
 
 
 @router.get("/featured", response_model=List[ProjectPublic])
 async def get_featured_projects(
+    request: Request,
+    response: Response,
     limit: int = Query(6, ge=1, le=20),
     db: Session = Depends(get_db)
 ):
     """Obtener proyectos destacados"""
     project_service = ProjectService(db)
+    
+    # Petición condicional: responder 304 sin cargar ni serializar los proyectos
+    if_none_match = get_if_none_match(request)
+    if if_none_match:
+        etag = make_etag("featured", limit, project_service.get_featured_fingerprint(limit=limit))
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    
     projects = project_service.get_featured_projects(limit=limit)
+    response.headers["ETag"] = make_etag("featured", limit, [ProjectService.etag_key(p) for p in projects])
     
     return [ProjectPublic.model_validate(project) for project in projects]
 
 
+@router.get("/search", response_model=ProjectSearchResponse)
+async def search_projects(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_optional_user)
+):
+    """
+    Buscar proyectos por relevancia
+    
+    Texto completo sobre título, tecnologías, etiquetas y descripciones, con
+    los términos resaltados (`<mark>`). Si no hay coincidencias exactas se
+    busca de forma aproximada en el título (`match: "fuzzy"`).
+    """
+    include_unpublished = bool(current_user and current_user.is_admin)
+    hits = ProjectSearchService(db).search(q, limit=limit, include_unpublished=include_unpublished)
+    
+    return ProjectSearchResponse(
+        query=q,
+        results=[
+            ProjectSearchHit(
+                project=ProjectPublic.model_validate(hit.project),
+                rank=hit.rank,
+                match=hit.match,
+                title_highlight=hit.title,
+                snippet=hit.snippet
+            )
+            for hit in hits
+        ]
+    )
+
+
 @router.get("/stats", response_model=ProjectStats)
 async def get_project_stats(
     db: Session = Depends(get_db),
@@ -71,31 +147,46 @@ async def get_project_stats(
         published_projects=stats["published_projects"],
         featured_projects=stats["featured_projects"],
         total_views=stats["total_views"],
-        most_viewed=ProjectPublic.model_validate(stats["most_viewed"]) if stats["most_viewed"] else None
+        most_viewed=stats["most_viewed"]
     )
 
 
 @router.get("/{project_identifier}")
 async def get_project(
     project_identifier: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user = Depends(get_optional_user)
 ):
     """Obtener proyecto por ID o slug"""
     project_service = ProjectService(db)
+    include_unpublished = bool(current_user and current_user.is_admin)
+    
+    # Petición condicional: responder 304 sin cargar ni serializar el proyecto
+    if_none_match = get_if_none_match(request)
+    if if_none_match:
+        fingerprint = project_service.get_project_fingerprint(project_identifier, include_unpublished)
+        if fingerprint:
+            etag = make_etag("project", *fingerprint)
+            if etag_matches(if_none_match, etag):
+                # La visita se cuenta igualmente (solo visitantes públicos)
+                if not include_unpublished:
+                    view_counter.record(fingerprint[0])
+                return not_modified_response(etag)
     
     # Intentar obtener por ID primero, luego por slug
     project = None
     if project_identifier.isdigit():
         project = project_service.get_project_by_id(
             int(project_identifier),
-            include_unpublished=current_user and current_user.is_admin
+            include_unpublished=include_unpublished
         )
     
     if not project:
         project = project_service.get_project_by_slug(
             project_identifier,
-            include_unpublished=current_user and current_user.is_admin
+            include_unpublished=include_unpublished
         )
     
     if not project:
@@ -106,9 +197,13 @@ async def get_project(
     
     # Incrementar contador de vistas (solo para visitantes públicos)
     if not current_user or not current_user.is_admin:
-        project_service.increment_view_count(project.id)
+        view_counter.record(project.id)
+    
+    project_public = ProjectPublic.model_validate(project)
+    response.headers["ETag"] = make_etag("project", *ProjectService.etag_key(project))
+    response.headers["Vary"] = "Authorization"
     
-    return ProjectPublic.model_validate(project)
+    return project_public
 
 
 @router.post("/", response_model=ProjectResponse)
@@ -125,13 +220,17 @@ async def create_project(
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
-async def update_project(
+def update_project(
     project_id: int,
     project_data: ProjectUpdate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin_user)
 ):
-    """Actualizar proyecto (solo admin)"""
+    """
+    Actualizar proyecto (solo admin)
+    
+    `def` normal (threadpool): libera en disco los archivos que deja de usar.
+    """
     project_service = ProjectService(db)
     project = project_service.update_project(project_id, project_data, current_user)
     
@@ -139,12 +238,16 @@ async def update_project(
 
 
 @router.delete("/{project_id}")
-async def delete_project(
+def delete_project(
     project_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin_user)
 ):
-    """Eliminar proyecto (solo admin)"""
+    """
+    Eliminar proyecto (solo admin)
+    
+    `def` normal (threadpool): borra su carpeta y libera sus archivos en disco.
+    """
     project_service = ProjectService(db)
     success = project_service.delete_project(project_id, current_user)
     
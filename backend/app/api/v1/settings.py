@@ -2,14 +2,15 @@
 Endpoints para gestión de configuración global
 """
 import os
-import uuid
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.deps import get_current_admin_user, require_permission
 from app.core.config import settings as app_settings
+from app.core.rate_limit import upload_rate_limit
+from app.core.etag import make_etag, get_if_none_match, etag_matches, not_modified_response
 from app.models.enums import Permission
 from app.schemas.settings import (
     SettingsCreate, SettingsUpdate, SettingsResponse, SettingsPublic
@@ -21,10 +22,25 @@ router = APIRouter()
 
 
 @router.get("/public", response_model=SettingsPublic)
-async def get_public_settings(db: Session = Depends(get_db)):
+async def get_public_settings(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
     """Obtener configuración pública (sin datos sensibles)"""
     settings_service = SettingsService(db)
+    
+    # Petición condicional: responder 304 sin cargar la configuración completa
+    if_none_match = get_if_none_match(request)
+    if if_none_match:
+        fingerprint = settings_service.get_settings_fingerprint()
+        if fingerprint:
+            etag = make_etag("settings", *fingerprint)
+            if etag_matches(if_none_match, etag):
+                return not_modified_response(etag)
+    
     settings = settings_service.get_or_create_settings()
+    response.headers["ETag"] = make_etag("settings", settings.id, settings.updated_at)
     
     return SettingsPublic.model_validate(settings)
 
@@ -103,7 +119,7 @@ async def delete_settings(
     return result
 
 
-@router.post("/upload-social-icon")
+@router.post("/upload-social-icon", dependencies=[Depends(upload_rate_limit)])
 async def upload_social_icon(
     file: UploadFile = File(...),
     current_user = Depends(require_permission(Permission.MANAGE_SETTINGS))
@@ -127,54 +143,34 @@ async def upload_social_icon(
             detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
         )
     
-    # Validate file size (max 2MB)
-    max_size = 2 * 1024 * 1024  # 2MB
-    file.file.seek(0, 2)  # Move to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Move back to start
-    
-    if file_size > max_size:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size exceeds 2MB limit"
-        )
-    
-    # Generate unique filename
+    # Store file by content (streamed, max 2MB enforced while writing)
     upload_service = UploadService()
-    icons_folder = upload_service.ensure_icons_folder()
-    
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = icons_folder / unique_filename
-    
-    # Save file
-    try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save file: {str(e)}"
-        )
+    max_size = 2 * 1024 * 1024  # 2MB
+    saved = await upload_service.store_upload(file, max_size)
     
-    # Return relative path
-    relative_path = f"icons/{unique_filename}"
+    # Return relative path (e.g. 'cas/ab/<sha256>.svg')
+    relative_path = saved.url[len("/uploads/"):]
     
     return {
         "success": True,
         "icon_path": relative_path,
-        "filename": unique_filename
+        "filename": saved.path.name
     }
 
 
 @router.delete("/delete-social-icon")
-async def delete_social_icon(
+def delete_social_icon(
     icon_path: str,
+    db: Session = Depends(get_db),
     current_user = Depends(require_permission(Permission.MANAGE_SETTINGS))
 ):
     """
     Delete a social media icon
     
+    Icons stored by content (e.g. 'cas/ab/<sha256>.svg') are only removed
+    from disk once no setting, project or CMS section references them.
+    Plain `def` (runs in the threadpool): the reference count scans the tables.
+    
     Args:
         icon_path: Relative path to the icon (e.g., 'icons/filename.svg')
         
@@ -182,6 +178,14 @@ async def delete_social_icon(
         Success message
     """
     upload_service = UploadService()
+    if upload_service.blob_key(icon_path):
+        result = upload_service.release(icon_path, db)
+        return {
+            "success": True,
+            "message": "Icon deleted successfully" if result["deleted"] else "Icon is still referenced, kept",
+            **result
+        }
+    
     success = upload_service.delete_icon(icon_path)
     
     if not success:
@@ -1,18 +1,20 @@
 """
 Endpoints for file uploads (images, videos, files)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import os
-import uuid
-from datetime import datetime
+import asyncio
 from pathlib import Path
 import logging
 
 from app.core.deps import get_db, get_current_admin_user
 from app.core.config import settings
+from app.core.rate_limit import upload_rate_limit
+from app.core.static_files import upload_hits
+from app.services.upload_service import UploadService
+from app.services.image_service import ImageService
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +43,7 @@ def validate_file(
     max_size: int,
     file_type: str = "file"
 ) -> None:
-    """Validate uploaded file"""
+    """Validate uploaded file (max_size is enforced while streaming it to disk)"""
     if not file.filename:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -57,48 +59,7 @@ def validate_file(
         )
 
 
-def generate_unique_filename(original_filename: str) -> str:
-    """Generate unique filename with timestamp and UUID"""
-    ext = get_file_extension(original_filename)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())
-    return f"{timestamp}_{unique_id}{ext}"
-
-
-def save_upload_file(
-    file: UploadFile,
-    upload_dir: Path,
-    filename: str
-) -> str:
-    """Save uploaded file and return relative URL"""
-    try:
-        # Ensure directory exists
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Full path to save file
-        file_path = upload_dir / filename
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            content = file.file.read()
-            buffer.write(content)
-        
-        # Return relative URL from /uploads/
-        relative_path = file_path.relative_to(Path(settings.UPLOAD_DIR))
-        url = f"/uploads/{relative_path.as_posix()}"
-        
-        logger.info(f"File saved: {file_path} -> {url}")
-        return url
-        
-    except Exception as e:
-        logger.error(f"Error saving file: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error saving file: {str(e)}"
-        )
-
-
-@router.post("/images", status_code=status.HTTP_201_CREATED)
+@router.post("/images", status_code=status.HTTP_201_CREATED, dependencies=[Depends(upload_rate_limit)])
 async def upload_image(
     file: UploadFile = File(...),
     optimize: Optional[bool] = Form(False),
@@ -111,39 +72,40 @@ async def upload_image(
     
     Supports: jpg, jpeg, png, webp, gif
     Max size: 10MB
+    With optimize=true, WebP/AVIF derivatives at several widths and a blurred
+    placeholder are generated and returned as a `responsive` manifest (srcset)
+    
+    Files are stored by content hash: uploading identical content returns the
+    existing URL (`deduplicated: true`). `project_slug` is accepted for
+    backwards compatibility but no longer affects the storage location.
     """
     # Validate file
     validate_file(file, ALLOWED_IMAGE_EXTENSIONS, MAX_IMAGE_SIZE, "image")
     
-    # Determine upload directory
-    if project_slug:
-        upload_dir = Path(settings.UPLOAD_DIR) / "projects" / f"project_{project_slug}"
-    else:
-        upload_dir = Path(settings.UPLOAD_DIR) / "images"
+    # Store file (streamed, size-enforced, deduplicated by content)
+    saved = await UploadService().store_upload(file, MAX_IMAGE_SIZE)
     
-    # Generate unique filename
-    unique_filename = generate_unique_filename(file.filename)
-    
-    # Save file
-    url = save_upload_file(file, upload_dir, unique_filename)
-    
-    # Get file size
-    file_path = Path(settings.UPLOAD_DIR) / url.lstrip('/uploads/')
-    file_size = file_path.stat().st_size if file_path.exists() else 0
+    # Generate responsive derivatives (process pool)
+    responsive = None
+    if optimize:
+        responsive = await ImageService().create_responsive_variants(saved.path, saved.url)
     
     return JSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={
-            "url": url,
-            "filename": unique_filename,
+            "url": saved.url,
+            "filename": saved.path.name,
             "original_filename": file.filename,
-            "size": file_size,
+            "size": saved.size,
+            "checksum": saved.sha256,
+            "deduplicated": saved.deduplicated,
+            "responsive": responsive,
             "message": "Image uploaded successfully"
         }
     )
 
 
-@router.post("/images/multiple", status_code=status.HTTP_201_CREATED)
+@router.post("/images/multiple", status_code=status.HTTP_201_CREATED, dependencies=[Depends(upload_rate_limit)])
 async def upload_multiple_images(
     files: List[UploadFile] = File(...),
     optimize: Optional[bool] = Form(False),
@@ -156,6 +118,8 @@ async def upload_multiple_images(
     
     Supports: jpg, jpeg, png, webp, gif
     Max size per file: 10MB
+    Files are processed concurrently (UPLOAD_CONCURRENCY at a time); with
+    optimize=true each image also gets a `responsive` manifest
     """
     if not files:
         raise HTTPException(
@@ -163,47 +127,47 @@ async def upload_multiple_images(
             detail="No files provided"
         )
     
-    uploaded_images = []
-    errors = []
+    upload_service = UploadService()
+    image_service = ImageService()
+    semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+    
+    async def process_file(file: UploadFile) -> dict:
+        """Validate and save a single file, returning its result or error"""
+        async with semaphore:
+            try:
+                # Validate file
+                validate_file(file, ALLOWED_IMAGE_EXTENSIONS, MAX_IMAGE_SIZE, "image")
+                
+                # Store file (streamed, size-enforced, deduplicated by content)
+                saved = await upload_service.store_upload(file, MAX_IMAGE_SIZE)
+                
+                # Generate responsive derivatives (process pool)
+                responsive = None
+                if optimize:
+                    responsive = await image_service.create_responsive_variants(saved.path, saved.url)
+                
+                return {
+                    "image": {
+                        "url": saved.url,
+                        "filename": saved.path.name,
+                        "original_filename": file.filename,
+                        "size": saved.size,
+                        "checksum": saved.sha256,
+                        "deduplicated": saved.deduplicated,
+                        "responsive": responsive
+                    }
+                }
+                
+            except HTTPException as e:
+                return {"error": {"filename": file.filename, "error": e.detail}}
+            except Exception as e:
+                return {"error": {"filename": file.filename, "error": str(e)}}
+    
+    # Process files concurrently (bounded), keeping the original order
+    results = await asyncio.gather(*(process_file(file) for file in files))
     
-    for file in files:
-        try:
-            # Validate file
-            validate_file(file, ALLOWED_IMAGE_EXTENSIONS, MAX_IMAGE_SIZE, "image")
-            
-            # Determine upload directory
-            if project_slug:
-                upload_dir = Path(settings.UPLOAD_DIR) / "projects" / f"project_{project_slug}"
-            else:
-                upload_dir = Path(settings.UPLOAD_DIR) / "images"
-            
-            # Generate unique filename
-            unique_filename = generate_unique_filename(file.filename)
-            
-            # Save file
-            url = save_upload_file(file, upload_dir, unique_filename)
-            
-            # Get file size
-            file_path = Path(settings.UPLOAD_DIR) / url.lstrip('/uploads/')
-            file_size = file_path.stat().st_size if file_path.exists() else 0
-            
-            uploaded_images.append({
-                "url": url,
-                "filename": unique_filename,
-                "original_filename": file.filename,
-                "size": file_size
-            })
-            
-        except HTTPException as e:
-            errors.append({
-                "filename": file.filename,
-                "error": e.detail
-            })
-        except Exception as e:
-            errors.append({
-                "filename": file.filename,
-                "error": str(e)
-            })
+    uploaded_images = [r["image"] for r in results if "image" in r]
+    errors = [r["error"] for r in results if "error" in r]
     
     return JSONResponse(
         status_code=status.HTTP_201_CREATED if uploaded_images else status.HTTP_400_BAD_REQUEST,
@@ -216,7 +180,31 @@ async def upload_multiple_images(
     )
 
 
-@router.post("/videos", status_code=status.HTTP_201_CREATED)
+@router.get("/images/responsive")
+async def get_responsive_image(
+    url: str = Query(..., description="URL of the original image (/uploads/...)"),
+    width: Optional[int] = Query(None, ge=1, description="Desired display width in pixels"),
+    fmt: str = Query("webp", alias="format", pattern="^(webp|avif)$")
+):
+    """
+    Get the responsive manifest of an uploaded image (Public)
+    
+    Consumers of Project.demo_images / thumbnail_url can use the returned
+    srcset, or pass `width` to get the best-fitting derivative URL.
+    Images uploaded without optimize=true fall back to the original URL.
+    """
+    image_service = ImageService()
+    manifest = image_service.get_responsive_manifest(url)
+    
+    if not manifest:
+        return {"url": url, "responsive": None}
+    
+    best_url = image_service.pick_variant(manifest, width, fmt) if width else None
+    
+    return {"url": best_url or url, "responsive": manifest}
+
+
+@router.post("/videos", status_code=status.HTTP_201_CREATED, dependencies=[Depends(upload_rate_limit)])
 async def upload_video(
     file: UploadFile = File(...),
     project_slug: Optional[str] = Form(None),
@@ -228,39 +216,29 @@ async def upload_video(
     
     Supports: mp4, webm, mov
     Max size: 100MB
+    Stored by content hash (`project_slug` is accepted but ignored)
     """
     # Validate file
     validate_file(file, ALLOWED_VIDEO_EXTENSIONS, MAX_VIDEO_SIZE, "video")
     
-    # Determine upload directory
-    if project_slug:
-        upload_dir = Path(settings.UPLOAD_DIR) / "projects" / f"project_{project_slug}" / "videos"
-    else:
-        upload_dir = Path(settings.UPLOAD_DIR) / "videos"
-    
-    # Generate unique filename
-    unique_filename = generate_unique_filename(file.filename)
-    
-    # Save file
-    url = save_upload_file(file, upload_dir, unique_filename)
-    
-    # Get file size
-    file_path = Path(settings.UPLOAD_DIR) / url.lstrip('/uploads/')
-    file_size = file_path.stat().st_size if file_path.exists() else 0
+    # Store file (streamed, size-enforced, deduplicated by content)
+    saved = await UploadService().store_upload(file, MAX_VIDEO_SIZE)
     
     return JSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={
-            "url": url,
-            "filename": unique_filename,
+            "url": saved.url,
+            "filename": saved.path.name,
             "original_filename": file.filename,
-            "size": file_size,
+            "size": saved.size,
+            "checksum": saved.sha256,
+            "deduplicated": saved.deduplicated,
             "message": "Video uploaded successfully"
         }
     )
 
 
-@router.post("/files", status_code=status.HTTP_201_CREATED)
+@router.post("/files", status_code=status.HTTP_201_CREATED, dependencies=[Depends(upload_rate_limit)])
 async def upload_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -275,65 +253,78 @@ async def upload_file(
     # Validate file
     validate_file(file, ALLOWED_FILE_EXTENSIONS, MAX_FILE_SIZE, "file")
     
-    # Upload directory
-    upload_dir = Path(settings.UPLOAD_DIR) / "files"
-    
-    # Generate unique filename
-    unique_filename = generate_unique_filename(file.filename)
-    
-    # Save file
-    url = save_upload_file(file, upload_dir, unique_filename)
-    
-    # Get file size
-    file_path = Path(settings.UPLOAD_DIR) / url.lstrip('/uploads/')
-    file_size = file_path.stat().st_size if file_path.exists() else 0
+    # Store file (streamed, size-enforced, deduplicated by content)
+    saved = await UploadService().store_upload(file, MAX_FILE_SIZE)
     
     return JSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={
-            "url": url,
-            "filename": unique_filename,
+            "url": saved.url,
+            "filename": saved.path.name,
             "original_filename": file.filename,
-            "size": file_size,
+            "size": saved.size,
+            "checksum": saved.sha256,
+            "deduplicated": saved.deduplicated,
             "message": "File uploaded successfully"
         }
     )
 
 
 @router.delete("/files")
-async def delete_file(
+def delete_file(
     file_url: str,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin_user)
 ):
     """
     Delete a file by URL (Admin only)
+    
+    Content-addressed files (/uploads/cas/...) are shared by every upload of
+    the same content, so they are only deleted when no project, setting,
+    CMS section or user references them anymore; otherwise the response
+    reports `deleted: false` with the remaining reference count.
+    
+    Declared as a plain `def`: the reference count scans the tables and the
+    disk, so FastAPI runs it in the threadpool instead of the event loop.
     """
     try:
         # Convert URL to file path
-        # URL format: /uploads/images/filename.jpg or /uploads/projects/project_1/filename.jpg
+        # URL format: /uploads/cas/ab/<sha256>.jpg or legacy /uploads/images/filename.jpg
         if not file_url.startswith('/uploads/'):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid file URL"
             )
         
-        relative_path = file_url.lstrip('/uploads/')
-        file_path = Path(settings.UPLOAD_DIR) / relative_path
+        upload_root = Path(settings.UPLOAD_DIR).resolve()
+        file_path = (upload_root / file_url[len('/uploads/'):]).resolve()
         
-        if not file_path.exists():
+        if upload_root not in file_path.parents or not file_path.is_file():
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="File not found"
             )
         
-        # Delete file
+        upload_service = UploadService()
+        
+        if upload_service.blob_key(file_url):
+            result = upload_service.release(file_url, db)
+            return {
+                "message": "File deleted successfully" if result["deleted"] else "File is still referenced, kept",
+                "url": file_url,
+                **result
+            }
+        
+        # Legacy file: delete it (and its responsive derivatives, if any)
         file_path.unlink()
+        ImageService().delete_variants(file_path)
         logger.info(f"File deleted: {file_path}")
         
         return {
             "message": "File deleted successfully",
-            "url": file_url
+            "url": file_url,
+            "deleted": True,
+            "references": 0
         }
         
     except HTTPException:
@@ -345,3 +336,45 @@ async def delete_file(
             detail=f"Error deleting file: {str(e)}"
         )
 
+
+@router.get("/store/stats")
+def get_store_stats(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Get usage statistics of the content-addressed upload store (Admin only)
+    
+    Plain `def` (runs in the threadpool): walks the whole store.
+    """
+    return UploadService().get_store_stats(db)
+
+
+@router.post("/store/gc")
+def collect_store_garbage(
+    grace_hours: Optional[int] = Query(None, ge=0, description="Only delete blobs older than this (default: UPLOAD_GC_GRACE_HOURS)"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Delete unreferenced uploads (Admin only)
+    
+    Blobs not referenced by any project, setting, CMS section or user and
+    older than the grace period are removed together with their derivatives.
+    Plain `def` (runs in the threadpool): scans the tables and the store.
+    """
+    grace_seconds = grace_hours * 3600 if grace_hours is not None else None
+    return UploadService().collect_garbage(db, grace_seconds)
+
+
+@router.get("/serving/stats")
+async def get_serving_stats(
+    limit: int = Query(50, ge=1, le=500),
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Get per-path hit counters of served uploads (Admin only)
+    
+    Counters are kept in memory by each worker process.
+    """
+    return upload_hits.stats(limit)
@@ -13,7 +13,7 @@ from app.core.deps import (
     require_permission
 )
 from app.models.user import User
-from app.models.enums import Permission, UserRole, get_permissions_for_role, ROLE_PERMISSIONS
+from app.models.enums import Permission, UserRole, PERMISSIONS_BY_VALUE, ROLE_PERMISSION_VALUES
 from app.schemas.user import (
     UserCreate, 
     UserUpdate, 
@@ -31,7 +31,7 @@ async def get_current_user_info(
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtener información del usuario actual con permisos"""
-    permissions = [p.value for p in get_permissions_for_role(current_user.role)]
+    permissions = list(ROLE_PERMISSION_VALUES.get(current_user.role, ()))
     
     user_dict = current_user.__dict__.copy()
     user_dict['permissions'] = permissions
@@ -52,7 +52,7 @@ async def list_users(
     # Agregar permisos a cada usuario
     users_with_permissions = []
     for user in users:
-        permissions = [p.value for p in get_permissions_for_role(user.role)]
+        permissions = list(ROLE_PERMISSION_VALUES.get(user.role, ()))
         user_dict = user.__dict__.copy()
         user_dict['permissions'] = permissions
         users_with_permissions.append(UserResponse.model_validate(user_dict))
@@ -75,7 +75,7 @@ async def get_user(
             detail="Usuario no encontrado"
         )
     
-    permissions = [p.value for p in get_permissions_for_role(user.role)]
+    permissions = list(ROLE_PERMISSION_VALUES.get(user.role, ()))
     user_dict = user.__dict__.copy()
     user_dict['permissions'] = permissions
     
@@ -105,9 +105,9 @@ async def create_user(
         )
     
     auth_service = AuthService(db)
-    new_user = auth_service.create_user(user_data)
+    new_user = await auth_service.create_user(user_data)
     
-    permissions = [p.value for p in get_permissions_for_role(new_user.role)]
+    permissions = list(ROLE_PERMISSION_VALUES.get(new_user.role, ()))
     user_dict = new_user.__dict__.copy()
     user_dict['permissions'] = permissions
     
@@ -162,9 +162,9 @@ async def update_user(
             )
     
     auth_service = AuthService(db)
-    updated_user = auth_service.update_user(user_id, user_update)
+    updated_user = await auth_service.update_user(user_id, user_update)
     
-    permissions = [p.value for p in get_permissions_for_role(updated_user.role)]
+    permissions = list(ROLE_PERMISSION_VALUES.get(updated_user.role, ()))
     user_dict = updated_user.__dict__.copy()
     user_dict['permissions'] = permissions
     
@@ -217,7 +217,7 @@ async def get_available_roles(
     for role in UserRole:
         # Super admin ve todos los roles
         if current_user.is_super_admin():
-            permissions = [p.value for p in ROLE_PERMISSIONS.get(role, [])]
+            permissions = list(ROLE_PERMISSION_VALUES.get(role, ()))
             available_roles.append(RoleInfo(
                 name=role.name,
                 value=role.value,
@@ -225,7 +225,7 @@ async def get_available_roles(
             ))
         # Admin ve todos excepto super admin
         elif current_user.is_admin_role() and role != UserRole.SUPER_ADMIN:
-            permissions = [p.value for p in ROLE_PERMISSIONS.get(role, [])]
+            permissions = list(ROLE_PERMISSION_VALUES.get(role, ()))
             available_roles.append(RoleInfo(
                 name=role.name,
                 value=role.value,
@@ -233,7 +233,7 @@ async def get_available_roles(
             ))
         # Editor/Viewer solo ve editor y viewer
         elif role in [UserRole.EDITOR, UserRole.VIEWER]:
-            permissions = [p.value for p in ROLE_PERMISSIONS.get(role, [])]
+            permissions = list(ROLE_PERMISSION_VALUES.get(role, ()))
             available_roles.append(RoleInfo(
                 name=role.name,
                 value=role.value,
@@ -249,12 +249,12 @@ async def check_user_permission(
     current_user: User = Depends(get_current_active_user)
 ):
     """Verificar si el usuario actual tiene un permiso específico"""
-    try:
-        perm = Permission(permission)
-        has_perm = current_user.has_permission(perm)
-        return PermissionCheck(permission=permission, has_permission=has_perm)
-    except ValueError:
+    perm = PERMISSIONS_BY_VALUE.get(permission)
+    if perm is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Permiso inválido: {permission}"
         )
+    
+    has_perm = current_user.has_permission(perm)
+    return PermissionCheck(permission=permission, has_permission=has_perm)
@@ -0,0 +1,93 @@
+"""
+Caché en memoria para respuestas públicas
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class VersionedLRUCache(Generic[V]):
+    """
+    Caché LRU acotada con versionado por clave.
+
+    Cada clave tiene un número de versión que se incrementa al invalidarla.
+    Un lector que calculó un valor con una versión antigua no puede guardarlo
+    (evita re-cachear contenido obsoleto si una escritura ocurrió mientras se
+    construía la respuesta).
+
+    Con `ttl` (segundos) las entradas caducan aunque no se invaliden, lo que
+    acota cuánto tiempo otros workers pueden servir un valor obsoleto.
+
+    La caché es local al proceso: cada worker de uvicorn mantiene la suya y
+    las invalidaciones solo afectan al worker que atendió la escritura.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[int, V, float]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, key: str) -> int:
+        """Versión actual de una clave"""
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def get(self, key: str) -> Optional[V]:
+        """Obtener un valor (marcándolo como usado recientemente)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self._versions.get(key, 0):
+                self.misses += 1
+                return None
+            if entry[2] < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: V, version: int) -> bool:
+        """
+        Guardar un valor calculado con `version`.
+
+        Returns:
+            False si la clave fue invalidada mientras se calculaba el valor
+        """
+        with self._lock:
+            if version != self._versions.get(key, 0):
+                return False
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+            self._entries[key] = (version, value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: str) -> None:
+        """Invalidar una clave (incrementa su versión)"""
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
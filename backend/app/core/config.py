@@ -16,7 +16,14 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str = "your-super-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 horas
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # vida corta: se renuevan con el refresh token
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_REUSE_GRACE_SECONDS: int = 10  # reutilizar un refresh token recién rotado no cierra la sesión
+    TOKEN_CACHE_SIZE: int = 1024  # access tokens verificados en caché (evita re-verificar la firma)
+    AUTH_USER_CACHE_SIZE: int = 256  # usuarios autenticados cacheados por sujeto del token
+    AUTH_USER_CACHE_TTL: int = 60  # segundos (acota el retraso de cambios hechos en otro worker)
+    PASSWORD_HASH_WORKERS: int = 2  # hilos dedicados a bcrypt
+    PASSWORD_HASH_MAX_PENDING: int = 8  # operaciones en espera antes de responder 503
     
     # Environment
     ENVIRONMENT: str = "development"
@@ -29,6 +36,34 @@ class Settings(BaseSettings):
     # File Upload
     MAX_FILE_SIZE: int = 10485760  # 10MB
     UPLOAD_DIR: str = "uploads"
+    UPLOAD_CONCURRENCY: int = 4  # archivos procesados en paralelo en subidas múltiples
+    UPLOAD_GC_GRACE_HOURS: int = 24  # antigüedad mínima de un archivo sin referencias para borrarlo
+    UPLOAD_GC_INTERVAL: int = 3600  # segundos entre recolecciones automáticas (0 = desactivado)
+    
+    # Vistas de proyectos (acumuladas en memoria y volcadas en lote)
+    VIEW_COUNT_FLUSH_INTERVAL: int = 10  # segundos
+    PROJECT_STATS_CACHE_TTL: int = 60  # segundos que se reutiliza el resumen de /projects/stats
+    
+    # Image optimization (derivadas responsive)
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1024, 1600]
+    IMAGE_VARIANT_FORMATS: List[str] = ["avif", "webp"]
+    IMAGE_PROCESS_WORKERS: int = 2  # procesos dedicados a redimensionar imágenes
+    
+    # Rate limiting
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (por proceso) o "redis" (compartido entre workers)
+    RATE_LIMIT_REDIS_URL: str = ""
+    TRUSTED_PROXY_HOPS: int = 0  # proxies propios delante de la API (0 = ignorar X-Forwarded-For)
+    LOGIN_RATE_LIMIT: int = 5  # intentos de login por ventana e IP
+    LOGIN_RATE_WINDOW: int = 60  # segundos
+    LOGIN_FAILURE_ACCOUNT_LIMIT: int = 5  # intentos fallidos por cuenta y ventana
+    LOGIN_FAILURE_IP_LIMIT: int = 20  # intentos fallidos por IP y ventana
+    LOGIN_FAILURE_WINDOW: int = 900  # segundos
+    UPLOAD_RATE_LIMIT: int = 30  # subidas por ventana e IP
+    UPLOAD_RATE_WINDOW: int = 60  # segundos
+    
+    # Cache
+    CMS_PAGE_CACHE_SIZE: int = 32  # páginas públicas del CMS en memoria (LRU)
+    CMS_PAGE_CACHE_TTL: int = 30  # segundos (acota el contenido desactualizado en otros workers)
     
     # Email (opcional)
     SMTP_HOST: str = "smtp.gmail.com"
@@ -44,9 +79,21 @@ class Settings(BaseSettings):
     # Chatbot Configuration
     GOOGLE_API_KEY: str = ""
     CHATBOT_NAME: str = "NikoiDev"
+    CHATBOT_LLM_PROVIDER: str = "gemini"  # "gemini" o "fake" (modelo local sin conexión, para pruebas)
     CHATBOT_RATE_LIMIT: int = 10  # messages per window
     CHATBOT_RATE_WINDOW: int = 300  # 5 minutes in seconds
     CHATBOT_MAX_HISTORY: int = 10  # max messages to keep in context
+    CHATBOT_SUMMARY_MAX_CHARS: int = 1200  # resumen de los mensajes más antiguos
+    CHATBOT_SESSION_BACKEND: str = "memory"  # "memory" o ruta de una subclase de ChatSessionBackend ("paquete.modulo:Clase")
+    CHATBOT_MAX_SESSIONS: int = 1000  # sesiones en memoria (LRU)
+    CHATBOT_SESSION_IDLE_TTL: int = 1800  # segundos de inactividad antes de descartar una sesión
+    CHATBOT_MAX_CONCURRENCY: int = 4  # llamadas simultáneas al LLM por worker
+    CHATBOT_TIMEOUT: int = 30  # segundos máximos por respuesta (incluye la espera de turno)
+    CHATBOT_CONTEXT_TOP_K: int = 4  # fragmentos del portafolio inyectados por pregunta
+    CHATBOT_INDEX_MAX_AGE: int = 300  # segundos antes de reconstruir el índice (otros workers)
+    CHATBOT_CACHE_SIZE: int = 256  # respuestas cacheadas (LRU)
+    CHATBOT_CACHE_TTL: int = 3600  # segundos
+    CHATBOT_CACHE_SIMILARITY: float = 0.0  # umbral de similitud (0 = solo coincidencia exacta)
     
     # Mantener compatibilidad con variables antiguas (deprecated)
     ADMIN_EMAIL: Optional[str] = None
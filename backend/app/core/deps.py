@@ -7,25 +7,28 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import verify_token
+from app.core.user_cache import get_user_by_subject
 from app.models.user import User
-from app.models.enums import Permission, UserRole
+from app.models.enums import Permission, UserRole, mask_has_permission
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
+def get_token_data(token: str = Depends(oauth2_scheme)) -> dict:
+    """Claims del token JWT (email, rol y máscara de permisos), sin consultar la base de datos"""
+    return verify_token(token)
+
+
 def get_current_user(
     db: Session = Depends(get_db), 
-    token: str = Depends(oauth2_scheme)
+    token_data: dict = Depends(get_token_data)
 ) -> User:
     """Obtener usuario actual desde el token JWT"""
     
-    # Verificar token
-    token_data = verify_token(token)
-    
-    # Buscar usuario en la base de datos
-    user = db.query(User).filter(User.email == token_data["email"]).first()
+    # Buscar usuario (caché por sujeto del token o base de datos)
+    user = get_user_by_subject(db, token_data["email"])
     
     if user is None:
         raise HTTPException(
@@ -80,18 +83,39 @@ def get_current_super_admin(
 
 
 class PermissionChecker:
-    """Dependency para verificar permisos específicos"""
+    """
+    Dependency para verificar permisos específicos
+    
+    Si el token incluye la máscara de permisos, una petición sin el permiso
+    se rechaza sin consultar la base de datos. Si lo tiene, se comprueba
+    además el rol actual del usuario cuando difiere del rol del token
+    (p. ej. un rol rebajado después de emitirlo).
+    """
     
     def __init__(self, required_permission: Permission):
         self.required_permission = required_permission
     
-    def __call__(self, current_user: User = Depends(get_current_active_user)) -> User:
-        if not current_user.has_permission(self.required_permission):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"No tienes el permiso requerido: {self.required_permission.value}"
-            )
+    def __call__(
+        self,
+        db: Session = Depends(get_db),
+        token_data: dict = Depends(get_token_data)
+    ) -> User:
+        token_mask = token_data.get("permissions")
+        if token_mask is not None and not mask_has_permission(token_mask, self.required_permission):
+            self._forbidden()
+        
+        current_user = get_current_active_user(get_current_user(db, token_data))
+        
+        if token_mask is None or token_data.get("role") != current_user.role:
+            if not current_user.has_permission(self.required_permission):
+                self._forbidden()
         return current_user
+    
+    def _forbidden(self):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"No tienes el permiso requerido: {self.required_permission.value}"
+        )
 
 
 # Helpers para crear checkers de permisos comunes
@@ -110,7 +134,7 @@ def get_optional_user(
     
     try:
         token_data = verify_token(token)
-        user = db.query(User).filter(User.email == token_data["email"]).first()
+        user = get_user_by_subject(db, token_data["email"])
         return user if user and user.is_active else None
     except:
         return None
@@ -0,0 +1,48 @@
+"""
+Utilidades para peticiones condicionales (ETag / If-None-Match)
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, status
+from fastapi.responses import Response
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Construir un ETag fuerte a partir de los datos que determinan la respuesta
+    (parámetros de la petición, ids, updated_at, version...)
+    """
+    raw = "|".join(repr(part) for part in parts)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def get_if_none_match(request: Request) -> Optional[str]:
+    """Obtener la cabecera If-None-Match de la petición (si existe)"""
+    return request.headers.get("if-none-match")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Verificar si el ETag coincide con alguno de los enviados por el cliente"""
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match usa comparación débil
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
+
+
+def not_modified_response(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag}
+    )
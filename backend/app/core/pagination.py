@@ -0,0 +1,74 @@
+"""
+Paginación por cursor (keyset)
+
+El cursor es opaco para el cliente: codifica los valores de la clave de
+ordenación de la última fila devuelta, y la página siguiente se obtiene con
+`WHERE (clave) < (cursor)` sobre un índice compuesto, con el mismo coste sea
+cual sea la profundidad (a diferencia de OFFSET).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+# Cabecera con el cursor de la página siguiente (ausente en la última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def invalid_cursor() -> HTTPException:
+    """Error 400 para un cursor mal formado o manipulado"""
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Cursor de paginación inválido"
+    )
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Codificar los valores de la clave de ordenación de una fila"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decodificar un cursor con `size` valores (las fechas se devuelven como string ISO)
+
+    Raises:
+        HTTPException 400 si el cursor no es válido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise invalid_cursor()
+    return values
+
+
+def parse_cursor_datetime(value: Any) -> datetime:
+    """Fecha ISO de un cursor (400 si no es válida)"""
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise invalid_cursor()
+
+
+def split_page(rows: Sequence[Any], limit: int, key) -> Tuple[List[Any], Optional[str]]:
+    """
+    Separar una página de una consulta hecha con `limit + 1` filas
+
+    La fila extra solo indica que hay más páginas y se descarta, así que la
+    última página nunca devuelve un cursor hacia una página vacía.
+
+    Returns:
+        Tupla (filas de la página, cursor de la página siguiente o None)
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(key(page[-1]))
@@ -0,0 +1,56 @@
+"""
+Utilidades para peticiones HTTP Range (descargas parciales)
+"""
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """El rango solicitado está fuera del tamaño del recurso"""
+
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpretar una cabecera Range de un solo rango de bytes.
+
+    Args:
+        range_header: Valor de la cabecera Range (p. ej. "bytes=0-1023")
+        size: Tamaño total del recurso en bytes
+
+    Returns:
+        Tupla (start, end) inclusiva, o None si se debe servir el recurso
+        completo (sin cabecera, unidad desconocida, múltiples rangos o sintaxis
+        inválida: RFC 9110 permite ignorar la cabecera en esos casos)
+
+    Raises:
+        RangeNotSatisfiable: Si el rango empieza más allá del final del recurso
+    """
+    if not range_header:
+        return None
+
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, sep, end_str = ranges.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if start_str == "":
+            # Sufijo: últimos N bytes
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+
+    return start, min(end, size - 1)
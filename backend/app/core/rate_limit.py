@@ -0,0 +1,337 @@
+"""
+Limitación de peticiones (GCRA) reutilizable como dependencia de FastAPI
+
+GCRA ("generic cell rate algorithm") es equivalente a un token bucket pero
+solo guarda un número por clave: el instante teórico de la próxima llegada
+(TAT). Cada comprobación es O(1).
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis_asyncio
+    from redis.exceptions import RedisError
+except ImportError:  # opcional: solo necesario con RATE_LIMIT_BACKEND=redis
+    redis_asyncio = None
+    RedisError = OSError
+
+T = TypeVar("T")
+
+# Segundos entre barridos de claves inactivas (backend en memoria)
+SWEEP_INTERVAL = 60
+
+# Segundos sin intentar Redis tras un error (se usan límites por proceso)
+REDIS_RETRY_INTERVAL = 30
+
+# Timeout de conexión y de cada operación con Redis (segundos)
+REDIS_SOCKET_TIMEOUT = 1
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    Obtener la IP del cliente
+
+    X-Forwarded-For solo se tiene en cuenta detrás de TRUSTED_PROXY_HOPS
+    proxies propios: cada proxy añade la dirección de la que recibió la
+    petición, así que el cliente real es la entrada número
+    TRUSTED_PROXY_HOPS empezando por la derecha. Las entradas a su
+    izquierda las controla el cliente y se ignoran. Sin proxies
+    configurados se usa la conexión directa.
+    """
+    hops = settings.TRUSTED_PROXY_HOPS
+    if hops > 0:
+        forwarded = [ip.strip() for ip in request.headers.get("X-Forwarded-For", "").split(",") if ip.strip()]
+        if forwarded:
+            return forwarded[-min(hops, len(forwarded))]
+
+        real_ip = request.headers.get("X-Real-IP")
+        if real_ip:
+            return real_ip.strip()
+
+    if request.client:
+        return request.client.host
+
+    return "unknown"
+
+
+class RateLimitBackend(ABC):
+    """Almacenamiento del estado de los límites"""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        """
+        Registrar una petición para `key` (máximo `limit` por `window` segundos)
+
+        Returns:
+            Tupla (permitida, segundos hasta poder reintentar)
+        """
+
+    @abstractmethod
+    async def peek(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        """Como `hit`, pero sin registrar la petición"""
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """Olvidar el estado de `key` (cubo lleno)"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, object]:
+        """Métricas del backend"""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    GCRA en memoria del proceso.
+
+    Las claves cuyo TAT ya pasó equivalen a un cubo lleno, así que se
+    eliminan en barridos periódicos: la memoria depende solo de los
+    clientes activos en la última ventana.
+    """
+
+    def __init__(self):
+        self._tat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.swept = 0
+
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        now = time.monotonic()
+        interval = window / limit
+
+        with self._lock:
+            self._sweep(now)
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + interval
+            allow_at = new_tat - window
+            if now < allow_at:
+                return False, allow_at - now
+            self._tat[key] = new_tat
+            return True, 0.0
+
+    async def peek(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tat.get(key, now), now)
+        allow_at = tat + window / limit - window
+        return now >= allow_at, max(0.0, allow_at - now)
+
+    async def reset(self, key: str) -> None:
+        with self._lock:
+            self._tat.pop(key, None)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"backend": "memory", "keys": len(self._tat), "swept": self.swept}
+
+    def _sweep(self, now: float) -> None:
+        """Eliminar claves inactivas (como mucho cada SWEEP_INTERVAL, con el lock tomado)"""
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        self.swept += len(idle)
+
+
+# GCRA atómico en Redis; la clave expira cuando el cubo vuelve a estar lleno
+_REDIS_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if now < allow_at then
+  return {0, tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    GCRA compartido entre workers/instancias a través de Redis
+
+    Si Redis falla, los límites pasan a aplicarse en memoria del proceso
+    (con un aviso en el log) durante REDIS_RETRY_INTERVAL segundos, en vez
+    de responder 500 en login, subidas y chat.
+    """
+
+    def __init__(self, url: str):
+        self._client = redis_asyncio.from_url(
+            url,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT
+        )
+        self._script = self._client.register_script(_REDIS_GCRA_SCRIPT)
+        self._fallback = InMemoryRateLimitBackend()
+        self._retry_at = 0.0
+        self.errors = 0
+
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        return await self._call(self._hit, self._fallback.hit, key, limit, window)
+
+    async def peek(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        return await self._call(self._peek, self._fallback.peek, key, limit, window)
+
+    async def reset(self, key: str) -> None:
+        await self._call(self._reset, self._fallback.reset, key)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": "redis",
+            "degraded": self._is_degraded(),
+            "errors": self.errors,
+            "fallback": self._fallback.stats(),
+        }
+
+    async def _hit(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[time.time(), window / limit, window]
+        )
+        return bool(allowed), float(retry_after)
+
+    async def _peek(self, key: str, limit: int, window: int) -> Tuple[bool, float]:
+        now = time.time()
+        stored = await self._client.get(f"ratelimit:{key}")
+        tat = max(float(stored), now) if stored is not None else now
+        allow_at = tat + window / limit - window
+        return now >= allow_at, max(0.0, allow_at - now)
+
+    async def _reset(self, key: str) -> None:
+        await self._client.delete(f"ratelimit:{key}")
+
+    async def _call(self, operation: Callable[..., Awaitable[T]], fallback: Callable[..., Awaitable[T]], *args) -> T:
+        """Ejecutar una operación en Redis, o en memoria si Redis no está disponible"""
+        if self._is_degraded():
+            return await fallback(*args)
+        try:
+            return await operation(*args)
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            self._retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+            logger.warning(
+                f"Redis rate limiter unavailable ({e}); using per-process limits "
+                f"for the next {REDIS_RETRY_INTERVAL}s"
+            )
+            return await fallback(*args)
+
+    def _is_degraded(self) -> bool:
+        return time.monotonic() < self._retry_at
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Backend configurado (RATE_LIMIT_BACKEND), con respaldo en memoria"""
+    global _backend
+    if _backend is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            if redis_asyncio is not None and settings.RATE_LIMIT_REDIS_URL:
+                _backend = RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+            else:
+                logger.warning(
+                    "RATE_LIMIT_BACKEND=redis requires the redis package and RATE_LIMIT_REDIS_URL; "
+                    "falling back to per-process limits"
+                )
+        if _backend is None:
+            _backend = InMemoryRateLimitBackend()
+    return _backend
+
+
+class RateLimit:
+    """
+    Dependencia que limita las peticiones por IP.
+
+    Uso:
+        @router.post("/login", dependencies=[Depends(login_rate_limit)])
+    """
+
+    def __init__(self, name: str, limit: int, window: int):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    async def __call__(self, request: Request) -> None:
+        client_ip = get_client_ip(request)
+        allowed, retry_after = await get_rate_limit_backend().hit(
+            f"{self.name}:{client_ip}", self.limit, self.window
+        )
+
+        if not allowed:
+            wait_time = max(1, round(retry_after))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded. Try again in {wait_time} seconds.",
+                headers={"Retry-After": str(wait_time)}
+            )
+
+
+class LoginThrottle:
+    """
+    Límite de intentos de login fallidos por cuenta y por IP.
+
+    Antes de verificar la contraseña se comprueba (sin coste de bcrypt) si la
+    cuenta o la IP ya agotaron sus fallos; en ese caso se responde 429 de
+    inmediato. Solo los fallos consumen cupo y un login correcto libera la
+    cuenta.
+    """
+
+    def __init__(self, account_limit: int, ip_limit: int, window: int):
+        self.account_limit = account_limit
+        self.ip_limit = ip_limit
+        self.window = window
+
+    def _keys(self, client_ip: str, email: str) -> Tuple[Tuple[str, int], Tuple[str, int]]:
+        return (
+            (f"login-fail:account:{email.strip().lower()}", self.account_limit),
+            (f"login-fail:ip:{client_ip}", self.ip_limit),
+        )
+
+    async def check(self, client_ip: str, email: str) -> None:
+        """Rechazar (429) si la cuenta o la IP no admiten más intentos fallidos"""
+        backend = get_rate_limit_backend()
+        for key, limit in self._keys(client_ip, email):
+            allowed, retry_after = await backend.peek(key, limit, self.window)
+            if not allowed:
+                wait_time = max(1, round(retry_after))
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Demasiados intentos fallidos. Inténtalo de nuevo en {wait_time} segundos.",
+                    headers={"Retry-After": str(wait_time)}
+                )
+
+    async def record_failure(self, client_ip: str, email: str) -> None:
+        """Registrar un intento fallido"""
+        backend = get_rate_limit_backend()
+        for key, limit in self._keys(client_ip, email):
+            await backend.hit(key, limit, self.window)
+
+    async def record_success(self, email: str) -> None:
+        """Un login correcto libera la cuenta (los fallos de la IP se mantienen)"""
+        account_key, _ = self._keys("", email)[0]
+        await get_rate_limit_backend().reset(account_key)
+
+
+login_rate_limit = RateLimit("login", settings.LOGIN_RATE_LIMIT, settings.LOGIN_RATE_WINDOW)
+upload_rate_limit = RateLimit("upload", settings.UPLOAD_RATE_LIMIT, settings.UPLOAD_RATE_WINDOW)
+chatbot_rate_limit = RateLimit("chatbot", settings.CHATBOT_RATE_LIMIT, settings.CHATBOT_RATE_WINDOW)
+login_throttle = LoginThrottle(
+    settings.LOGIN_FAILURE_ACCOUNT_LIMIT,
+    settings.LOGIN_FAILURE_IP_LIMIT,
+    settings.LOGIN_FAILURE_WINDOW
+)
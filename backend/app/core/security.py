@@ -1,16 +1,84 @@
 """
 Utilidades de seguridad y autenticación
 """
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from app.core.cache import VersionedLRUCache
 from app.core.config import settings
+from app.models.enums import PERMISSIONS_VERSION, UserRole, get_permission_mask
 
 # Configuración para hash de contraseñas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
+# bcrypt cuesta ~250 ms de CPU por operación: se ejecuta en un pool acotado
+# (nunca en el event loop) y, si ya hay demasiadas operaciones pendientes,
+# se rechaza de inmediato en lugar de encolar sin límite.
+_password_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_password_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING
+)
+
+# Payloads de access tokens ya verificados, por token: evita repetir la
+# verificación de la firma en cada petición (la caducidad se comprueba igual)
+_decoded_tokens: VersionedLRUCache[dict] = VersionedLRUCache(max_entries=settings.TOKEN_CACHE_SIZE)
+
+
+class SessionRevocationList:
+    """
+    Sesiones (familias de refresh tokens) revocadas, en memoria.
+    
+    Los access tokens se verifican sin consultar la base de datos, así que
+    un logout solo les afecta a través de esta lista. Cada entrada se
+    conserva hasta que caduca el último access token que pudo emitirse para
+    la sesión; la fuente persistente son las filas revocadas de
+    `refresh_tokens`, con las que se recarga al arrancar.
+    """
+    
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def revoke(self, session_id: str, until: Optional[float] = None) -> None:
+        """Revocar una sesión hasta `until` (timestamp; por defecto, la vida de un access token)"""
+        if until is None:
+            until = time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        with self._lock:
+            self._revoked[session_id] = max(until, self._revoked.get(session_id, 0.0))
+    
+    def load(self, entries: Iterable[Tuple[str, float]]) -> None:
+        """Cargar revocaciones persistidas (session_id, hasta)"""
+        for session_id, until in entries:
+            self.revoke(session_id, until)
+    
+    def is_revoked(self, session_id: str) -> bool:
+        with self._lock:
+            until = self._revoked.get(session_id)
+            if until is None:
+                return False
+            if until < time.time():
+                del self._revoked[session_id]
+                return False
+            return True
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"revoked_sessions": len(self._revoked)}
+
+
+revoked_sessions = SessionRevocationList()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verificar contraseña"""
@@ -22,6 +90,36 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_job(func: Callable[..., T], *args) -> T:
+    """Ejecutar una operación de bcrypt en el pool (503 si la cola está llena)"""
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, inténtalo de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+    
+    future = _password_pool.submit(func, *args)
+    # El hueco se libera al terminar el hash, aunque la petición se cancele antes
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verificar contraseña sin bloquear el event loop"""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Generar hash de contraseña sin bloquear el event loop"""
+    return await _run_password_job(get_password_hash, password)
+
+
+def permission_claims(role: UserRole) -> dict:
+    """Claims de autorización del token: rol, máscara de permisos y su versión"""
+    return {"role": UserRole(role).value, "perms": get_permission_mask(role), "pv": PERMISSIONS_VERSION}
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crear token JWT"""
     to_encode = data.copy()
@@ -31,38 +129,63 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def _invalid_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token inválido",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 def verify_token(token: str) -> dict:
-    """Verificar y decodificar token JWT"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
+    """
+    Verificar y decodificar un access token JWT (sin consultar la base de datos)
+    
+    La firma solo se verifica la primera vez que se ve un token; después se
+    usa el payload cacheado, comprobando igualmente caducidad y revocación.
+    """
+    payload = _decoded_tokens.get(token)
+    
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            raise _invalid_token()
         
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        # Un refresh token no sirve como access token
+        if payload.get("sub") is None or payload.get("type") == "refresh":
+            raise _invalid_token()
         
-        return {"email": email}
+        _decoded_tokens.set(token, payload, 0)
     
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    elif payload["exp"] <= time.time():
+        raise _invalid_token()
+    
+    session_id = payload.get("sid")
+    if session_id and revoked_sessions.is_revoked(session_id):
+        raise _invalid_token()
+    
+    # La máscara solo vale si se emitió con la tabla de permisos actual;
+    # si no (o si el token no la lleva) es None y se comprueba el rol
+    permissions = payload.get("perms") if payload.get("pv") == PERMISSIONS_VERSION else None
+    
+    return {
+        "email": payload["sub"],
+        "role": payload.get("role"),
+        "permissions": permissions,
+        "session_id": session_id,
+    }
 
 
 def create_refresh_token(data: dict) -> str:
     """Crear refresh token (válido por más tiempo)"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=7)  # 7 días
+    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -76,13 +199,13 @@ def verify_refresh_token(token: str) -> dict:
         email: str = payload.get("sub")
         token_type: str = payload.get("type")
         
-        if email is None or token_type != "refresh":
+        if email is None or token_type != "refresh" or not payload.get("jti"):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Refresh token inválido",
             )
         
-        return {"email": email}
+        return {"email": email, "jti": payload["jti"], "session_id": payload.get("sid")}
     
     except JWTError:
         raise HTTPException(
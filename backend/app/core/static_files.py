@@ -0,0 +1,160 @@
+"""
+Servidor de archivos subidos (/uploads)
+
+Extiende StaticFiles con:
+- Cache-Control de larga duración para nombres inmutables (almacén por hash)
+- Variantes precomprimidas (.br / .gz) para SVG y texto
+- Lectura en bloques grandes para los rangos de vídeo
+- Contadores de accesos por ruta
+"""
+import mimetypes
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Nombres inmutables: el contenido nunca cambia para la misma URL
+IMMUTABLE_PATH_PATTERN = re.compile(r"^cas/[0-9a-f]{2}/[0-9a-f]{64}[^/]*$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Nombres heredados (images/, projects/, icons/...): revalidar con ETag
+DEFAULT_CACHE_CONTROL = "public, no-cache"
+
+# Extensiones que pueden tener hermanos precomprimidos
+PRECOMPRESSED_EXTENSIONS = {".svg", ".txt", ".json", ".css", ".js", ".html", ".xml"}
+
+# Codificaciones soportadas, por orden de preferencia
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+VIDEO_EXTENSIONS = {".mp4", ".webm", ".mov"}
+
+
+class VideoFileResponse(FileResponse):
+    """FileResponse con bloques de 1MB (menos iteraciones al servir rangos de vídeo)"""
+    chunk_size = 1024 * 1024
+
+
+class HitCounter:
+    """Contadores de accesos por ruta (locales al proceso)"""
+
+    def __init__(self):
+        self._hits: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, path: str) -> None:
+        """Registrar un acceso"""
+        with self._lock:
+            self._hits[path] += 1
+
+    def forget(self, prefix: str) -> None:
+        """Eliminar los contadores de las rutas que empiezan por `prefix`"""
+        with self._lock:
+            for path in [p for p in self._hits if p.startswith(prefix)]:
+                del self._hits[path]
+
+    def stats(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Rutas más solicitadas"""
+        with self._lock:
+            top: List[Dict[str, Any]] = [
+                {"path": path, "hits": hits}
+                for path, hits in self._hits.most_common(limit)
+            ]
+            return {
+                "paths": len(self._hits),
+                "total_hits": sum(self._hits.values()),
+                "top": top,
+            }
+
+
+upload_hits = HitCounter()
+
+
+def accepted_encodings(headers: Headers) -> set:
+    """Codificaciones aceptadas por el cliente (ignorando las que tienen q=0)"""
+    encodings = set()
+    for item in headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles para los archivos subidos"""
+
+    def __init__(self, *args, hits: Optional[HitCounter] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hits = hits if hits is not None else upload_hits
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 206, 304):
+            relative_path = path.replace(os.sep, "/")
+            response.headers["Cache-Control"] = (
+                IMMUTABLE_CACHE_CONTROL
+                if IMMUTABLE_PATH_PATTERN.match(relative_path)
+                else DEFAULT_CACHE_CONTROL
+            )
+            self.hits.record(relative_path)
+
+        return response
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        extension = os.path.splitext(str(full_path))[1].lower()
+
+        if extension in PRECOMPRESSED_EXTENSIONS:
+            response = self._precompressed_response(full_path, stat_result, request_headers, status_code)
+        else:
+            response_class = VideoFileResponse if extension in VIDEO_EXTENSIONS else FileResponse
+            response = response_class(full_path, status_code=status_code, stat_result=stat_result)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _precompressed_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        request_headers: Headers,
+        status_code: int,
+    ) -> Response:
+        """Servir el hermano .br/.gz si existe y el cliente lo acepta"""
+        accepted = accepted_encodings(request_headers)
+        headers = {"Vary": "Accept-Encoding"}
+
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                sibling_stat = os.stat(f"{full_path}{suffix}")
+            except OSError:
+                continue
+
+            headers["Content-Encoding"] = encoding
+            return FileResponse(
+                f"{full_path}{suffix}",
+                status_code=status_code,
+                headers=headers,
+                media_type=mimetypes.guess_type(str(full_path))[0] or "text/plain",
+                stat_result=sibling_stat,
+            )
+
+        # Sin variante aceptada: servir el original indicando que depende de Accept-Encoding
+        return FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
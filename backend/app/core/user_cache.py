@@ -0,0 +1,59 @@
+"""
+Caché del usuario autenticado por sujeto del token (email)
+
+Evita una consulta a la tabla users en cada petición autenticada: el panel
+de administración lanza muchas peticiones en paralelo con el mismo token.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import VersionedLRUCache
+from app.core.config import settings
+from app.models.user import User
+
+# Columnas que nunca se guardan en la caché
+EXCLUDED_COLUMNS = {"hashed_password"}
+
+user_cache: VersionedLRUCache[Dict[str, Any]] = VersionedLRUCache(
+    max_entries=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL
+)
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    """Valores de las columnas del usuario (sin la contraseña)"""
+    return {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key not in EXCLUDED_COLUMNS
+    }
+
+
+def get_user_by_subject(db: Session, email: str) -> Optional[User]:
+    """
+    Obtener el usuario de un token, desde la caché si es posible.
+
+    En un acierto el usuario se reconstruye y se adjunta a la sesión con
+    `merge(load=False)`, sin consultar la base de datos: sigue siendo un
+    objeto User normal (relaciones y atributos no cacheados se cargan bajo
+    demanda).
+    """
+    values = user_cache.get(email)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    version = user_cache.version(email)
+    user = db.query(User).filter(User.email == email).first()
+    if user is not None:
+        user_cache.set(email, _snapshot(user), version)
+    return user
+
+
+def invalidate_user(*emails: Optional[str]) -> None:
+    """Invalidar la caché de uno o varios usuarios (tras modificarlos o eliminarlos)"""
+    for email in emails:
+        if email:
+            user_cache.invalidate(email)
@@ -3,7 +3,6 @@ Aplicación principal FastAPI para el Portafolio Personal
 """
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -11,6 +10,8 @@ import os
 import logging
 
 from app.core.config import settings as config_settings
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.static_files import UploadStaticFiles
 from app.api.v1 import auth, projects, admin, cms, users, settings, cv, uploads, chatbot
 
 logger = logging.getLogger(__name__)
@@ -59,8 +60,62 @@ async def startup_event():
         logger.warning(f"⚠️ Could not auto-seed CMS content: {str(e)}")
         logger.warning("You may need to manually seed content via /api/v1/cms/seed")
     
+    # Las lecturas de proyectos ya no migran datos: avisar si quedan filas antiguas
+    try:
+        from app.services.project_service import ProjectService
+        
+        db = SessionLocal()
+        legacy = ProjectService(db).count_legacy_technologies()
+        db.close()
+        if legacy:
+            logger.warning(
+                f"⚠️ {legacy} project(s) still have legacy string technologies. "
+                "Run `alembic upgrade head` or `python migrate_technologies.py`"
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not check project technologies format: {str(e)}")
+    
+    # Sesiones revocadas: los access tokens se verifican sin base de datos
+    try:
+        from app.services.token_service import TokenService
+        
+        db = SessionLocal()
+        token_service = TokenService(db)
+        revoked = token_service.load_revocations()
+        purged = token_service.purge_expired()
+        db.close()
+        logger.info(f"✓ Loaded {revoked} revoked sessions, purged {purged} expired refresh tokens")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load revoked sessions: {str(e)}")
+    
+    # Volcado periódico de las vistas de proyectos
+    from app.services.view_counter import view_counter
+    view_counter.start()
+    
+    # Recolección periódica de archivos subidos sin referencias
+    from app.services.upload_service import store_gc
+    store_gc.start()
+    
     logger.info("✓ Portfolio API started successfully")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background resources on shutdown"""
+    from app.services.image_service import shutdown_process_pool
+    from app.services.upload_service import store_gc
+    from app.services.view_counter import view_counter
+    
+    await store_gc.stop()
+    
+    # Escribir las vistas aún en memoria antes de salir
+    try:
+        await view_counter.stop()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not flush project view counts: {str(e)}")
+    
+    shutdown_process_pool()
+
 # Custom exception handler para RequestValidationError
 @app.exception_handler(RequestValidationError)
 async def custom_validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -98,6 +153,7 @@ async def custom_http_exception_handler(request: Request, exc: StarletteHTTPExce
             "detail": str(exc.detail),
             "status_code": exc.status_code
         },
+        headers=getattr(exc, "headers", None),
     )
 
 @app.exception_handler(Exception)
@@ -120,13 +176,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Crear directorio de uploads si no existe
 os.makedirs(config_settings.UPLOAD_DIR, exist_ok=True)
 
-# Servir archivos estáticos
-app.mount("/uploads", StaticFiles(directory=config_settings.UPLOAD_DIR), name="uploads")
+# Servir archivos subidos (caché inmutable, precomprimidos, rangos, contadores)
+app.mount("/uploads", UploadStaticFiles(directory=config_settings.UPLOAD_DIR), name="uploads")
 
 # Incluir routers de la API
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
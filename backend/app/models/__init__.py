@@ -5,6 +5,7 @@ from .project import Project
 from .cv import CV
 from .settings import Settings
 from .page_content import PageContent
+from .refresh_token import RefreshToken
 
 # Exportar todos los modelos
 __all__ = [
@@ -14,5 +15,6 @@ __all__ = [
     "Project", 
     "CV",
     "Settings",
-    "PageContent"
+    "PageContent",
+    "RefreshToken"
 ]
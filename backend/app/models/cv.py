@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.models.base import Base
 
@@ -7,12 +8,15 @@ class CV(Base):
     """
     CV Model - Stores a single CV file
     Only one CV can exist in the system at a time
+
+    file_data is deferred: metadata queries never fetch the PDF, it is only
+    read (in chunks) by the download path
     """
     __tablename__ = "cv"
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
-    file_data = Column(LargeBinary, nullable=False, comment="PDF file stored as binary")
+    file_data = deferred(Column(LargeBinary, nullable=False, comment="PDF file stored as binary"))
     file_size = Column(Integer, nullable=False, comment="File size in bytes")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -120,11 +120,71 @@ ROLE_PERMISSIONS = {
 }
 
 
+# Tablas compiladas una sola vez al importar: cada permiso es un bit y cada
+# rol una máscara, así que comprobar un permiso es un AND de enteros.
+#
+# Las máscaras viajan en los tokens: el bit de un permiso no puede cambiar
+# nunca (un permiso nuevo usa el siguiente bit libre, uno eliminado deja su
+# bit sin reutilizar). Si cambian los permisos de un rol, incrementar
+# PERMISSIONS_VERSION para que las máscaras de los tokens ya emitidos dejen
+# de usarse.
+PERMISSIONS_VERSION = 1
+
+PERMISSION_BITS = {
+    Permission.CREATE_USER: 1 << 0,
+    Permission.READ_USER: 1 << 1,
+    Permission.UPDATE_USER: 1 << 2,
+    Permission.DELETE_USER: 1 << 3,
+    Permission.MANAGE_ROLES: 1 << 4,
+    Permission.CREATE_PROJECT: 1 << 5,
+    Permission.READ_PROJECT: 1 << 6,
+    Permission.UPDATE_PROJECT: 1 << 7,
+    Permission.DELETE_PROJECT: 1 << 8,
+    Permission.PUBLISH_PROJECT: 1 << 9,
+    Permission.UPDATE_CV: 1 << 10,
+    Permission.GENERATE_CV_PDF: 1 << 11,
+    Permission.UPLOAD_FILE: 1 << 12,
+    Permission.DELETE_FILE: 1 << 13,
+    Permission.CREATE_CONTENT: 1 << 14,
+    Permission.READ_CONTENT: 1 << 15,
+    Permission.UPDATE_CONTENT: 1 << 16,
+    Permission.DELETE_CONTENT: 1 << 17,
+    Permission.VIEW_ANALYTICS: 1 << 18,
+    Permission.MANAGE_SETTINGS: 1 << 19,
+}
+
+if set(PERMISSION_BITS) != set(Permission) or len(set(PERMISSION_BITS.values())) != len(PERMISSION_BITS):
+    raise RuntimeError("Cada permiso necesita un bit propio en PERMISSION_BITS")
+
+PERMISSIONS_BY_VALUE = {permission.value: permission for permission in Permission}
+
+ROLE_PERMISSION_MASKS = {
+    role: sum(PERMISSION_BITS[permission] for permission in set(permissions))
+    for role, permissions in ROLE_PERMISSIONS.items()
+}
+
+# Valores (strings) de los permisos de cada rol, para respuestas de la API
+ROLE_PERMISSION_VALUES = {
+    role: tuple(permission.value for permission in permissions)
+    for role, permissions in ROLE_PERMISSIONS.items()
+}
+
+
 def get_permissions_for_role(role: UserRole) -> list[Permission]:
     """Obtener permisos para un rol específico"""
     return ROLE_PERMISSIONS.get(role, [])
 
 
+def get_permission_mask(role: UserRole) -> int:
+    """Máscara de bits de los permisos de un rol"""
+    return ROLE_PERMISSION_MASKS.get(role, 0)
+
+
+def mask_has_permission(mask: int, permission: Permission) -> bool:
+    """Verificar si una máscara de permisos incluye un permiso"""
+    return bool(mask & PERMISSION_BITS[permission])
+
+
 def has_permission(role: UserRole, permission: Permission) -> bool:
     """Verificar si un rol tiene un permiso específico"""
-    return permission in ROLE_PERMISSIONS.get(role, [])
+    return mask_has_permission(ROLE_PERMISSION_MASKS.get(role, 0), permission)
@@ -1,14 +1,23 @@
 """
 Modelo de Proyecto para el portafolio
 """
-from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, JSON, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from .base import BaseModel
 
 
 class Project(BaseModel):
     """Modelo de Proyecto del portafolio"""
     __tablename__ = "projects"
+    __table_args__ = (
+        # Orden del listado (paginación por cursor)
+        Index("ix_projects_listing", "order_index", "created_at", "id"),
+        Index("ix_projects_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_projects_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+    )
+    # No recuperar search_vector (generada) con RETURNING en cada INSERT/UPDATE
+    __mapper_args__ = {"eager_defaults": False}
     
     # Información básica
     title = Column(String(200), nullable=False)
@@ -48,6 +57,17 @@ class Project(BaseModel):
     # Métricas
     view_count = Column(Integer, default=0, nullable=False)
     
+    # Búsqueda de texto completo (columna generada por PostgreSQL; diferida
+    # para no cargarla en las consultas normales). Ver ProjectSearchService.
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(jsonb_to_tsvector('simple', jsonb_path_query_array(coalesce(technologies::jsonb, '[]'::jsonb), '$[*].name'), '[\"string\"]'), 'A') || "
+        "setweight(jsonb_to_tsvector('simple', coalesce(tags::jsonb, '[]'::jsonb), '[\"string\"]'), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(short_description, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')",
+        persisted=True
+    )))
+    
     # Relaciones
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User", back_populates="projects")
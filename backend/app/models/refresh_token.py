@@ -0,0 +1,27 @@
+"""
+Modelo de Refresh Token (sesiones de login rotadas y revocables)
+"""
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from .base import BaseModel
+
+
+class RefreshToken(BaseModel):
+    """
+    Refresh token emitido a un usuario.
+    
+    Cada uso rota el token: la fila usada se marca como revocada y apunta a
+    su sucesor (`replaced_by`). Todos los tokens de un mismo login comparten
+    `family_id`, que también viaja en los access tokens como `sid`.
+    """
+    __tablename__ = "refresh_tokens"
+    
+    jti = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(64), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True, index=True)
+    replaced_by = Column(String(64), nullable=True)  # jti del token que lo sustituyó al rotar
+    
+    def __repr__(self):
+        return f"<RefreshToken(jti={self.jti}, user_id={self.user_id}, revoked={self.revoked_at is not None})>"
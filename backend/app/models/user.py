@@ -4,7 +4,7 @@ Modelo de Usuario para el sistema de administración
 from sqlalchemy import Column, String, Boolean, Text, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from .base import BaseModel
-from .enums import UserRole, Permission, has_permission
+from .enums import UserRole, Permission, ROLE_PERMISSION_VALUES, has_permission
 
 
 class User(BaseModel):
@@ -46,8 +46,7 @@ class User(BaseModel):
     @property
     def permissions(self):
         """Obtener lista de permisos del usuario basado en su rol"""
-        from .enums import ROLE_PERMISSIONS
-        return [perm.value for perm in ROLE_PERMISSIONS.get(self.role, [])]
+        return list(ROLE_PERMISSION_VALUES.get(self.role, ()))
     
     def has_permission(self, permission: Permission) -> bool:
         """Verificar si el usuario tiene un permiso específico"""
@@ -18,7 +18,7 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=1000, description="User message")
     conversation_history: Optional[List[ChatMessage]] = Field(
         default=[], 
-        description="Previous messages for context"
+        description="Previous messages; only used to seed sessions unknown to the server (history is kept server-side)"
     )
     session_id: Optional[str] = Field(None, description="Session identifier")
 
@@ -76,6 +76,16 @@ class CMSStats(BaseSchema):
     editable_sections: int
 
 
+class CMSCacheStats(BaseSchema):
+    """Métricas de la caché de páginas públicas"""
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
 class ReorderSectionRequest(BaseSchema):
     """Esquema para reordenar secciones"""
     direction: str = Field(..., pattern="^(up|down)$")  # 'up' o 'down'
@@ -116,6 +116,21 @@ class ProjectPublic(BaseSchema):
         return value.isoformat() if value else None
 
 
+class ProjectSearchHit(BaseSchema):
+    """Resultado de búsqueda de proyectos"""
+    project: ProjectPublic
+    rank: float
+    match: str  # "fulltext" o "fuzzy" (aproximada por trigramas)
+    title_highlight: Optional[str] = None  # HTML escapado con <mark> en los términos encontrados
+    snippet: Optional[str] = None
+
+
+class ProjectSearchResponse(BaseSchema):
+    """Respuesta de la búsqueda de proyectos"""
+    query: str
+    results: List[ProjectSearchHit]
+
+
 class ProjectList(BaseSchema):
     """Esquema para lista de proyectos"""
     projects: List[ProjectPublic]
@@ -63,10 +63,16 @@ class UserProfile(UserResponse):
 class Token(BaseSchema):
     """Esquema para token de autenticación"""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     expires_in: int
 
 
+class RefreshTokenRequest(BaseSchema):
+    """Esquema para renovar o revocar una sesión"""
+    refresh_token: str
+
+
 class TokenData(BaseSchema):
     """Esquema para datos del token"""
     email: Optional[str] = None
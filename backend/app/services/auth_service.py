@@ -1,7 +1,6 @@
 """
 Servicio de autenticación
 """
-from datetime import timedelta
 from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
@@ -9,12 +8,12 @@ from app.models.user import User
 from app.models.enums import UserRole, get_permissions_for_role
 from app.schemas.user import UserCreate, UserLogin, Token, UserUpdate
 from app.core.security import (
-    verify_password, 
-    get_password_hash, 
-    create_access_token,
-    create_refresh_token
+    verify_password_async, 
+    get_password_hash_async
 )
 from app.core.config import settings
+from app.core.user_cache import invalidate_user
+from app.services.token_service import TokenService
 
 
 class AuthService:
@@ -23,19 +22,19 @@ class AuthService:
     def __init__(self, db: Session):
         self.db = db
     
-    def authenticate_user(self, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Autenticar usuario con email y contraseña"""
         user = self.db.query(User).filter(User.email == email).first()
         
         if not user:
             return None
         
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
         
         return user
     
-    def create_user(self, user_data: UserCreate) -> User:
+    async def create_user(self, user_data: UserCreate) -> User:
         """Crear nuevo usuario"""
         # Verificar si el email ya existe
         existing_user = self.db.query(User).filter(User.email == user_data.email).first()
@@ -46,7 +45,7 @@ class AuthService:
             )
         
         # Crear usuario
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         
         db_user = User(
             email=user_data.email,
@@ -69,9 +68,9 @@ class AuthService:
         
         return db_user
     
-    def login(self, login_data: UserLogin) -> Token:
+    async def login(self, login_data: UserLogin) -> Token:
         """Iniciar sesión y generar tokens"""
-        user = self.authenticate_user(login_data.email, login_data.password)
+        user = await self.authenticate_user(login_data.email, login_data.password)
         
         if not user:
             raise HTTPException(
@@ -86,26 +85,14 @@ class AuthService:
                 detail="Usuario inactivo"
             )
         
-        # Crear tokens
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user.email}, 
-            expires_delta=access_token_expires
-        )
-        
-        refresh_token = create_refresh_token(data={"sub": user.email})
-        
-        return Token(
-            access_token=access_token,
-            token_type="bearer",
-            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # en segundos
-        )
+        # Crear tokens (access de vida corta + refresh rotado)
+        return TokenService(self.db).issue_tokens(user)
     
     def get_user_by_email(self, email: str) -> Optional[User]:
         """Obtener usuario por email"""
         return self.db.query(User).filter(User.email == email).first()
     
-    def create_super_admin(self) -> User:
+    async def create_super_admin(self) -> User:
         """Crear usuario super administrador inicial desde variables de entorno"""
         # Verificar si ya existe
         existing_admin = self.get_user_by_email(settings.SUPER_ADMIN_EMAIL)
@@ -120,9 +107,9 @@ class AuthService:
             role=UserRole.SUPER_ADMIN
         )
         
-        return self.create_user(super_admin_data)
+        return await self.create_user(super_admin_data)
     
-    def update_user(self, user_id: int, user_update: UserUpdate) -> User:
+    async def update_user(self, user_id: int, user_update: UserUpdate) -> User:
         """Actualizar usuario"""
         user = self.db.query(User).filter(User.id == user_id).first()
         if not user:
@@ -135,20 +122,30 @@ class AuthService:
         update_data = user_update.model_dump(exclude_unset=True)
         
         # Si se actualiza la contraseña, hashearla
-        if "password" in update_data and update_data["password"]:
-            update_data["hashed_password"] = get_password_hash(update_data["password"])
+        password_changed = bool(update_data.get("password"))
+        if password_changed:
+            update_data["hashed_password"] = await get_password_hash_async(update_data["password"])
             del update_data["password"]
         
         # Actualizar is_admin si cambia el rol
         if "role" in update_data:
             update_data["is_admin"] = update_data["role"] in [UserRole.SUPER_ADMIN, UserRole.ADMIN]
         
+        previous_email = user.email
+        
         for field, value in update_data.items():
             setattr(user, field, value)
         
         self.db.commit()
         self.db.refresh(user)
         
+        # El usuario cacheado por token (rol, estado...) ya no es válido
+        invalidate_user(previous_email, user.email)
+        
+        # Una contraseña nueva cierra todas las sesiones abiertas con la anterior
+        if password_changed:
+            TokenService(self.db).revoke_user_sessions(user.id)
+        
         return user
     
     def delete_user(self, user_id: int) -> bool:
@@ -167,7 +164,10 @@ class AuthService:
                 detail="No se puede eliminar un super administrador"
             )
         
+        email = user.email
         self.db.delete(user)
         self.db.commit()
         
+        invalidate_user(email)
+        
         return True
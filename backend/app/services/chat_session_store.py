@@ -0,0 +1,218 @@
+"""
+Server-side chatbot sessions (conversation history keyed by session_id)
+"""
+import importlib
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between idle-session sweeps
+SWEEP_INTERVAL = 60
+
+# Characters kept from each message folded into the rolling summary
+SUMMARY_MESSAGE_CHARS = 200
+
+
+class ChatSession:
+    """
+    Conversation state of one session
+
+    At most `max_history` recent messages are kept verbatim; older ones are
+    folded into a bounded rolling summary, so the prompt built from a
+    session has a constant size however long the conversation gets.
+    """
+
+    def __init__(self, session_id: str, max_history: int, summary_max_chars: int):
+        self.session_id = session_id
+        self.summary_max_chars = summary_max_chars
+        self.messages: Deque[Tuple[str, str]] = deque()
+        self.max_history = max_history
+        self.summary = ""
+        self.last_seen = time.monotonic()
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.messages and not self.summary
+
+    def add(self, role: str, content: str) -> None:
+        """Append a message ('user' or 'assistant'), folding the oldest into the summary"""
+        self.messages.append((role, content))
+        while len(self.messages) > self.max_history:
+            self._fold(*self.messages.popleft())
+
+    def _fold(self, role: str, content: str) -> None:
+        """Add a message to the rolling summary (keeping only the most recent part)"""
+        speaker = "Usuario" if role == "user" else "Asistente"
+        text = " ".join(content.split())
+        if len(text) > SUMMARY_MESSAGE_CHARS:
+            text = text[:SUMMARY_MESSAGE_CHARS - 1] + "…"
+
+        summary = f"{self.summary}\n{speaker}: {text}" if self.summary else f"{speaker}: {text}"
+        if len(summary) > self.summary_max_chars:
+            summary = summary[-self.summary_max_chars:]
+            # Start at a message boundary
+            summary = summary.split("\n", 1)[-1]
+        self.summary = summary
+
+
+class ChatSessionBackend(ABC):
+    """
+    Storage backend for chat sessions
+
+    Subclass to keep sessions in a shared store (e.g. Redis) when running
+    several workers and point CHATBOT_SESSION_BACKEND at the class
+    ("package.module:ClassName"); the default keeps them in process memory.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Stored session, or None if unknown or expired"""
+
+    @abstractmethod
+    def save(self, session: ChatSession) -> None:
+        """Store (or replace) a session"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Forget a session (no-op if unknown)"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Backend metrics for the admin endpoint"""
+
+
+class InMemorySessionBackend(ChatSessionBackend):
+    """Bounded LRU of sessions with idle eviction (local to the worker process)"""
+
+    def __init__(self, max_sessions: int, idle_ttl: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.last_seen > self.idle_ttl:
+                del self._sessions[session_id]
+                self.expirations += 1
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session: ChatSession) -> None:
+        with self._lock:
+            session.last_seen = time.monotonic()
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl_seconds": self.idle_ttl,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _sweep(self, now: float) -> None:
+        """Drop idle sessions (at most once per SWEEP_INTERVAL, lock held)"""
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        # Sessions are in LRU order: idle ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self.expirations += 1
+
+
+class ChatSessionStore:
+    """Access to chat sessions through the configured backend"""
+
+    def __init__(self, backend: ChatSessionBackend):
+        self.backend = backend
+
+    def get_or_create(self, session_id: str, history: Optional[List[Any]] = None) -> ChatSession:
+        """
+        Get a session, creating it if unknown
+
+        `history` (client-sent ChatMessage list) only seeds new sessions,
+        e.g. after a server restart or on another worker; known sessions use
+        the stored history. Only its last CHATBOT_MAX_HISTORY messages are used.
+        """
+        session = self.backend.get(session_id)
+        if session is not None:
+            return session
+
+        session = ChatSession(session_id, settings.CHATBOT_MAX_HISTORY, settings.CHATBOT_SUMMARY_MAX_CHARS)
+        for message in (history or [])[-settings.CHATBOT_MAX_HISTORY:]:
+            if message.role in ("user", "assistant"):
+                session.add(message.role, message.content)
+        return session
+
+    def record_turn(self, session: ChatSession, user_message: str, assistant_message: str) -> None:
+        """Append a completed exchange and persist the session"""
+        session.add("user", user_message)
+        session.add("assistant", assistant_message)
+        self.backend.save(session)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+def load_backend_class(path: str) -> type:
+    """Import a ChatSessionBackend subclass from "package.module:ClassName" (or "package.module.ClassName")"""
+    module_name, _, class_name = path.rpartition(":") if ":" in path else path.rpartition(".")
+    if not module_name:
+        raise ImportError(f"{path!r} is not a dotted path to a class")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(backend_class, type) and issubclass(backend_class, ChatSessionBackend)):
+        raise TypeError(f"{path!r} is not a ChatSessionBackend subclass")
+    return backend_class
+
+
+def create_session_backend() -> ChatSessionBackend:
+    """
+    Backend for CHATBOT_SESSION_BACKEND
+
+    "memory" (default) or the import path of a ChatSessionBackend subclass,
+    built without arguments. A backend that cannot be loaded falls back to
+    process memory, so a bad setting does not take the app down.
+    """
+    path = settings.CHATBOT_SESSION_BACKEND
+    if path != "memory":
+        try:
+            return load_backend_class(path)()
+        except Exception as e:
+            logger.warning(f"Could not load CHATBOT_SESSION_BACKEND={path!r} ({e}); falling back to memory sessions")
+    return InMemorySessionBackend(settings.CHATBOT_MAX_SESSIONS, settings.CHATBOT_SESSION_IDLE_TTL)
+
+
+session_store = ChatSessionStore(create_session_backend())
@@ -0,0 +1,178 @@
+"""
+Response cache for repeated chatbot questions
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+# Dimensions of the hashed bag-of-words vectors used by the similarity tier
+VECTOR_DIMENSIONS = 2 ** 16
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", message.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def context_hash(*parts: str) -> str:
+    """Hash of the system prompt and portfolio context an answer was generated with"""
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def embed(normalized: str) -> Dict[int, float]:
+    """
+    Local sparse vector of a normalized message (hashed unigrams + bigrams, L2-normalized)
+    """
+    words = normalized.split()
+    terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    vector: Dict[int, float] = {}
+    for term in terms:
+        index = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "big") % VECTOR_DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {k: v / norm for k, v in vector.items()} if norm else {}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two L2-normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class _Entry(NamedTuple):
+    reply: str
+    expires_at: float
+    context: str
+    vector: Dict[int, float]
+
+
+class ChatResponseCache:
+    """
+    Bounded LRU cache of chatbot replies with TTL
+
+    - Exact tier: key is (context hash, normalized message)
+    - Similarity tier (optional): if `similarity_threshold` > 0, a miss on
+      the exact tier falls back to the most similar cached question with
+      the same context, using local hashed bag-of-words vectors
+
+    Each invalidation bumps a generation number; replies computed before an
+    invalidation are not stored (see `set`). The cache is local to each
+    worker process.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: int = 3600, similarity_threshold: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.generation = 0
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, message: str, context: str) -> Optional[str]:
+        """Get a cached reply for a question asked with the given context hash"""
+        normalized = normalize_message(message)
+        key = (context, normalized)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.reply
+
+            if self.similarity_threshold > 0:
+                match = self._most_similar(embed(normalized), context, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.similar_hits += 1
+                    return self._entries[match].reply
+
+            self.misses += 1
+            return None
+
+    def set(self, message: str, context: str, reply: str, generation: int) -> bool:
+        """
+        Store a reply computed while the cache was at `generation`
+
+        Returns:
+            False if the cache was invalidated while the reply was generated
+        """
+        normalized = normalize_message(message)
+        vector = embed(normalized) if self.similarity_threshold > 0 else {}
+
+        with self._lock:
+            if generation != self.generation:
+                return False
+            key = (context, normalized)
+            self._entries[key] = _Entry(reply, time.monotonic() + self.ttl, context, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self) -> None:
+        """Drop every cached reply (portfolio data changed)"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache usage metrics"""
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            total = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "similarity_threshold": self.similarity_threshold,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+            }
+
+    def _most_similar(self, vector: Dict[int, float], context: str, now: float) -> Optional[Tuple[str, str]]:
+        """Key of the most similar live entry above the threshold (lock held)"""
+        if not vector:
+            return None
+
+        best_key = None
+        best_score = self.similarity_threshold
+        for key, entry in self._entries.items():
+            if entry.context != context or entry.expires_at <= now:
+                continue
+            score = cosine(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+
+response_cache = ChatResponseCache(
+    max_entries=settings.CHATBOT_CACHE_SIZE,
+    ttl=settings.CHATBOT_CACHE_TTL,
+    similarity_threshold=settings.CHATBOT_CACHE_SIMILARITY,
+)
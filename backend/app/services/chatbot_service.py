@@ -1,35 +1,100 @@
 """
 Chatbot service using LangChain and Google Generative AI (Gemini)
+
+LangChain is imported lazily: the service is built on first use through
+get_chatbot_service(), so importing the API does not load the LLM stack.
 """
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict
 from datetime import datetime
+import asyncio
+import itertools
+import logging
+import threading
 import uuid
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from app.core.config import settings
-from app.schemas.chatbot import ChatMessage, ChatRequest, ChatResponse
+from app.schemas.chatbot import ChatRequest, ChatResponse
+from app.services.chat_session_store import ChatSession, session_store
+from app.services.chatbot_cache import context_hash, response_cache
+from app.services.portfolio_index import portfolio_index
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.project import Project
-from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Fallback replies when the LLM fails or takes too long
+ERROR_REPLY = (
+    "Disculpa, estoy teniendo problemas técnicos en este momento. "
+    "Por favor, contacta directamente a Nicolás en aran.nick15@gmail.com "
+    "o intenta nuevamente en unos momentos."
+)
+TIMEOUT_REPLY = (
+    "Disculpa, estoy tardando más de lo normal en responder. "
+    "Por favor, intenta nuevamente en unos momentos o contacta a Nicolás en aran.nick15@gmail.com."
+)
+
+# Context used when no portfolio content matches the question
+STATIC_CONTEXT = [
+    "\nPROYECTOS DESTACADOS:",
+    "- Portfolio Personal: Sistema completo de portafolio con CMS, autenticación JWT, y panel admin (Tecnologías: Next.js, FastAPI, PostgreSQL, Docker)",
+    "- Sistema de Gestión: Aplicación web full-stack con CRUD completo y roles de usuario",
+]
+
+# Reply when no LLM is configured (GOOGLE_API_KEY missing)
+DEGRADED_REPLY = (
+    "En este momento el asistente no está disponible. "
+    "Puedes contactar directamente a Nicolás en aran.nick15@gmail.com "
+    "o visitar su GitHub: https://github.com/nikoidev"
+)
+
+# Reply of the offline fake model (CHATBOT_LLM_PROVIDER=fake)
+FAKE_REPLY = (
+    "¡Hola! Soy un modelo de prueba sin conexión. "
+    "Nicolás trabaja con Python, FastAPI, Next.js y PostgreSQL."
+)
 
 
 class ChatbotService:
     """Service for NikoiDev chatbot"""
     
     def __init__(self):
-        """Initialize the chatbot with Gemini"""
+        """
+        Initialize the chatbot with Gemini (or the offline fake model)
+        
+        Without GOOGLE_API_KEY the service runs in degraded mode: no LLM is
+        created and every question gets DEGRADED_REPLY.
+        """
+        self.llm = self._create_llm()
+        
+        self.system_prompt = self._build_system_prompt()
+        
+        # Cap on concurrent LLM calls per worker
+        self._llm_slots = asyncio.Semaphore(settings.CHATBOT_MAX_CONCURRENCY)
+    
+    @property
+    def is_degraded(self) -> bool:
+        """True if no LLM is available"""
+        return self.llm is None
+    
+    def _create_llm(self):
+        """Create the chat model for CHATBOT_LLM_PROVIDER (None if not configured)"""
+        if settings.CHATBOT_LLM_PROVIDER == "fake":
+            from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+            from langchain_core.messages import AIMessage
+            
+            # Offline model that streams a canned reply word by word
+            return GenericFakeChatModel(messages=itertools.cycle([AIMessage(content=FAKE_REPLY)]))
+        
         if not settings.GOOGLE_API_KEY:
-            raise ValueError("GOOGLE_API_KEY is required for chatbot")
+            logger.warning("GOOGLE_API_KEY is not set: chatbot running in degraded mode")
+            return None
+        
+        from langchain_google_genai import ChatGoogleGenerativeAI
         
-        self.llm = ChatGoogleGenerativeAI(
+        return ChatGoogleGenerativeAI(
             model="gemini-2.0-flash-exp",
             google_api_key=settings.GOOGLE_API_KEY,
             temperature=0.7,
             max_output_tokens=500,
         )
-        
-        self.system_prompt = self._build_system_prompt()
     
     def _build_system_prompt(self) -> str:
         """Build the system prompt with context about Nicolás"""
@@ -68,65 +133,125 @@ INFORMACIÓN DE CONTACTO:
 - GitHub: https://github.com/nikoidev
 - El formulario de contacto está disponible en la página de contacto del portafolio"""
     
-    def get_portfolio_context(self, db: Optional[AsyncSession] = None) -> str:
-        """Get context about projects and info from database"""
-        # For now, return static context. Can be enhanced later with DB queries
-        context_parts = [
-            "\nPROYECTOS DESTACADOS:",
-            "- Portfolio Personal: Sistema completo de portafolio con CMS, autenticación JWT, y panel admin (Tecnologías: Next.js, FastAPI, PostgreSQL, Docker)",
-            "- Sistema de Gestión: Aplicación web full-stack con CRUD completo y roles de usuario",
-        ]
-        
-        return "\n".join(context_parts)
+    async def get_portfolio_context(self, db: Optional[AsyncSession] = None, question: str = "") -> str:
+        """
+        Get the portfolio snippets (projects, CMS sections) most relevant to a question
+        
+        Only the top CHATBOT_CONTEXT_TOP_K snippets from the retrieval index
+        are injected, keeping the prompt small. Without a database session,
+        or if nothing matches, a short static summary is used. Building or
+        refreshing the index runs in the threadpool.
+        """
+        snippets = await portfolio_index.search(db, question, settings.CHATBOT_CONTEXT_TOP_K)
+        
+        if not snippets:
+            return "\n".join(STATIC_CONTEXT)
+        
+        return "\n".join(["\nINFORMACIÓN RELEVANTE DEL PORTAFOLIO:", *(f"- {snippet}" for snippet in snippets)])
     
-    def _convert_history_to_messages(self, history: List[ChatMessage]) -> List:
-        """Convert ChatMessage list to LangChain message format"""
-        messages = [SystemMessage(content=self.system_prompt)]
+    def _session_to_messages(self, session: ChatSession, portfolio_context: str) -> List:
+        """
+        Convert a stored session to LangChain message format
+        
+        The session holds at most CHATBOT_MAX_HISTORY messages plus a bounded
+        summary of older ones, so this is constant work per turn.
+        """
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+        
+        system_content = self.system_prompt + portfolio_context
+        if session.summary:
+            system_content += f"\n\nRESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{session.summary}"
         
-        for msg in history[-settings.CHATBOT_MAX_HISTORY:]:
-            if msg.role == "user":
-                messages.append(HumanMessage(content=msg.content))
-            elif msg.role == "assistant":
-                messages.append(AIMessage(content=msg.content))
+        messages = [SystemMessage(content=system_content)]
+        
+        for role, content in session.messages:
+            if role == "user":
+                messages.append(HumanMessage(content=content))
+            elif role == "assistant":
+                messages.append(AIMessage(content=content))
         
         return messages
     
-    def chat(
+    async def _build_messages(self, request: ChatRequest, session: ChatSession, db: Optional[AsyncSession] = None) -> List:
+        """Build the LangChain messages (system prompt + context, history, user message)"""
+        from langchain_core.messages import HumanMessage
+        
+        # Get portfolio context relevant to the question
+        portfolio_context = await self.get_portfolio_context(db, request.message)
+        
+        # Build messages with context and the server-side history
+        messages = self._session_to_messages(session, portfolio_context)
+        
+        # Add current user message
+        messages.append(HumanMessage(content=request.message))
+        
+        return messages
+    
+    def _cache_context(self, session: ChatSession, messages: List) -> Optional[str]:
+        """
+        Cache context hash for a request, or None if the answer must not be cached
+        
+        Only standalone questions are cached: with conversation history the
+        answer depends on the previous turns.
+        """
+        if not session.is_empty:
+            return None
+        return context_hash(messages[0].content)
+    
+    async def chat(
         self, 
         request: ChatRequest, 
         db: Optional[AsyncSession] = None
     ) -> ChatResponse:
-        """Process a chat message and return response"""
+        """
+        Process a chat message and return response
         
-        # Get portfolio context
-        portfolio_context = self.get_portfolio_context(db)
+        The LLM is called asynchronously (never blocking the event loop), at
+        most CHATBOT_MAX_CONCURRENCY calls at a time per worker. Waiting for
+        a slot and generating the answer must finish within CHATBOT_TIMEOUT
+        seconds, otherwise a fallback reply is returned. Cancelling the
+        calling task (client disconnected) cancels the LLM request.
         
-        # Build messages with context
-        messages = self._convert_history_to_messages(request.conversation_history)
+        The conversation history is kept server-side by session_id; questions
+        that open a session are answered from the response cache when possible.
+        """
+        session_id = request.session_id or str(uuid.uuid4())
         
-        # Add portfolio context to system message
-        messages[0].content += portfolio_context
+        if self.is_degraded:
+            return ChatResponse(
+                message=DEGRADED_REPLY,
+                timestamp=datetime.utcnow(),
+                session_id=session_id,
+                tokens_used=None
+            )
         
-        # Add current user message
-        messages.append(HumanMessage(content=request.message))
+        session = session_store.get_or_create(session_id, request.conversation_history)
+        messages = await self._build_messages(request, session, db)
         
-        # Get response from Gemini
-        try:
-            response = self.llm.invoke(messages)
-            assistant_message = response.content
-        except Exception as e:
-            # Fallback response if AI fails
-            assistant_message = (
-                f"Disculpa, estoy teniendo problemas técnicos en este momento. "
-                f"Por favor, contacta directamente a Nicolás en aran.nick15@gmail.com "
-                f"o intenta nuevamente en unos momentos."
-            )
-            print(f"Chatbot error: {e}")
-            import traceback
-            traceback.print_exc()
+        cache_context = self._cache_context(session, messages)
+        cached = response_cache.get(request.message, cache_context) if cache_context else None
+        generation = response_cache.generation
         
-        # Generate or use existing session ID
-        session_id = request.session_id or str(uuid.uuid4())
+        if cached is not None:
+            assistant_message = cached
+            session_store.record_turn(session, request.message, assistant_message)
+        else:
+            # Get response from Gemini
+            try:
+                async with asyncio.timeout(settings.CHATBOT_TIMEOUT):
+                    async with self._llm_slots:
+                        response = await self.llm.ainvoke(messages)
+                assistant_message = response.content
+                session_store.record_turn(session, request.message, assistant_message)
+                if cache_context:
+                    response_cache.set(request.message, cache_context, assistant_message, generation)
+            except TimeoutError:
+                logger.warning(f"Chatbot LLM call timed out after {settings.CHATBOT_TIMEOUT}s")
+                assistant_message = TIMEOUT_REPLY
+            except Exception as e:
+                # Fallback response if AI fails
+                logger.error(f"Chatbot error: {e}", exc_info=True)
+                assistant_message = ERROR_REPLY
         
         return ChatResponse(
             message=assistant_message,
@@ -135,7 +260,84 @@ INFORMACIÓN DE CONTACTO:
             tokens_used=None  # Gemini doesn't provide this easily
         )
     
-    def validate_message(self, message: str) -> tuple[bool, Optional[str]]:
+    async def stream_chat(
+        self,
+        request: ChatRequest,
+        session_id: str,
+        db: Optional[AsyncSession] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the assistant response as text chunks
+        
+        Uses the same concurrency cap and CHATBOT_TIMEOUT as chat(). If the
+        LLM fails (or times out) before producing anything, the fallback
+        reply is yielded instead; if it fails mid-answer the stream just ends.
+        A cached reply is yielded as a single chunk. Only complete answers
+        are added to the session history.
+        """
+        if self.is_degraded:
+            yield DEGRADED_REPLY
+            return
+        
+        session = session_store.get_or_create(session_id, request.conversation_history)
+        messages = await self._build_messages(request, session, db)
+        
+        cache_context = self._cache_context(session, messages)
+        if cache_context:
+            cached = response_cache.get(request.message, cache_context)
+            if cached is not None:
+                session_store.record_turn(session, request.message, cached)
+                yield cached
+                return
+        generation = response_cache.generation
+        
+        chunks: List[str] = []
+        
+        # The model is read by a separate task: timeout and concurrency slot
+        # cover only the generation, never the time the client takes to
+        # consume the stream
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._produce_stream(messages, queue))
+        
+        try:
+            while (content := await queue.get()) is not None:
+                chunks.append(content)
+                yield content
+            await producer
+            assistant_message = "".join(chunks)
+            session_store.record_turn(session, request.message, assistant_message)
+            if cache_context:
+                response_cache.set(request.message, cache_context, assistant_message, generation)
+        except TimeoutError:
+            logger.warning(f"Chatbot LLM stream timed out after {settings.CHATBOT_TIMEOUT}s")
+            if not chunks:
+                yield TIMEOUT_REPLY
+        except Exception as e:
+            logger.error(f"Chatbot error: {e}", exc_info=True)
+            if not chunks:
+                yield ERROR_REPLY
+        finally:
+            # Client disconnected (generator closed): stop the generation
+            producer.cancel()
+    
+    async def _produce_stream(self, messages: List, queue: asyncio.Queue) -> None:
+        """
+        Stream the LLM answer into `queue`, followed by None when it ends
+        
+        Runs as its own task so CHATBOT_TIMEOUT and the concurrency slot
+        are scoped to the generation; errors are raised from the task.
+        """
+        try:
+            async with asyncio.timeout(settings.CHATBOT_TIMEOUT):
+                async with self._llm_slots:
+                    async for chunk in self.llm.astream(messages):
+                        if isinstance(chunk.content, str) and chunk.content:
+                            queue.put_nowait(chunk.content)
+        finally:
+            queue.put_nowait(None)
+    
+    @staticmethod
+    def validate_message(message: str) -> tuple[bool, Optional[str]]:
         """Validate user message"""
         if not message or not message.strip():
             return False, "Message cannot be empty"
@@ -152,6 +354,16 @@ INFORMACIÓN DE CONTACTO:
         return True, None
 
 
-# Singleton instance
-chatbot_service = ChatbotService()
+_chatbot_service: Optional[ChatbotService] = None
+_chatbot_service_lock = threading.Lock()
+
+
+def get_chatbot_service() -> ChatbotService:
+    """Get the shared chatbot service, creating it (and loading LangChain) on first use"""
+    global _chatbot_service
+    if _chatbot_service is None:
+        with _chatbot_service_lock:
+            if _chatbot_service is None:
+                _chatbot_service = ChatbotService()
+    return _chatbot_service
 
@@ -1,13 +1,38 @@
 """
 Servicio para gestión del CMS (Content Management System)
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, NamedTuple
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
+from app.core.cache import VersionedLRUCache
+from app.core.config import settings
+from app.core.etag import make_etag
 from app.models.page_content import PageContent
 from app.models.user import User
-from app.schemas.cms import PageContentCreate, PageContentUpdate, PageInfo
+from app.schemas.cms import (
+    PageContentCreate,
+    PageContentUpdate,
+    PageInfo,
+    PagePublic,
+    PageSectionPublic
+)
+from app.services.chatbot_cache import response_cache
+from app.services.portfolio_index import portfolio_index
+
+
+class PublicPage(NamedTuple):
+    """Página pública serializada junto con su ETag"""
+    etag: str
+    body: bytes
+
+
+# Caché de páginas públicas serializadas (JSON) por page_key; la invalidación
+# es por worker, así que el TTL acota lo que otros workers sirven desactualizado
+page_cache: VersionedLRUCache[PublicPage] = VersionedLRUCache(
+    max_entries=settings.CMS_PAGE_CACHE_SIZE,
+    ttl=settings.CMS_PAGE_CACHE_TTL
+)
 
 
 class CMSService:
@@ -43,6 +68,79 @@ class CMSService:
         
         return query.order_by(PageContent.page_key, PageContent.order_index).all()
     
+    def get_public_page(self, page_key: str) -> Optional[PublicPage]:
+        """
+        Obtener una página pública serializada como JSON.
+        
+        Se sirve desde la caché en memoria; solo se consulta la base de datos
+        cuando la página no está cacheada o fue invalidada por una escritura.
+        """
+        cached = page_cache.get(page_key)
+        if cached is not None:
+            return cached
+        
+        version = page_cache.version(page_key)
+        sections = self.get_page_sections(page_key, active_only=True)
+        
+        if not sections:
+            return None
+        
+        page = PagePublic(
+            page_key=page_key,
+            sections=[
+                PageSectionPublic(
+                    section_key=s.section_key,
+                    title=s.title,
+                    content=s.content,
+                    styles=s.styles or {},
+                    order_index=s.order_index
+                )
+                for s in sections
+            ]
+        )
+        public_page = PublicPage(
+            etag=self._page_etag(page_key, [(s.id, s.version, s.updated_at) for s in sections]),
+            body=page.model_dump_json().encode("utf-8")
+        )
+        page_cache.set(page_key, public_page, version)
+        
+        return public_page
+    
+    def get_public_page_etag(self, page_key: str) -> Optional[str]:
+        """
+        Obtener el ETag de una página pública sin cargar su contenido.
+        
+        Usa la caché si la página está cacheada; si no, una consulta ligera
+        que solo lee id, version y updated_at de las secciones activas.
+        """
+        cached = page_cache.get(page_key)
+        if cached is not None:
+            return cached.etag
+        
+        rows = self.db.query(
+            PageContent.id,
+            PageContent.version,
+            PageContent.updated_at
+        ).filter(
+            PageContent.page_key == page_key,
+            PageContent.is_active == True
+        ).order_by(PageContent.order_index).all()
+        
+        if not rows:
+            return None
+        
+        return self._page_etag(page_key, [tuple(row) for row in rows])
+    
+    def _page_etag(self, page_key: str, rows: List[tuple]) -> str:
+        """ETag de una página a partir de (id, version, updated_at) de sus secciones"""
+        return make_etag("cms", page_key, rows)
+    
+    def _invalidate_page(self, page_key: str) -> None:
+        """Invalidar la caché pública de una página (y el contexto del chatbot) tras una escritura"""
+        page_cache.invalidate(page_key)
+        portfolio_index.invalidate_page(page_key)
+        response_cache.invalidate()
+    
     def create_section(
         self,
         section_data: PageContentCreate,
@@ -65,6 +163,7 @@ class CMSService:
         self.db.add(section)
         self.db.commit()
         self.db.refresh(section)
+        self._invalidate_page(section.page_key)
         
         return section
     
@@ -101,6 +200,7 @@ class CMSService:
         
         self.db.commit()
         self.db.refresh(section)
+        self._invalidate_page(page_key)
         
         return section
     
@@ -116,6 +216,7 @@ class CMSService:
         
         self.db.delete(section)
         self.db.commit()
+        self._invalidate_page(page_key)
         
         return True
     
@@ -177,6 +278,7 @@ class CMSService:
         
         self.db.commit()
         self.db.refresh(section)
+        self._invalidate_page(page_key)
         
         return section
     
@@ -269,6 +371,10 @@ class CMSService:
             "editable_sections": editable_sections
         }
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Obtener métricas de la caché de páginas públicas"""
+        return page_cache.stats()
+    
     def seed_default_content(self) -> List[PageContent]:
         """Crear contenido inicial por defecto"""
         default_sections = [
@@ -946,6 +1052,8 @@ class CMSService:
             self.db.commit()
             for section in created_sections:
                 self.db.refresh(section)
+            for page_key in {section.page_key for section in created_sections}:
+                self._invalidate_page(page_key)
         
         return created_sections
 
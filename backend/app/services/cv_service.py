@@ -1,10 +1,24 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
 from app.models.cv import CV
-from typing import Optional
+from datetime import datetime
+from typing import Iterator, NamedTuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Size of each partial read of the PDF when serving downloads
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # 256KB
+
+
+class CVDownloadInfo(NamedTuple):
+    """Metadata needed to serve a download (without the binary content)"""
+    id: int
+    filename: str
+    file_size: int
+    updated_at: datetime
+
 
 class CVService:
     """
@@ -21,6 +35,8 @@ class CVService:
         """
         Get the current CV (only one can exist)
         
+        The binary data is deferred and is not loaded by this query.
+        
         Returns:
             CV object if exists, None otherwise
         """
@@ -86,17 +102,56 @@ class CVService:
         Returns:
             True if CV exists, False otherwise
         """
-        return self.db.query(CV).count() > 0
+        return self.db.query(self.db.query(CV.id).exists()).scalar()
     
-    def get_cv_file_data(self) -> Optional[tuple[bytes, str]]:
+    def get_cv_download_info(self) -> Optional[CVDownloadInfo]:
         """
-        Get the CV file binary data and filename
+        Get the metadata needed to serve a download, without the binary data
         
         Returns:
-            Tuple of (file_data, filename) if CV exists, None otherwise
+            CVDownloadInfo if a CV exists, None otherwise
         """
-        cv = self.get_cv()
-        if cv:
-            return (cv.file_data, cv.filename)
-        return None
+        row = self.db.query(
+            CV.id, CV.filename, CV.file_size, CV.updated_at
+        ).first()
+        return CVDownloadInfo(*row) if row else None
+    
+    def read_file_chunk(self, cv_id: int, offset: int, length: int) -> Optional[bytes]:
+        """
+        Read a slice of the CV binary data directly in the database
+        
+        Args:
+            cv_id: ID of the CV
+            offset: Zero-based byte offset
+            length: Number of bytes to read
+            
+        Returns:
+            The requested bytes, or None if the CV no longer exists
+        """
+        chunk = self.db.query(
+            func.substring(CV.file_data, offset + 1, length)
+        ).filter(CV.id == cv_id).scalar()
+        return bytes(chunk) if chunk is not None else None
 
+
+def iter_cv_file(cv_id: int, start: int, end: int, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream the byte range [start, end] of the CV in fixed-size chunks
+    
+    Each chunk is read with its own short-lived session, so a slow client
+    never holds a pooled connection and memory usage does not depend on the
+    size of the file.
+    """
+    offset = start
+    while offset <= end:
+        length = min(chunk_size, end - offset + 1)
+        with SessionLocal() as db:
+            chunk = CVService(db).read_file_chunk(cv_id, offset, length)
+        
+        if not chunk:
+            # The CV was replaced or deleted while streaming
+            logger.warning(f"CV (id: {cv_id}) changed during download, stream truncated")
+            return
+        
+        yield chunk
+        offset += len(chunk)
@@ -0,0 +1,268 @@
+"""
+Service for generating responsive image derivatives (WebP/AVIF + placeholder)
+
+The CPU-bound work (decoding, resizing, encoding) runs in a process pool so
+API workers never block on it.
+"""
+import asyncio
+import base64
+import io
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Quality used for each derivative format
+VARIANT_QUALITY = {"webp": 80, "avif": 60}
+
+# Width in pixels of the blurred placeholder
+PLACEHOLDER_WIDTH = 16
+
+# Suffix of the sidecar manifest written next to the original image
+MANIFEST_SUFFIX = ".responsive.json"
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get (or lazily create) the shared image processing pool"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the image processing pool (called on application shutdown)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def manifest_path_for(image_path: Path) -> Path:
+    """Path of the sidecar manifest for an original image"""
+    return image_path.with_name(image_path.stem + MANIFEST_SUFFIX)
+
+
+def generate_variants(source_path: str, widths: List[int], formats: List[str]) -> dict:
+    """
+    Generate resized, metadata-free derivatives of an image (runs in a worker process)
+
+    Derivatives are written next to the original as `<stem>.<width>w.<format>`,
+    never wider than the original. EXIF (including GPS data) is dropped; the
+    orientation is applied to the pixels first. A sidecar manifest describing
+    the derivatives is written as `<stem>.responsive.json`.
+
+    Args:
+        source_path: Path to the original image
+        widths: Target widths in pixels
+        formats: Target formats ("webp", "avif"); unsupported ones are skipped
+
+    Returns:
+        Manifest dict with original dimensions, variant files and placeholder
+    """
+    from PIL import Image, ImageFilter, ImageOps, features
+
+    source = Path(source_path)
+    formats = [fmt for fmt in formats if features.check(fmt)]
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        icc_profile = original.info.get("icc_profile")
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+    image.info = {}
+
+    width, height = image.size
+    target_widths = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+
+    variants = []
+    for target_width in target_widths:
+        target_height = max(1, round(height * target_width / width))
+        resized = image if target_width == width else image.resize(
+            (target_width, target_height), Image.Resampling.LANCZOS
+        )
+
+        for fmt in formats:
+            filename = f"{source.stem}.{target_width}w.{fmt}"
+            variant_path = source.with_name(filename)
+            tmp_path = source.with_name(f".{filename}.part")
+            save_kwargs = {"quality": VARIANT_QUALITY.get(fmt, 80)}
+            if icc_profile:
+                save_kwargs["icc_profile"] = icc_profile
+            resized.save(tmp_path, format=fmt.upper(), **save_kwargs)
+            os.replace(tmp_path, variant_path)
+
+            variants.append({
+                "filename": filename,
+                "width": target_width,
+                "height": target_height,
+                "format": fmt,
+                "size": variant_path.stat().st_size
+            })
+
+    # Tiny blurred placeholder, inlined as a data URI
+    placeholder = image.copy()
+    placeholder.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH))
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    placeholder.save(buffer, format="WEBP", quality=30)
+    placeholder_uri = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    manifest = {
+        "width": width,
+        "height": height,
+        "variants": variants,
+        "placeholder": placeholder_uri
+    }
+
+    tmp_manifest = source.with_name(f".{source.stem}{MANIFEST_SUFFIX}.part")
+    tmp_manifest.write_text(json.dumps(manifest))
+    os.replace(tmp_manifest, manifest_path_for(source))
+
+    return manifest
+
+
+class ImageService:
+    """Service for the responsive image pipeline"""
+
+    def __init__(self):
+        self.upload_dir = Path(settings.UPLOAD_DIR)
+
+    async def create_responsive_variants(self, image_path: Path, image_url: str) -> Optional[dict]:
+        """
+        Generate derivatives for an uploaded image in the process pool
+
+        Args:
+            image_path: Path of the original image on disk
+            image_url: Public URL of the original image
+
+        Returns:
+            Responsive manifest with URLs and srcset strings, or None if the
+            image could not be processed (the original upload is kept)
+        """
+        # Deduplicated uploads already have their derivatives
+        existing = self.get_responsive_manifest(image_url)
+        if existing is not None:
+            return existing
+
+        loop = asyncio.get_running_loop()
+        try:
+            manifest = await loop.run_in_executor(
+                get_process_pool(),
+                generate_variants,
+                str(image_path),
+                settings.IMAGE_VARIANT_WIDTHS,
+                settings.IMAGE_VARIANT_FORMATS
+            )
+        except Exception as e:
+            logger.warning(f"Could not generate responsive variants for {image_path}: {str(e)}")
+            return None
+
+        return self._with_urls(manifest, image_url)
+
+    def get_responsive_manifest(self, image_url: str) -> Optional[dict]:
+        """
+        Get the responsive manifest of a previously uploaded image
+
+        Args:
+            image_url: Public URL of the original image (/uploads/...)
+
+        Returns:
+            Manifest with URLs and srcset strings, or None if the image has
+            no derivatives
+        """
+        if not image_url.startswith("/uploads/"):
+            return None
+
+        image_path = (self.upload_dir / image_url[len("/uploads/"):]).resolve()
+        if self.upload_dir.resolve() not in image_path.parents:
+            return None
+
+        manifest_path = manifest_path_for(image_path)
+        if not manifest_path.is_file():
+            return None
+
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Invalid responsive manifest {manifest_path}: {str(e)}")
+            return None
+
+        return self._with_urls(manifest, image_url)
+
+    def delete_variants(self, image_path: Path) -> int:
+        """
+        Delete the derivatives and manifest of an original image
+
+        Returns:
+            Number of files deleted
+        """
+        manifest_path = manifest_path_for(image_path)
+        if not manifest_path.is_file():
+            return 0
+
+        deleted = 0
+        try:
+            manifest = json.loads(manifest_path.read_text())
+            for variant in manifest.get("variants", []):
+                variant_path = image_path.with_name(variant["filename"])
+                if variant_path.is_file():
+                    variant_path.unlink()
+                    deleted += 1
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not delete variants of {image_path}: {str(e)}")
+
+        manifest_path.unlink(missing_ok=True)
+        return deleted
+
+    def pick_variant(self, manifest: dict, width: int, fmt: str = "webp") -> Optional[str]:
+        """
+        Choose the smallest derivative at least `width` pixels wide
+        (or the largest available if none is wide enough)
+        """
+        candidates = sorted(
+            (v for v in manifest["variants"] if v["format"] == fmt),
+            key=lambda v: v["width"]
+        )
+        if not candidates:
+            return None
+
+        for variant in candidates:
+            if variant["width"] >= width:
+                return variant["url"]
+        return candidates[-1]["url"]
+
+    def _with_urls(self, manifest: dict, image_url: str) -> dict:
+        """Add public URLs and per-format srcset strings to a manifest"""
+        base_url = image_url.rsplit("/", 1)[0]
+
+        variants = [
+            {**variant, "url": f"{base_url}/{variant['filename']}"}
+            for variant in manifest["variants"]
+        ]
+
+        srcset = {}
+        for variant in variants:
+            srcset.setdefault(variant["format"], []).append(f"{variant['url']} {variant['width']}w")
+
+        return {
+            "src": image_url,
+            "width": manifest["width"],
+            "height": manifest["height"],
+            "placeholder": manifest["placeholder"],
+            "srcset": {fmt: ", ".join(entries) for fmt, entries in srcset.items()},
+            "variants": variants
+        }
@@ -0,0 +1,312 @@
+"""
+Retrieval index of portfolio content (projects and CMS sections) for the chatbot
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.page_content import PageContent
+from app.models.project import Project
+from app.services.chatbot_cache import normalize_message
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Maximum length of a snippet injected into the prompt
+SNIPPET_MAX_LENGTH = 400
+
+# CMS content keys that never hold readable text
+IGNORED_CONTENT_KEYS = {"icon", "image", "url", "href", "link", "color", "style", "class", "variant", "avatar"}
+
+STOPWORDS = {
+    # español
+    "a", "al", "como", "con", "de", "del", "el", "en", "es", "esta", "este", "la", "las", "lo", "los",
+    "mas", "me", "mi", "para", "por", "que", "se", "sin", "su", "sus", "te", "tu", "un", "una", "y", "o",
+    "hay", "tiene", "usa", "sobre", "cual", "cuales", "quien",
+    # english
+    "an", "and", "are", "does", "for", "how", "in", "is", "it", "of", "on", "or", "the", "to",
+    "what", "which", "who", "with", "he", "his", "you", "your", "do", "use", "uses",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized terms of a text (accents, punctuation and stopwords removed)"""
+    return [term for term in normalize_message(text).split() if term not in STOPWORDS and len(term) > 1]
+
+
+class Document(NamedTuple):
+    """Indexed document: the text used for ranking and the snippet shown to the LLM"""
+    doc_id: str
+    snippet: str
+    terms: Counter
+    length: int
+
+
+class BM25Index:
+    """
+    In-memory BM25 index supporting incremental insert/update/remove
+
+    Document frequencies and the total length are maintained on every
+    change, so updating one document does not re-index the rest.
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, Document] = {}
+        self.document_frequency: Counter = Counter()
+        self.total_length = 0
+
+    def upsert(self, doc_id: str, text: str, snippet: str) -> None:
+        """Add or replace a document"""
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        document = Document(doc_id, snippet, terms, sum(terms.values()))
+        self.documents[doc_id] = document
+        self.document_frequency.update(terms.keys())
+        self.total_length += document.length
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document (no-op if it is not indexed)"""
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        for term in document.terms:
+            self.document_frequency[term] -= 1
+            if self.document_frequency[term] <= 0:
+                del self.document_frequency[term]
+        self.total_length -= document.length
+
+    def search(self, query: str, k: int) -> List[Document]:
+        """Top-k documents for a query (documents without any query term are skipped)"""
+        query_terms = set(tokenize(query))
+        if not query_terms or not self.documents:
+            return []
+
+        total = len(self.documents)
+        average_length = self.total_length / total if total else 0
+        scored = []
+
+        for document in self.documents.values():
+            score = 0.0
+            for term in query_terms:
+                frequency = document.terms.get(term)
+                if not frequency:
+                    continue
+                df = self.document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * document.length / (average_length or 1))
+                score += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            if score > 0:
+                scored.append((score, document))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [document for _, document in scored[:k]]
+
+
+def _truncate(text: str) -> str:
+    """Collapse whitespace and cut a snippet to SNIPPET_MAX_LENGTH"""
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_MAX_LENGTH else text[:SNIPPET_MAX_LENGTH - 1].rstrip() + "…"
+
+
+def _content_strings(value: Any) -> Iterable[str]:
+    """Readable strings inside CMS section content (URLs, icons and styles skipped)"""
+    if isinstance(value, str):
+        text = value.strip()
+        if text and not text.startswith(("http://", "https://", "/", "#", "data:")):
+            yield text
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if str(key).lower() not in IGNORED_CONTENT_KEYS:
+                yield from _content_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _content_strings(item)
+
+
+def _technology_names(technologies: Any) -> List[str]:
+    """Names of the enabled technologies of a project (objects or legacy strings)"""
+    names = []
+    for tech in technologies or []:
+        if isinstance(tech, dict):
+            if tech.get("enabled", True) and tech.get("name"):
+                names.append(str(tech["name"]))
+        elif isinstance(tech, str):
+            names.append(tech)
+    return names
+
+
+class PortfolioIndex:
+    """
+    Retrieval layer over published projects and active CMS sections
+
+    The index is built lazily from the database on first use and kept up to
+    date by ProjectService/CMSService writes. It is local to each worker
+    process, so it is also rebuilt after CHATBOT_INDEX_MAX_AGE seconds to
+    pick up writes handled by other workers.
+
+    Database reads never run on the event loop: rebuilds and CMS page
+    re-indexing happen in the threadpool, one at a time, shared by every
+    search that needs them.
+    """
+
+    def __init__(self):
+        self._index = BM25Index()
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._stale_pages: Set[str] = set()
+        self._refresh: Optional[asyncio.Future] = None
+
+    async def search(self, db: Optional[Session], question: str, k: int) -> List[str]:
+        """Snippets of the k documents most relevant to a question"""
+        if db is not None and (self._is_stale() or self._stale_pages):
+            await self._refresh_off_loop(db.get_bind())
+
+        with self._lock:
+            return [document.snippet for document in self._index.search(question, k)]
+
+    async def _refresh_off_loop(self, bind) -> None:
+        """
+        Bring the index up to date in the threadpool (single-flight)
+
+        Concurrent searches await the same refresh. It uses its own session,
+        so a search cancelled meanwhile (client disconnected) does not stop
+        it for the others. On failure the current index keeps being served.
+        """
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(run_in_threadpool(self._refresh_with, bind))
+        try:
+            await asyncio.shield(self._refresh)
+        except Exception as e:
+            logger.warning(f"Could not refresh the portfolio index: {e}")
+
+    def _refresh_with(self, bind) -> None:
+        """Rebuild the index (or re-index the modified CMS pages) with a new session"""
+        db = Session(bind=bind)
+        try:
+            if self._is_stale():
+                self.rebuild(db)
+            else:
+                self._reindex_pages(db)
+        finally:
+            db.close()
+
+    def rebuild(self, db: Session) -> None:
+        """Rebuild the whole index from the database (blocking)"""
+        with self._lock:
+            self._stale_pages.clear()
+
+        index = BM25Index()
+
+        for project in db.query(Project).filter(Project.is_published == True).all():
+            index.upsert(*self._project_document(project))
+
+        for section in db.query(PageContent).filter(PageContent.is_active == True).all():
+            index.upsert(*self._section_document(section))
+
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Portfolio index built with {len(index.documents)} documents")
+
+    def upsert_project(self, project: Project) -> None:
+        """Index (or un-index, if unpublished) a project after a write"""
+        if not self._is_loaded():
+            return
+        with self._lock:
+            if project.is_published:
+                self._index.upsert(*self._project_document(project))
+            else:
+                self._index.remove(f"project:{project.id}")
+
+    def remove_project(self, project_id: int) -> None:
+        """Remove a deleted project from the index"""
+        if not self._is_loaded():
+            return
+        with self._lock:
+            self._index.remove(f"project:{project_id}")
+
+    def invalidate_page(self, page_key: str) -> None:
+        """Mark a CMS page for re-indexing after a write (done off the loop by the next search)"""
+        if not self._is_loaded():
+            return
+        with self._lock:
+            self._stale_pages.add(page_key)
+
+    def _reindex_pages(self, db: Session) -> None:
+        """Re-index the active sections of the CMS pages marked stale (blocking)"""
+        with self._lock:
+            pages, self._stale_pages = self._stale_pages, set()
+        if not pages:
+            return
+
+        try:
+            sections = db.query(PageContent).filter(
+                PageContent.page_key.in_(pages),
+                PageContent.is_active == True
+            ).all()
+        except Exception:
+            with self._lock:
+                self._stale_pages.update(pages)
+            raise
+
+        prefixes = tuple(f"page:{page_key}:" for page_key in pages)
+        with self._lock:
+            for doc_id in [doc_id for doc_id in self._index.documents if doc_id.startswith(prefixes)]:
+                self._index.remove(doc_id)
+            for section in sections:
+                self._index.upsert(*self._section_document(section))
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and age"""
+        with self._lock:
+            return {
+                "documents": len(self._index.documents),
+                "terms": len(self._index.document_frequency),
+                "age_seconds": round(time.monotonic() - self._loaded_at) if self._loaded_at is not None else None,
+            }
+
+    def _is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > settings.CHATBOT_INDEX_MAX_AGE
+
+    def _project_document(self, project: Project) -> tuple:
+        """(doc_id, text, snippet) of a project"""
+        technologies = _technology_names(project.technologies)
+        tags = [str(tag) for tag in (project.tags or [])]
+        summary = project.short_description or project.description or ""
+
+        text = " ".join([project.title, project.title, summary, project.description or "", *technologies, *tags])
+
+        snippet = f"Proyecto «{project.title}»: {summary}"
+        if technologies:
+            snippet += f" Tecnologías: {', '.join(technologies)}."
+        if tags:
+            snippet += f" Tags: {', '.join(tags)}."
+        if project.github_url:
+            snippet += f" GitHub: {project.github_url}"
+
+        return f"project:{project.id}", text, _truncate(snippet)
+
+    def _section_document(self, section: PageContent) -> tuple:
+        """(doc_id, text, snippet) of a CMS section"""
+        body = " ".join(_content_strings(section.content))
+        text = f"{section.title} {section.page_key} {body}"
+        snippet = f"Página «{section.page_key}» / {section.title}: {body}"
+        return f"page:{section.page_key}:{section.section_key}", text, _truncate(snippet)
+
+
+portfolio_index = PortfolioIndex()
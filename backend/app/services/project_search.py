@@ -0,0 +1,131 @@
+"""
+Búsqueda de texto completo de proyectos (PostgreSQL tsvector + pg_trgm)
+"""
+import html
+import re
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import desc, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.project import Project
+
+# Configuración de texto de la columna search_vector (ver migración projects_search_vector)
+SEARCH_CONFIG = "simple"
+
+# Términos de una consulta que se tienen en cuenta
+MAX_QUERY_TERMS = 8
+
+# Marcadores de ts_headline: caracteres de control que no aparecen en el
+# contenido, para poder escapar el HTML y después insertar <mark>
+_START_SEL = "\x02"
+_STOP_SEL = "\x03"
+HEADLINE_OPTIONS = f"StartSel={_START_SEL}, StopSel={_STOP_SEL}, MaxWords=35, MinWords=15, MaxFragments=2"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def build_tsquery(text: str) -> Optional[str]:
+    """
+    Convertir la búsqueda del usuario en una expresión de to_tsquery
+
+    Solo se conservan palabras (sin operadores de tsquery) y cada una se
+    busca como prefijo (`term:*`), así "pyth" ya encuentra "Python".
+    """
+    terms = _TERM.findall(text.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def tsquery(text: str):
+    """Expresión SQL to_tsquery para la búsqueda del usuario (None si no hay términos)"""
+    expression = build_tsquery(text)
+    if expression is None:
+        return None
+    return func.to_tsquery(SEARCH_CONFIG, expression)
+
+
+def _highlight(fragment: Optional[str]) -> Optional[str]:
+    """Escapar el HTML de un fragmento y convertir los marcadores en <mark>"""
+    if not fragment:
+        return None
+    escaped = html.escape(fragment)
+    return escaped.replace(_START_SEL, "<mark>").replace(_STOP_SEL, "</mark>")
+
+
+class SearchHit(NamedTuple):
+    """Resultado de búsqueda: proyecto, relevancia y fragmentos resaltados"""
+    project: Project
+    rank: float
+    match: str  # "fulltext" o "fuzzy"
+    title: Optional[str]
+    snippet: Optional[str]
+
+
+class ProjectSearchService:
+    """
+    Búsqueda de proyectos ordenada por relevancia
+
+    1. Texto completo sobre `search_vector` (índice GIN), ordenado con
+       ts_rank_cd; los fragmentos resaltados (ts_headline, costoso) solo se
+       calculan para la página de resultados.
+    2. Si no hay coincidencias, búsqueda aproximada por trigramas sobre el
+       título (índice GIN pg_trgm), para errores de escritura.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self, text: str, limit: int = 10, include_unpublished: bool = False) -> List[SearchHit]:
+        """Buscar proyectos"""
+        hits = self._fulltext(text, limit, include_unpublished)
+        if not hits:
+            hits = self._fuzzy(text, limit, include_unpublished)
+        return hits
+
+    def _fulltext(self, text: str, limit: int, include_unpublished: bool) -> List[SearchHit]:
+        query = tsquery(text)
+        if query is None:
+            return []
+
+        rank = func.ts_rank_cd(Project.search_vector, query)
+        ranked = select(Project.id.label("id"), rank.label("rank")).where(Project.search_vector.op("@@")(query))
+        if not include_unpublished:
+            ranked = ranked.where(Project.is_published == True)
+        ranked = ranked.order_by(desc("rank"), desc(Project.view_count)).limit(limit).subquery()
+
+        body = func.coalesce(func.nullif(Project.short_description, ""), Project.description)
+        rows = self.db.execute(
+            select(
+                Project,
+                ranked.c.rank,
+                func.ts_headline(SEARCH_CONFIG, Project.title, query, "HighlightAll=true, " + HEADLINE_OPTIONS),
+                func.ts_headline(SEARCH_CONFIG, body, query, HEADLINE_OPTIONS)
+            )
+            .join(ranked, ranked.c.id == Project.id)
+            .order_by(desc(ranked.c.rank), desc(Project.view_count))
+        ).all()
+
+        return [
+            SearchHit(project, float(rank_value), "fulltext", _highlight(title), _highlight(snippet))
+            for project, rank_value, title, snippet in rows
+        ]
+
+    def _fuzzy(self, text: str, limit: int, include_unpublished: bool) -> List[SearchHit]:
+        text = " ".join(_TERM.findall(text))
+        if not text:
+            return []
+
+        similarity = func.word_similarity(text, Project.title)
+        # `<%` usa el índice de trigramas (umbral pg_trgm.word_similarity_threshold)
+        query = select(Project, similarity.label("rank")).where(literal(text).op("<%")(Project.title))
+        if not include_unpublished:
+            query = query.where(Project.is_published == True)
+
+        rows = self.db.execute(query.order_by(desc("rank"), desc(Project.view_count)).limit(limit)).all()
+
+        return [
+            SearchHit(project, float(rank_value), "fuzzy", html.escape(project.title), None)
+            for project, rank_value in rows
+        ]
@@ -1,16 +1,74 @@
 """
 Servicio para gestión de proyectos
 """
-from typing import List, Optional
+import logging
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, func, select, text, tuple_
 from fastapi import HTTPException, status
+from app.core.cache import VersionedLRUCache
+from app.core.config import settings
+from app.core.pagination import decode_cursor, invalid_cursor, parse_cursor_datetime, split_page
 from app.models.project import Project
 from app.models.user import User
 from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectResponse, ProjectPublic
-from app.services.upload_service import UploadService
+from app.services.chatbot_cache import response_cache
+from app.services.project_search import tsquery
+from app.services.portfolio_index import portfolio_index
+from app.services.upload_service import REFERENCE_COLUMNS, UploadService
+from app.services.view_counter import view_counter
 from slugify import slugify
 
+logger = logging.getLogger(__name__)
+
+# Columnas de Project que pueden contener URLs de archivos subidos
+PROJECT_UPLOAD_COLUMNS = dict(REFERENCE_COLUMNS)[Project]
+
+
+def project_blob_keys(upload_service: UploadService, project: Project) -> set:
+    """SHA-256 de los blobs del almacén referenciados por un proyecto"""
+    return upload_service.blob_keys(getattr(project, column) for column in PROJECT_UPLOAD_COLUMNS)
+
+
+# Resumen de estadísticas (contadores + más visto serializado), invalidado en cada
+# escritura de proyectos y en cada volcado de vistas
+STATS_CACHE_KEY = "project_stats"
+project_stats_cache: VersionedLRUCache[dict] = VersionedLRUCache(
+    max_entries=1,
+    ttl=settings.PROJECT_STATS_CACHE_TTL
+)
+
+
+def invalidate_project_stats() -> None:
+    """Invalidar el resumen de estadísticas de proyectos"""
+    project_stats_cache.invalidate(STATS_CACHE_KEY)
+
+
+# Proyectos con tecnologías en formato antiguo (strings en lugar de objetos)
+# (CASE garantiza que json_array_elements solo se evalúe sobre arrays)
+LEGACY_TECHNOLOGIES_CONDITION = """
+    CASE WHEN json_typeof(technologies) = 'array' THEN EXISTS (
+        SELECT 1 FROM json_array_elements(technologies) AS tech
+        WHERE json_typeof(tech) = 'string'
+    ) ELSE false END
+"""
+
+# Conversión en una sola sentencia: cada string pasa a {"name", "icon", "enabled"}
+MIGRATE_TECHNOLOGIES_SQL = f"""
+    UPDATE projects
+    SET technologies = (
+        SELECT json_agg(
+            CASE WHEN json_typeof(tech) = 'string'
+                THEN json_build_object('name', tech #>> '{{}}', 'icon', '', 'enabled', true)
+                ELSE tech
+            END
+            ORDER BY position
+        )
+        FROM json_array_elements(technologies) WITH ORDINALITY AS t(tech, position)
+    )
+    WHERE {LEGACY_TECHNOLOGIES_CONDITION}
+"""
+
 
 class ProjectService:
     """Servicio para manejo de proyectos"""
@@ -18,26 +76,25 @@ class ProjectService:
     def __init__(self, db: Session):
         self.db = db
     
-    def _migrate_technologies(self, project: Project) -> Project:
+    def count_legacy_technologies(self) -> int:
+        """Número de proyectos con tecnologías aún en formato antiguo"""
+        return self.db.execute(
+            text(f"SELECT count(*) FROM projects WHERE {LEGACY_TECHNOLOGIES_CONDITION}")
+        ).scalar()
+    
+    def migrate_legacy_technologies(self) -> int:
         """
         Migrar tecnologías de formato antiguo (strings) a nuevo formato (objetos)
+        
+        Una sola sentencia UPDATE para todos los proyectos afectados; las
+        lecturas no modifican datos.
+        
+        Returns:
+            Número de proyectos migrados
         """
-        if project.technologies and isinstance(project.technologies, list):
-            # Verificar si el primer elemento es string (formato antiguo)
-            if len(project.technologies) > 0 and isinstance(project.technologies[0], str):
-                # Convertir a nuevo formato
-                project.technologies = [
-                    {
-                        "name": tech,
-                        "icon": "",  # Sin icono por defecto
-                        "enabled": True
-                    }
-                    for tech in project.technologies
-                ]
-                # Guardar cambios
-                self.db.commit()
-                self.db.refresh(project)
-        return project
+        migrated = self.db.execute(text(MIGRATE_TECHNOLOGIES_SQL)).rowcount
+        self.db.commit()
+        return migrated
     
     def create_project(self, project_data: ProjectCreate, owner: User) -> Project:
         """Crear nuevo proyecto"""
@@ -63,6 +120,11 @@ class ProjectService:
         self.db.commit()
         self.db.refresh(db_project)
         
+        # Las respuestas del chatbot dependen de los proyectos
+        portfolio_index.upsert_project(db_project)
+        response_cache.invalidate()
+        invalidate_project_stats()
+        
         return db_project
     
     def get_project_by_id(self, project_id: int, include_unpublished: bool = False) -> Optional[Project]:
@@ -72,10 +134,7 @@ class ProjectService:
         if not include_unpublished:
             query = query.filter(Project.is_published == True)
         
-        project = query.first()
-        if project:
-            project = self._migrate_technologies(project)
-        return project
+        return query.first()
     
     def get_project_by_slug(self, slug: str, include_unpublished: bool = False) -> Optional[Project]:
         """Obtener proyecto por slug"""
@@ -84,20 +143,30 @@ class ProjectService:
         if not include_unpublished:
             query = query.filter(Project.is_published == True)
         
-        project = query.first()
-        if project:
-            project = self._migrate_technologies(project)
-        return project
+        return query.first()
     
-    def get_projects(
-        self, 
-        skip: int = 0, 
-        limit: int = 10,
+    @staticmethod
+    def listing_key(project: Project) -> tuple:
+        """Clave de ordenación del listado (order_index, created_at, id), usada en los cursores"""
+        return (project.order_index, project.created_at, project.id)
+    
+    # Columnas de las que depende el ETag de un proyecto. view_count se incluye
+    # porque las vistas se vuelcan sin tocar updated_at y forman parte del cuerpo
+    ETAG_COLUMNS = (Project.id, Project.updated_at, Project.view_count)
+    
+    @staticmethod
+    def etag_key(project: Project) -> tuple:
+        """Valores de ETAG_COLUMNS de un proyecto ya cargado"""
+        return (project.id, project.updated_at, project.view_count)
+    
+    def _build_projects_query(
+        self,
         include_unpublished: bool = False,
         featured_only: bool = False,
-        search: Optional[str] = None
-    ) -> List[Project]:
-        """Obtener lista de proyectos"""
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
+    ):
+        """Construir la consulta filtrada y ordenada de proyectos"""
         query = self.db.query(Project)
         
         # Filtros
@@ -108,23 +177,88 @@ class ProjectService:
             query = query.filter(Project.is_featured == True)
         
         if search:
-            search_term = f"%{search}%"
+            # Texto completo sobre search_vector (índice GIN); ranking en /projects/search
+            search_query = tsquery(search)
+            if search_query is not None:
+                query = query.filter(Project.search_vector.op("@@")(search_query))
+        
+        # Keyset: filas estrictamente después de la última de la página anterior
+        # (usa el índice ix_projects_listing en lugar de recorrer y descartar filas)
+        if cursor:
+            order_index, created_at, project_id = decode_cursor(cursor, 3)
+            if not isinstance(order_index, int) or not isinstance(project_id, int):
+                raise invalid_cursor()
             query = query.filter(
-                Project.title.ilike(search_term) |
-                Project.description.ilike(search_term) |
-                Project.technologies.astext.ilike(search_term)
+                tuple_(Project.order_index, Project.created_at, Project.id) <
+                tuple_(order_index, parse_cursor_datetime(created_at), project_id)
             )
         
-        # Ordenar por order_index y fecha
-        query = query.order_by(desc(Project.order_index), desc(Project.created_at))
+        # Ordenar por order_index y fecha (id como desempate: orden total para los cursores)
+        return query.order_by(desc(Project.order_index), desc(Project.created_at), desc(Project.id))
+    
+    def get_projects(
+        self, 
+        skip: int = 0, 
+        limit: int = 10,
+        include_unpublished: bool = False,
+        featured_only: bool = False,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[Project]:
+        """
+        Obtener lista de proyectos
         
-        projects = query.offset(skip).limit(limit).all()
+        Con `cursor` (de una página anterior) se ignora `skip`: la página se
+        obtiene por keyset, con coste constante sea cual sea su profundidad.
+        """
+        query = self._build_projects_query(include_unpublished, featured_only, search, cursor)
         
-        # Migrar tecnologías de formato antiguo a nuevo
-        for project in projects:
-            self._migrate_technologies(project)
+        if not cursor:
+            query = query.offset(skip)
+        return query.limit(limit).all()
+    
+    def get_projects_page(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        include_unpublished: bool = False,
+        featured_only: bool = False,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Project], Optional[str]]:
+        """
+        Obtener una página del listado y el cursor de la siguiente
         
-        return projects
+        Se pide una fila de más para saber si hay otra página; el cursor es
+        None en la última.
+        """
+        rows = self.get_projects(skip, limit + 1, include_unpublished, featured_only, search, cursor)
+        return split_page(rows, limit, self.listing_key)
+    
+    def get_projects_fingerprint(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        include_unpublished: bool = False,
+        featured_only: bool = False,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[tuple], bool]:
+        """
+        Obtener ETAG_COLUMNS de los proyectos de una página del listado
+        sin cargar las filas completas (usado para construir ETags)
+        
+        Returns:
+            Tupla (filas de la página, si hay una página siguiente)
+        """
+        query = self._build_projects_query(include_unpublished, featured_only, search, cursor)
+        query = query.with_entities(*self.ETAG_COLUMNS)
+        
+        if not cursor:
+            query = query.offset(skip)
+        rows = query.limit(limit + 1).all()
+        
+        return [tuple(row) for row in rows[:limit]], len(rows) > limit
     
     def update_project(self, project_id: int, project_data: ProjectUpdate, owner: User) -> Project:
         """Actualizar proyecto"""
@@ -154,12 +288,22 @@ class ProjectService:
                     detail="El slug ya existe"
                 )
         
+        # Blobs que el proyecto deja de referenciar (liberados tras el commit)
+        upload_service = UploadService()
+        previous_blobs = project_blob_keys(upload_service, project)
+        
         for field, value in update_data.items():
             setattr(project, field, value)
         
         self.db.commit()
         self.db.refresh(project)
         
+        portfolio_index.upsert_project(project)
+        response_cache.invalidate()
+        invalidate_project_stats()
+        
+        upload_service.release_keys(previous_blobs - project_blob_keys(upload_service, project), self.db)
+        
         return project
     
     def delete_project(self, project_id: int, owner: User) -> bool:
@@ -180,62 +324,119 @@ class ProjectService:
         deleted = upload_service.delete_project_folder(project.id)
         
         if deleted:
-            print(f"Carpeta completa del proyecto ID {project.id} eliminada")
+            logger.info(f"Carpeta completa del proyecto ID {project.id} eliminada")
         else:
-            print(f"No se encontró carpeta para el proyecto ID {project.id}")
+            logger.info(f"No se encontró carpeta para el proyecto ID {project.id}")
+        
+        # Blobs del almacén compartido: se liberan tras el commit si nadie más los usa
+        blobs = project_blob_keys(upload_service, project)
         
         # Eliminar proyecto de la base de datos
         self.db.delete(project)
         self.db.commit()
         
+        portfolio_index.remove_project(project_id)
+        response_cache.invalidate()
+        invalidate_project_stats()
+        
+        upload_service.release_keys(blobs, self.db)
+        
         return True
     
     def increment_view_count(self, project_id: int) -> bool:
-        """Incrementar contador de vistas"""
-        project = self.db.query(Project).filter(Project.id == project_id).first()
-        if project:
-            project.view_count += 1
-            self.db.commit()
+        """
+        Incrementar contador de vistas
+        
+        La vista se acumula en memoria (`view_counter`) y se escribe en lote;
+        aquí solo se comprueba que el proyecto exista.
+        """
+        exists = self.db.query(Project.id).filter(Project.id == project_id).first()
+        if exists:
+            view_counter.record(project_id)
             return True
         return False
     
     def get_featured_projects(self, limit: int = 6) -> List[Project]:
         """Obtener proyectos destacados"""
-        projects = self.db.query(Project).filter(
+        return self.db.query(Project).filter(
+            Project.is_published == True,
+            Project.is_featured == True
+        ).order_by(desc(Project.order_index), desc(Project.created_at)).limit(limit).all()
+    
+    def get_featured_fingerprint(self, limit: int = 6) -> List[tuple]:
+        """Obtener ETAG_COLUMNS de los proyectos destacados (para ETags)"""
+        rows = self.db.query(*self.ETAG_COLUMNS).filter(
             Project.is_published == True,
             Project.is_featured == True
         ).order_by(desc(Project.order_index), desc(Project.created_at)).limit(limit).all()
         
-        # Migrar tecnologías
-        for project in projects:
-            self._migrate_technologies(project)
+        return [tuple(row) for row in rows]
+    
+    def get_project_fingerprint(self, identifier: str, include_unpublished: bool = False) -> Optional[tuple]:
+        """
+        Obtener ETAG_COLUMNS de un proyecto por ID o slug sin cargar la fila
+        completa (usado para construir ETags)
+        """
+        query = self.db.query(*self.ETAG_COLUMNS)
+        
+        if not include_unpublished:
+            query = query.filter(Project.is_published == True)
+        
+        row = None
+        if identifier.isdigit():
+            row = query.filter(Project.id == int(identifier)).first()
         
-        return projects
+        if not row:
+            row = query.filter(Project.slug == identifier).first()
+        
+        return tuple(row) if row else None
     
     def get_project_stats(self) -> dict:
-        """Obtener estadísticas de proyectos"""
-        total_projects = self.db.query(Project).count()
-        published_projects = self.db.query(Project).filter(Project.is_published == True).count()
-        featured_projects = self.db.query(Project).filter(Project.is_featured == True).count()
-        
-        # Proyecto más visto
-        most_viewed = self.db.query(Project).filter(
-            Project.is_published == True
-        ).order_by(desc(Project.view_count)).first()
-        
-        # Total de vistas
-        total_views = self.db.query(Project).with_entities(
-            Project.view_count
-        ).filter(Project.is_published == True).all()
-        total_views = sum([v[0] for v in total_views])
-        
-        return {
-            "total_projects": total_projects,
-            "published_projects": published_projects,
-            "featured_projects": featured_projects,
-            "total_views": total_views,
-            "most_viewed": most_viewed
-        }
+        """
+        Obtener estadísticas de proyectos
+        
+        El resumen se cachea ya con el proyecto más visto serializado
+        (ProjectPublic): una petición con el resumen en caché no consulta la
+        base de datos.
+        """
+        summary = project_stats_cache.get(STATS_CACHE_KEY)
+        
+        if summary is None:
+            version = project_stats_cache.version(STATS_CACHE_KEY)
+            summary = self._compute_stats_summary()
+            
+            # Proyecto más visto (por clave primaria)
+            most_viewed_id = summary.pop("most_viewed_id")
+            most_viewed = self.db.get(Project, most_viewed_id) if most_viewed_id is not None else None
+            summary["most_viewed"] = ProjectPublic.model_validate(most_viewed) if most_viewed else None
+            
+            project_stats_cache.set(STATS_CACHE_KEY, summary, version)
+        
+        return dict(summary)
+    
+    def _compute_stats_summary(self) -> dict:
+        """Contadores, total de vistas e id del proyecto más visto en una sola consulta"""
+        published = Project.is_published == True
+        
+        most_viewed_id = (
+            select(Project.id)
+            .where(published)
+            .order_by(desc(Project.view_count))
+            .limit(1)
+            .scalar_subquery()
+        )
+        
+        row = self.db.execute(
+            select(
+                func.count().label("total_projects"),
+                func.count().filter(published).label("published_projects"),
+                func.count().filter(Project.is_featured == True).label("featured_projects"),
+                func.coalesce(func.sum(Project.view_count).filter(published), 0).label("total_views"),
+                most_viewed_id.label("most_viewed_id")
+            ).select_from(Project)
+        ).one()
+        
+        return dict(row._mapping)
     
     def _generate_unique_slug(self, base_slug: str) -> str:
         """Generar slug único"""
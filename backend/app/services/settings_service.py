@@ -21,6 +21,14 @@ class SettingsService:
         """
         return self.db.query(Settings).first()
     
+    def get_settings_fingerprint(self) -> Optional[tuple]:
+        """
+        Obtener (id, updated_at) de la configuración sin cargar la fila completa
+        (usado para construir el ETag de la configuración pública)
+        """
+        row = self.db.query(Settings.id, Settings.updated_at).first()
+        return tuple(row) if row else None
+    
     def get_or_create_settings(self) -> Settings:
         """
         Obtener configuración o crear una por defecto si no existe
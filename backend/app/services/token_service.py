@@ -0,0 +1,190 @@
+"""
+Servicio de tokens: emisión, rotación y revocación de refresh tokens
+"""
+import calendar
+import secrets
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    permission_claims,
+    revoked_sessions,
+    verify_refresh_token
+)
+from app.core.user_cache import get_user_by_subject
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.schemas.user import Token
+
+
+def _new_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def _timestamp(value: datetime) -> float:
+    """Timestamp de un datetime UTC naive (como los guardados en la base de datos)"""
+    return float(calendar.timegm(value.utctimetuple()))
+
+
+class TokenService:
+    """
+    Servicio para el ciclo de vida de los tokens
+
+    - Access token: vida corta (ACCESS_TOKEN_EXPIRE_MINUTES), con rol y
+      permisos como claims; se verifica sin consultar la base de datos.
+    - Refresh token: se guarda en `refresh_tokens` y se rota en cada uso.
+      Reutilizar un refresh token ya rotado indica que fue robado, así que se
+      revoca la sesión completa (toda la familia), salvo dentro de
+      REFRESH_REUSE_GRACE_SECONDS tras la rotación: eso es una carrera
+      benigna (p. ej. dos pestañas renovando a la vez) y solo se responde 401.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def issue_tokens(self, user: User, session_id: str = None) -> Token:
+        """Emitir access + refresh token para un usuario (nueva sesión si no se indica)"""
+        tokens, _ = self._create_tokens(user, session_id or _new_id())
+        self.db.commit()
+        return tokens
+
+    def refresh(self, refresh_token: str) -> Token:
+        """Rotar un refresh token: lo revoca y emite un par nuevo en la misma sesión"""
+        token_data = verify_refresh_token(refresh_token)
+
+        stored = self.db.query(RefreshToken).filter(RefreshToken.jti == token_data["jti"]).first()
+        if stored is None or stored.expires_at <= datetime.utcnow():
+            raise self._invalid()
+
+        user = get_user_by_subject(self.db, token_data["email"])
+        if user is None or user.id != stored.user_id or not user.is_active:
+            raise self._invalid()
+
+        tokens, new_jti = self._create_tokens(user, stored.family_id)
+
+        # Revocación condicional: si dos peticiones usan el mismo token a la
+        # vez, solo una lo rota; la otra recibe 401
+        rotated = self.db.query(RefreshToken).filter(
+            RefreshToken.id == stored.id,
+            RefreshToken.revoked_at.is_(None)
+        ).update(
+            {RefreshToken.revoked_at: datetime.utcnow(), RefreshToken.replaced_by: new_jti},
+            synchronize_session=False
+        )
+
+        if not rotated:
+            self.db.rollback()
+            if not self._lost_rotation_race(stored.id):
+                # Token ya usado o revocado: posible robo, se cierra toda la sesión
+                self.revoke_session(stored.family_id)
+            raise self._invalid()
+
+        self.db.commit()
+        return tokens
+
+    def logout(self, refresh_token: str) -> None:
+        """Cerrar la sesión de un refresh token (también invalida sus access tokens)"""
+        token_data = verify_refresh_token(refresh_token)
+        stored = self.db.query(RefreshToken).filter(RefreshToken.jti == token_data["jti"]).first()
+        if stored is not None:
+            self.revoke_session(stored.family_id)
+
+    def revoke_session(self, session_id: str) -> None:
+        """Revocar todos los refresh tokens de una sesión y sus access tokens en vuelo"""
+        now = datetime.utcnow()
+        self.db.query(RefreshToken).filter(
+            RefreshToken.family_id == session_id,
+            RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+        self.db.commit()
+
+        revoked_sessions.revoke(session_id)
+
+    def revoke_user_sessions(self, user_id: int) -> int:
+        """
+        Revocar todas las sesiones de un usuario (p. ej. al cambiar su contraseña)
+
+        Returns:
+            Número de sesiones revocadas
+        """
+        families = [
+            family_id for (family_id,) in self.db.query(RefreshToken.family_id).filter(
+                RefreshToken.user_id == user_id,
+                RefreshToken.revoked_at.is_(None)
+            ).distinct()
+        ]
+        for family_id in families:
+            self.revoke_session(family_id)
+        return len(families)
+
+    def load_revocations(self) -> int:
+        """
+        Cargar en memoria las sesiones revocadas cuyos access tokens aún no caducaron
+
+        Las filas rotadas (`replaced_by` no nulo) no cuentan: su sesión sigue viva.
+        """
+        window = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        rows: List[Tuple[str, datetime]] = self.db.query(
+            RefreshToken.family_id, RefreshToken.revoked_at
+        ).filter(
+            RefreshToken.revoked_at >= datetime.utcnow() - window,
+            RefreshToken.replaced_by.is_(None)
+        ).all()
+
+        revoked_sessions.load(
+            (family_id, _timestamp(revoked_at + window)) for family_id, revoked_at in rows
+        )
+        return len(rows)
+
+    def purge_expired(self) -> int:
+        """Eliminar refresh tokens caducados"""
+        deleted = self.db.query(RefreshToken).filter(
+            RefreshToken.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
+
+    def _create_tokens(self, user: User, session_id: str) -> Tuple[Token, str]:
+        """Crear el par de tokens y registrar el refresh token (sin confirmar la transacción)"""
+        jti = _new_id()
+        self.db.add(RefreshToken(
+            jti=jti,
+            family_id=session_id,
+            user_id=user.id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+
+        access_token = create_access_token(
+            data={"sub": user.email, "sid": session_id, **permission_claims(user.role)},
+            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        refresh_token = create_refresh_token(data={"sub": user.email, "jti": jti, "sid": session_id})
+
+        tokens = Token(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            token_type="bearer",
+            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # en segundos
+        )
+        return tokens, jti
+
+    def _lost_rotation_race(self, token_id: int) -> bool:
+        """Si el token fue rotado (no revocado) hace menos de REFRESH_REUSE_GRACE_SECONDS"""
+        replaced_by, revoked_at = self.db.query(
+            RefreshToken.replaced_by, RefreshToken.revoked_at
+        ).filter(RefreshToken.id == token_id).one()
+        grace = timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS)
+        return replaced_by is not None and revoked_at >= datetime.utcnow() - grace
+
+    @staticmethod
+    def _invalid() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido",
+        )
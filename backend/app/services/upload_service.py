@@ -1,14 +1,65 @@
 """
 Service for managing file uploads and deletions
 """
+import asyncio
 import os
+import re
+import gzip
 import shutil
+import hashlib
+import time
+import uuid
+from collections import defaultdict
 from pathlib import Path
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set, Tuple
 import logging
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import String, cast, or_
+from sqlalchemy.orm import Session
+
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.static_files import PRECOMPRESSED_EXTENSIONS, upload_hits
+from app.models.page_content import PageContent
+from app.models.project import Project
+from app.models.settings import Settings
+from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are generated without it
+    brotli = None
+
+# Size of each read from the incoming upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Content-addressed blob URL: /uploads/cas/<aa>/<sha256>[.<variant>].<ext>
+# (the "/uploads/" prefix is optional, icon paths are stored relative)
+CAS_URL_PATTERN = re.compile(r"(?:/?uploads/)?cas/[0-9a-f]{2}/([0-9a-f]{64})")
+
+# Columns that may hold upload URLs (plain strings or nested JSON)
+REFERENCE_COLUMNS = (
+    (Project, ("thumbnail_url", "demo_video_url", "demo_video_thumbnail", "demo_images", "images", "demo_files")),
+    (Settings, ("social_links", "site_logo_url", "site_favicon_url", "seo_og_image", "extra_config")),
+    (PageContent, ("content", "styles")),
+    (User, ("avatar_url",)),
+)
+
+
+class SavedUpload(NamedTuple):
+    """Result of writing an upload to the store"""
+    path: Path
+    url: str
+    size: int
+    sha256: str
+    deduplicated: bool = False
+
 
 class UploadService:
     """Service for handling file upload operations"""
@@ -17,6 +68,325 @@ class UploadService:
         self.upload_dir = Path(settings.UPLOAD_DIR)
         self.projects_dir = self.upload_dir / "projects"
         self.icons_dir = self.upload_dir / "icons"
+        self.cas_dir = self.upload_dir / "cas"
+        self.staging_dir = self.cas_dir / "tmp"
+    
+    # ========== Content-addressed store ==========
+    
+    async def store_upload(self, file: UploadFile, max_size: int) -> SavedUpload:
+        """
+        Store an upload in the content-addressed store
+        
+        The file is streamed to a staging file (size limit enforced and
+        SHA-256 computed on the fly) and then atomically moved to
+        cas/<aa>/<sha256><ext>. If identical content is already stored, the
+        staging file is discarded and the existing blob is returned, so each
+        distinct file is stored once. The resulting URL never changes
+        content and can be cached as immutable.
+        
+        Args:
+            file: Incoming upload
+            max_size: Maximum allowed size in bytes
+            
+        Returns:
+            SavedUpload with the path, public URL, size and checksum
+            
+        Raises:
+            HTTPException: 413 if the file exceeds max_size, 500 on write errors
+        """
+        tmp_path, size, sha256 = await self._stream_to_staging(file, max_size)
+        
+        extension = Path(file.filename or "").suffix.lower()
+        blob_path = self.cas_dir / sha256[:2] / f"{sha256}{extension}"
+        deduplicated = False
+        
+        try:
+            if blob_path.exists():
+                # Restart the garbage collection grace period: the blob may be
+                # unreferenced now but about to be referenced by this upload
+                deduplicated = await run_in_threadpool(self._touch, blob_path)
+            if deduplicated:
+                await self._discard_partial(tmp_path)
+            else:
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                await aiofiles.os.replace(tmp_path, blob_path)
+                if extension in PRECOMPRESSED_EXTENSIONS:
+                    await run_in_threadpool(self._precompress, blob_path)
+        except Exception as e:
+            await self._discard_partial(tmp_path)
+            logger.error(f"Error saving file: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error saving file: {str(e)}"
+            )
+        
+        url = self.url_for(blob_path)
+        logger.info(f"File stored: {url} ({size} bytes{', deduplicated' if deduplicated else ''})")
+        return SavedUpload(path=blob_path, url=url, size=size, sha256=sha256, deduplicated=deduplicated)
+    
+    async def _stream_to_staging(self, file: UploadFile, max_size: int) -> Tuple[Path, int, str]:
+        """
+        Stream an upload to a staging file in chunks without blocking the event loop
+        
+        Returns:
+            Tuple of (staging path, size, SHA-256 hex digest)
+        """
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.staging_dir / f"{uuid.uuid4().hex}.part"
+        
+        checksum = hashlib.sha256()
+        size = 0
+        completed = False
+        
+        try:
+            async with aiofiles.open(tmp_path, "wb") as buffer:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File too large. Max size: {max_size // (1024 * 1024)}MB"
+                        )
+                    checksum.update(chunk)
+                    await buffer.write(chunk)
+            completed = True
+        
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error saving file: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error saving file: {str(e)}"
+            )
+        finally:
+            # Also covers cancellation (client disconnected mid-upload)
+            if not completed:
+                await self._discard_partial(tmp_path)
+        
+        return tmp_path, size, checksum.hexdigest()
+    
+    def _touch(self, path: Path) -> bool:
+        """Refresh a blob's mtime; False if it was deleted meanwhile (e.g. by GC)"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def _precompress(self, path: Path) -> None:
+        """Write .gz (and .br, if brotli is installed) siblings served to clients that accept them"""
+        data = path.read_bytes()
+        
+        compressed = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed[".br"] = brotli.compress(data, quality=11)
+        
+        for suffix, payload in compressed.items():
+            # Only keep siblings that actually save bytes
+            if len(payload) < len(data):
+                path.with_name(path.name + suffix).write_bytes(payload)
+    
+    async def _discard_partial(self, tmp_path: Path) -> None:
+        """Remove a partially written temporary file, if any"""
+        try:
+            await aiofiles.os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+    
+    def url_for(self, path: Path) -> str:
+        """Public URL (/uploads/...) of a file inside UPLOAD_DIR"""
+        return f"/uploads/{path.relative_to(self.upload_dir).as_posix()}"
+    
+    def blob_key(self, url: str) -> Optional[str]:
+        """SHA-256 of the blob a URL points to, or None if it is not content-addressed"""
+        match = CAS_URL_PATTERN.search(url or "")
+        return match.group(1) if match else None
+    
+    def count_references(self, db: Session, key: Optional[str] = None) -> Dict[str, int]:
+        """
+        Count references to each stored blob
+        
+        Scans the URL columns of projects, settings, CMS content and users.
+        Derivatives (e.g. <sha>.640w.webp) count as references to their
+        original blob. With `key`, only rows whose text contains that
+        SHA-256 are loaded and only that blob is counted.
+        
+        Returns:
+            Dict of blob SHA-256 -> number of references
+        """
+        counts: Dict[str, int] = defaultdict(int)
+        
+        for model, columns in REFERENCE_COLUMNS:
+            query = db.query(*(getattr(model, column) for column in columns))
+            if key:
+                query = query.filter(or_(*(cast(getattr(model, column), String).contains(key) for column in columns)))
+            for row in query.yield_per(500):
+                for value in row:
+                    self._collect_references(value, counts)
+        
+        if key:
+            return {key: counts[key]} if counts.get(key) else {}
+        return dict(counts)
+    
+    def blob_keys(self, values: Iterable[Any]) -> Set[str]:
+        """SHA-256 of every blob referenced by the given column values"""
+        counts: Dict[str, int] = defaultdict(int)
+        for value in values:
+            self._collect_references(value, counts)
+        return set(counts)
+    
+    def _collect_references(self, value: Any, counts: Dict[str, int]) -> None:
+        """Recursively find blob URLs in a column value (string or JSON)"""
+        if isinstance(value, str):
+            for key in CAS_URL_PATTERN.findall(value):
+                counts[key] += 1
+        elif isinstance(value, dict):
+            for item in value.values():
+                self._collect_references(item, counts)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self._collect_references(item, counts)
+    
+    def release(self, url: str, db: Session, grace_seconds: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Delete a stored blob (and its derivatives) if nothing references it
+        
+        Blobs are shared between every place that uploaded the same content,
+        so a blob still referenced elsewhere is kept; it will be collected
+        once its last reference is gone. Blobs modified within the grace
+        period are kept too: an identical upload refreshes the blob's mtime
+        and its URL may be about to be saved (see collect_garbage).
+        
+        Returns:
+            Dict with "deleted" (bool) and "references" (int)
+        """
+        key = self.blob_key(url)
+        if not key:
+            return {"deleted": False, "references": 0}
+        return self.release_key(key, db, grace_seconds)
+    
+    def release_key(self, key: str, db: Session, grace_seconds: Optional[int] = None) -> Dict[str, Any]:
+        """Same as release(), for a blob SHA-256"""
+        references = self.count_references(db, key).get(key, 0)
+        if references:
+            logger.info(f"Blob {key} still referenced {references} time(s), kept")
+            return {"deleted": False, "references": references}
+        
+        if grace_seconds is None:
+            grace_seconds = settings.UPLOAD_GC_GRACE_HOURS * 3600
+        mtime = self._blob_mtime(key)
+        if mtime is not None and mtime > time.time() - grace_seconds:
+            logger.info(f"Blob {key} is unreferenced but recent, left to the garbage collector")
+            return {"deleted": False, "references": 0}
+        
+        deleted = self._delete_blob_files(key)
+        return {"deleted": deleted > 0, "references": 0}
+    
+    def release_keys(self, keys: Iterable[str], db: Session) -> int:
+        """Release several blobs; returns how many were deleted"""
+        return sum(1 for key in keys if self.release_key(key, db)["deleted"])
+    
+    def collect_garbage(self, db: Session, grace_seconds: Optional[int] = None) -> Dict[str, int]:
+        """
+        Delete unreferenced blobs older than the grace period
+        
+        The grace period protects files that were just uploaded but whose
+        URL has not been saved into a project/setting/section yet.
+        
+        Returns:
+            Dict with the number of blobs deleted and bytes freed
+        """
+        if grace_seconds is None:
+            grace_seconds = settings.UPLOAD_GC_GRACE_HOURS * 3600
+        
+        references = self.count_references(db)
+        cutoff = time.time() - grace_seconds
+        deleted_blobs = 0
+        freed_bytes = 0
+        
+        for key, files in self._iter_blob_groups():
+            if key in references:
+                continue
+            try:
+                if max(f.stat().st_mtime for f in files) > cutoff:
+                    continue
+                size = sum(f.stat().st_size for f in files)
+            except FileNotFoundError:
+                # Deleted meanwhile (release() or another worker's GC)
+                continue
+            
+            if self._delete_blob_files(key):
+                freed_bytes += size
+                deleted_blobs += 1
+        
+        logger.info(f"Upload GC: deleted {deleted_blobs} blob(s), freed {freed_bytes} bytes")
+        return {"deleted_blobs": deleted_blobs, "freed_bytes": freed_bytes}
+    
+    def get_store_stats(self, db: Session) -> Dict[str, int]:
+        """Get usage statistics of the content-addressed store"""
+        references = self.count_references(db)
+        blobs = 0
+        referenced = 0
+        total_bytes = 0
+        
+        for key, files in self._iter_blob_groups():
+            blobs += 1
+            referenced += 1 if key in references else 0
+            total_bytes += sum(f.stat().st_size for f in files)
+        
+        return {
+            "blobs": blobs,
+            "referenced_blobs": referenced,
+            "unreferenced_blobs": blobs - referenced,
+            "total_bytes": total_bytes,
+            "references": sum(references.values())
+        }
+    
+    def _iter_blob_groups(self):
+        """Yield (sha256, files) for each stored blob (original + derivatives)"""
+        if not self.cas_dir.exists():
+            return
+        
+        for shard in sorted(self.cas_dir.iterdir()):
+            if not shard.is_dir() or shard == self.staging_dir:
+                continue
+            
+            groups: Dict[str, list] = defaultdict(list)
+            for f in shard.iterdir():
+                if f.is_file() and not f.name.startswith("."):
+                    groups[f.name[:64]].append(f)
+            
+            yield from groups.items()
+    
+    def _blob_mtime(self, key: str) -> Optional[float]:
+        """Latest mtime among a blob's files, or None if it is not stored"""
+        mtimes = []
+        for f in (self.cas_dir / key[:2]).glob(f"{key}*"):
+            try:
+                mtimes.append(f.stat().st_mtime)
+            except FileNotFoundError:
+                pass
+        return max(mtimes, default=None)
+    
+    def _delete_blob_files(self, key: str) -> int:
+        """Delete a blob and all its derivatives; returns the number of files removed"""
+        shard = self.cas_dir / key[:2]
+        deleted = 0
+        
+        for f in shard.glob(f"{key}*"):
+            try:
+                f.unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        
+        if deleted:
+            upload_hits.forget(f"cas/{key[:2]}/{key}")
+            logger.info(f"Deleted blob {key} ({deleted} file(s))")
+        return deleted
+    
+    # ========== Legacy per-project / icon folders ==========
     
     def delete_project_folder(self, project_id: int) -> bool:
         """
@@ -102,3 +472,47 @@ class UploadService:
             logger.error(f"Error deleting icon file {full_path}: {str(e)}")
             return False
 
+
+
+class StoreGarbageCollector:
+    """
+    Periodic collect_garbage() run on the event loop of each worker
+    
+    Collections are idempotent, so several workers running them is harmless.
+    """
+    
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+    
+    def collect(self) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            return UploadService().collect_garbage(db)
+        finally:
+            db.close()
+    
+    def start(self) -> None:
+        """Start the periodic collection (0 disables it)"""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as e:
+                logger.warning(f"Upload GC failed: {e}")
+
+
+store_gc = StoreGarbageCollector(settings.UPLOAD_GC_INTERVAL)
@@ -0,0 +1,128 @@
+"""
+Contador de vistas de proyectos con escritura diferida
+"""
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+from sqlalchemy import case, update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.project import Project
+
+logger = logging.getLogger(__name__)
+
+# Proyectos actualizados por sentencia UPDATE
+FLUSH_BATCH_SIZE = 500
+
+
+class ViewCounter:
+    """
+    Buffer en memoria de vistas por proyecto.
+
+    Las peticiones solo suman en un Counter; una tarea periódica vuelca los
+    incrementos acumulados con `view_count = view_count + n` (atómico en la
+    base de datos, sin leer la fila). Cada worker tiene su propio buffer y
+    los incrementos son aditivos, así que varios workers no se pisan.
+    """
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_views = 0
+        self.flushes = 0
+
+    def record(self, project_id: int, views: int = 1) -> None:
+        """Registrar vistas de un proyecto (sin tocar la base de datos)"""
+        with self._lock:
+            self._pending[project_id] += views
+
+    def flush(self) -> int:
+        """
+        Volcar las vistas pendientes a la base de datos
+
+        Returns:
+            Número de vistas escritas
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+
+        if not pending:
+            return 0
+
+        db = SessionLocal()
+        try:
+            items = list(pending.items())
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch: Dict[int, int] = dict(items[start:start + FLUSH_BATCH_SIZE])
+                db.execute(
+                    update(Project)
+                    .where(Project.id.in_(batch.keys()))
+                    .values(
+                        view_count=Project.view_count + case(batch, value=Project.id, else_=0),
+                        # Una vista no es una modificación del proyecto (los
+                        # ETags incluyen view_count por separado)
+                        updated_at=Project.updated_at
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Devolver los incrementos al buffer para el siguiente intento
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        finally:
+            db.close()
+
+        # Las estadísticas de proyectos incluyen el total de vistas
+        from app.services.project_service import invalidate_project_stats
+        invalidate_project_stats()
+        
+        views = sum(pending.values())
+        self.flushed_views += views
+        self.flushes += 1
+        return views
+
+    def start(self) -> None:
+        """Iniciar el volcado periódico (en el event loop actual)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Detener el volcado periódico y volcar lo pendiente"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "pending_projects": len(self._pending),
+                "pending_views": sum(self._pending.values()),
+                "flushed_views": self.flushed_views,
+                "flushes": self.flushes,
+                "flush_interval_seconds": self.interval,
+            }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning(f"Could not flush project view counts: {e}")
+
+
+view_counter = ViewCounter(settings.VIEW_COUNT_FLUSH_INTERVAL)
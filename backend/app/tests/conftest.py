@@ -0,0 +1,94 @@
+"""
+Shared test fixtures: the FastAPI app on an in-memory SQLite database
+"""
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateColumn
+
+import app.core.rate_limit as rate_limit
+from app.core.database import get_db
+from app.main import app as fastapi_app
+from app.models.base import Base
+from app.models.project import Project
+
+# Full-text search indexes that only exist on PostgreSQL
+POSTGRES_ONLY_INDEXES = {"ix_projects_search_vector", "ix_projects_title_trgm"}
+
+
+@compiles(CreateColumn, "sqlite")
+def _skip_postgres_only_columns(element, compiler, **kw):
+    """Leave the generated tsvector column out of the SQLite schema"""
+    if isinstance(element.element.type, TSVECTOR):
+        return None
+    return compiler.visit_create_column(element, **kw)
+
+
+for _index in Project.__table__.indexes:
+    if _index.name in POSTGRES_ONLY_INDEXES:
+        _index.ddl_if(dialect="postgresql")
+
+
+class SlowFakeChatModel(GenericFakeChatModel):
+    """Offline chat model that takes `delay` seconds per answer (and per streamed chunk)"""
+
+    delay: float = 0.5
+
+    async def _agenerate(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        return await super()._agenerate(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        async for chunk in super()._astream(*args, **kwargs):
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(engine):
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def app(engine, monkeypatch):
+    """The application bound to the test database (startup events are not run)"""
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # Fresh rate limits for every test
+    monkeypatch.setattr(rate_limit, "_backend", None)
+
+    fastapi_app.dependency_overrides[get_db] = override_get_db
+    yield fastapi_app
+    fastapi_app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def client(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
@@ -0,0 +1,231 @@
+"""
+Chatbot pipeline: the LLM call must never block the event loop
+"""
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+import app.services.chatbot_service as chatbot_module
+from app.core.config import settings
+from app.schemas.chatbot import ChatMessage, ChatRequest
+from app.services.chat_session_store import ChatSessionStore, InMemorySessionBackend
+from app.services.chatbot_service import DEGRADED_REPLY, TIMEOUT_REPLY, ChatbotService
+from app.tests.conftest import SlowFakeChatModel
+
+# Seconds the fake model takes to answer
+LLM_DELAY = 1.0
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def slow_llm(monkeypatch):
+    """Chatbot service answering through a slow offline model"""
+    monkeypatch.setattr(settings, "CHATBOT_LLM_PROVIDER", "fake")
+    service = ChatbotService()
+    service.llm = SlowFakeChatModel(
+        messages=itertools.cycle([AIMessage(content="Respuesta de prueba")]),
+        delay=LLM_DELAY
+    )
+    monkeypatch.setattr(chatbot_module, "_chatbot_service", service)
+    return service.llm
+
+
+async def _timed_get(client, url: str) -> float:
+    started = time.perf_counter()
+    response = await client.get(url)
+    assert response.status_code == 200
+    return time.perf_counter() - started
+
+
+@pytest.mark.asyncio
+async def test_other_endpoints_stay_fast_while_chats_are_in_flight(client, slow_llm):
+    chats = [
+        asyncio.create_task(client.post("/api/v1/chatbot/chat", json={"message": f"¿Qué proyectos tiene? {i}"}))
+        for i in range(settings.CHATBOT_MAX_CONCURRENCY)
+    ]
+    await asyncio.sleep(0.1)
+
+    for url in ("/health", "/api/v1/projects/", "/api/v1/chatbot/info"):
+        assert await _timed_get(client, url) < LLM_DELAY / 4, url
+    assert not any(chat.done() for chat in chats)
+
+    responses = await asyncio.gather(*chats)
+    assert [response.json()["message"] for response in responses] == ["Respuesta de prueba"] * len(chats)
+
+
+@pytest.mark.asyncio
+async def test_slow_llm_answer_falls_back_after_timeout(client, slow_llm, monkeypatch):
+    monkeypatch.setattr(settings, "CHATBOT_TIMEOUT", 0.2)
+
+    started = time.perf_counter()
+    response = await client.post("/api/v1/chatbot/chat", json={"message": "¿Cuál es su email?"})
+
+    assert response.status_code == 200
+    assert response.json()["message"] == TIMEOUT_REPLY
+    assert time.perf_counter() - started < LLM_DELAY
+
+
+@pytest.mark.asyncio
+async def test_slow_stream_reader_does_not_hold_timeout_or_slot(slow_llm, monkeypatch):
+    monkeypatch.setattr(settings, "CHATBOT_TIMEOUT", 0.3)
+    slow_llm.delay = 0
+    service = chatbot_module._chatbot_service
+
+    stream = service.stream_chat(ChatRequest(message="¿Quién eres?"), "slow-reader")
+    chunks = [await anext(stream)]
+    # The client reads slower than CHATBOT_TIMEOUT allows for the whole answer
+    await asyncio.sleep(0.5)
+    assert service._llm_slots._value == settings.CHATBOT_MAX_CONCURRENCY
+
+    chunks += [chunk async for chunk in stream]
+    assert "".join(chunks) == "Respuesta de prueba"
+
+
+STARTUP_PROBE = """
+import resource, sys, time
+started = time.perf_counter()
+import app.main
+if sys.argv[1] == "eager":
+    # What the import used to do: build the chatbot (and its LLM client) up front
+    from app.services.chatbot_service import get_chatbot_service
+    get_chatbot_service()
+print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def _startup_cost(mode: str) -> tuple:
+    """Median (seconds, max RSS in KB) of importing app.main in a fresh interpreter"""
+    env = {**os.environ, "GOOGLE_API_KEY": "benchmark-key", "CHATBOT_LLM_PROVIDER": "gemini"}
+    runs = sorted(
+        tuple(map(float, subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, mode], cwd=BACKEND_DIR, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout.split()))
+        for _ in range(5)
+    )
+    return runs[len(runs) // 2]
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="benchmark: set RUN_BENCHMARKS=1")
+def test_lazy_llm_lowers_cold_start_and_baseline_rss():
+    lazy_seconds, lazy_rss = _startup_cost("lazy")
+    eager_seconds, eager_rss = _startup_cost("eager")
+    print(f"\nimport app.main: lazy {lazy_seconds:.2f}s / {lazy_rss / 1024:.0f}MB, "
+          f"eager {eager_seconds:.2f}s / {eager_rss / 1024:.0f}MB")
+
+    assert lazy_seconds < eager_seconds
+    assert lazy_rss < eager_rss
+
+
+def _sse_events(body: str) -> list:
+    """(event, data) pairs of a text/event-stream body"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_chat_stream_sends_token_events_then_done(app, slow_llm):
+    slow_llm.delay = 0
+
+    with TestClient(app).stream(
+        "POST", "/api/v1/chatbot/chat/stream", json={"message": "¿Quién eres?", "session_id": "sse"}
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _sse_events(response.read().decode())
+
+    *tokens, (last, done) = events
+    assert {event for event, _ in tokens} == {"token"}
+    assert "".join(data["content"] for _, data in tokens) == "Respuesta de prueba"
+    assert last == "done"
+    assert done["session_id"] == "sse"
+    assert done["first_token_ms"] <= done["total_ms"]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_client_disconnect_cancels_the_generation(app, slow_llm):
+    service = chatbot_module._chatbot_service
+    body = json.dumps({"message": "¿Qué proyectos tiene?", "session_id": "gone"}).encode()
+    first_token = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if not sent:
+            sent.append(True)
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The client goes away right after the first token
+        await first_token.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and b"event: token" in message.get("body", b""):
+            first_token.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/v1/chatbot/chat/stream", "raw_path": b"/api/v1/chatbot/chat/stream",
+        "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000), "server": ("test", 80),
+    }
+    started = time.perf_counter()
+    await asyncio.wait_for(app(scope, receive, send), timeout=2 * LLM_DELAY)
+
+    # Returned well before the remaining chunks (LLM_DELAY each) were generated
+    assert time.perf_counter() - started < 2 * LLM_DELAY
+    await asyncio.sleep(0)
+    assert service._llm_slots._value == settings.CHATBOT_MAX_CONCURRENCY
+    assert chatbot_module.session_store.backend.get("gone") is None
+
+
+def test_importing_the_app_does_not_load_the_llm_stack():
+    # Fresh interpreter: this test session has already imported LangChain
+    code = (
+        "import sys, app.main; "
+        "print(sorted(m for m in sys.modules if m.startswith(('langchain', 'google.generativeai', 'google.ai'))))"
+    )
+    env = {**os.environ, "GOOGLE_API_KEY": ""}
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+@pytest.mark.asyncio
+async def test_chat_without_api_key_answers_in_degraded_mode(client, monkeypatch):
+    monkeypatch.setattr(settings, "CHATBOT_LLM_PROVIDER", "gemini")
+    monkeypatch.setattr(settings, "GOOGLE_API_KEY", "")
+    monkeypatch.setattr(chatbot_module, "_chatbot_service", None)
+
+    response = await client.post("/api/v1/chatbot/chat", json={"message": "Hola"})
+
+    assert response.status_code == 200
+    assert response.json()["message"] == DEGRADED_REPLY
+    assert chatbot_module.get_chatbot_service().is_degraded
+
+
+def test_unknown_session_is_rebuilt_from_the_history_tail():
+    # E.g. the request reached a worker (or a restarted process) without the session
+    store = ChatSessionStore(InMemorySessionBackend(max_sessions=10, idle_ttl=60))
+    history = [
+        ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"mensaje {i}")
+        for i in range(3 * settings.CHATBOT_MAX_HISTORY)
+    ]
+
+    session = store.get_or_create("from-another-worker", history)
+
+    assert [content for _, content in session.messages] == [m.content for m in history[-settings.CHATBOT_MAX_HISTORY:]]
+    # A known session ignores whatever the client sends
+    store.record_turn(session, "hola", "¡hola!")
+    assert store.get_or_create("from-another-worker", history[:2]).messages[-1] == ("assistant", "¡hola!")
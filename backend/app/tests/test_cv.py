@@ -0,0 +1,40 @@
+"""
+CV metadata calls must not depend on the size of the stored PDF
+"""
+import tracemalloc
+
+import pytest
+from sqlalchemy import event
+
+from app.services.cv_service import CVService
+
+# Small and large CVs: metadata calls must cost the same for both
+CV_SIZES = (1024, 8 * 1024 * 1024)
+
+
+def _metadata_calls(service: CVService):
+    cv = service.get_cv()
+    return cv.filename, cv.file_size, service.cv_exists(), service.get_cv_download_info()
+
+
+@pytest.mark.parametrize("size", CV_SIZES)
+def test_metadata_calls_never_read_file_data(db_session, engine, size):
+    service = CVService(db_session)
+    service.create_or_replace_cv("cv.pdf", b"%PDF" + b"x" * (size - 4), size)
+    db_session.expunge_all()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    _metadata_calls(service)
+    db_session.expunge_all()
+
+    # Warm run first (statement compilation), then measure
+    tracemalloc.start()
+    filename, file_size, exists, info = _metadata_calls(service)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert (filename, file_size, exists, info.file_size) == ("cv.pdf", size, True, size)
+    assert not any("file_data" in statement for statement in statements)
+    assert not any("count(" in statement.lower() for statement in statements)
+    assert peak < 256 * 1024
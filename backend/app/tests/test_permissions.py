@@ -0,0 +1,35 @@
+"""
+Permission masks embedded in access tokens
+"""
+from app.core import security
+from app.core.security import create_access_token, permission_claims, verify_token
+from app.models.enums import (
+    PERMISSION_BITS,
+    Permission,
+    UserRole,
+    get_permission_mask,
+    has_permission,
+    mask_has_permission,
+)
+
+
+def test_permission_bits_are_stable():
+    # Bits travel inside issued tokens: changing one changes what they grant
+    assert PERMISSION_BITS[Permission.CREATE_USER] == 1 << 0
+    assert PERMISSION_BITS[Permission.DELETE_PROJECT] == 1 << 8
+    assert PERMISSION_BITS[Permission.MANAGE_SETTINGS] == 1 << 19
+
+
+def test_role_masks_match_role_permissions():
+    for role in UserRole:
+        for permission in Permission:
+            assert mask_has_permission(get_permission_mask(role), permission) == has_permission(role, permission)
+    assert not has_permission(UserRole.EDITOR, Permission.DELETE_PROJECT)
+
+
+def test_token_mask_is_ignored_when_issued_with_another_permissions_version(monkeypatch):
+    token = create_access_token({"sub": "editor@example.com", **permission_claims(UserRole.EDITOR)})
+    assert verify_token(token)["permissions"] == get_permission_mask(UserRole.EDITOR)
+
+    monkeypatch.setattr(security, "PERMISSIONS_VERSION", 2)
+    assert verify_token(token)["permissions"] is None
@@ -0,0 +1,128 @@
+"""
+/projects/stats: one aggregate statement whatever the number of projects
+"""
+import os
+import random
+import statistics
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.models.project import Project
+from app.services.project_service import ProjectService, invalidate_project_stats
+
+
+def _add_projects(db_session, start: int, end: int) -> None:
+    rng = random.Random(start)
+    db_session.bulk_save_objects([
+        Project(
+            title=f"P{i}",
+            slug=f"p{i}",
+            description="d",
+            owner_id=1,
+            is_published=rng.random() < 0.8,
+            is_featured=rng.random() < 0.1,
+            view_count=rng.randint(0, 1000),
+        )
+        for i in range(start, end)
+    ])
+    db_session.commit()
+
+
+def _expected(db_session) -> tuple:
+    projects = db_session.query(Project).all()
+    published = [p for p in projects if p.is_published]
+    db_session.expunge_all()
+    return (
+        len(projects),
+        len(published),
+        sum(1 for p in projects if p.is_featured),
+        sum(p.view_count for p in published),
+        max(p.view_count for p in published),
+    )
+
+
+@pytest.fixture
+def loaded_projects():
+    """Ids of the Project instances loaded by the ORM during the test"""
+    loaded = []
+
+    def on_load(target, context):
+        loaded.append(target.id)
+
+    event.listen(Project, "load", on_load)
+    yield loaded
+    event.remove(Project, "load", on_load)
+
+
+@pytest.mark.parametrize("total", [100, 10_000])
+def test_stats_use_a_constant_number_of_statements(db_session, engine, loaded_projects, total):
+    _add_projects(db_session, 0, total)
+    expected = _expected(db_session)
+    loaded_projects.clear()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    invalidate_project_stats()
+    stats = ProjectService(db_session).get_project_stats()
+
+    assert (
+        stats["total_projects"],
+        stats["published_projects"],
+        stats["featured_projects"],
+        stats["total_views"],
+        stats["most_viewed"].view_count,
+    ) == expected
+    # The aggregate plus the primary-key load of the most viewed project
+    assert len(statements) == 2
+    assert loaded_projects == [stats["most_viewed"].id]
+
+
+def test_stats_are_served_from_cache_until_invalidated(db_session, engine):
+    _add_projects(db_session, 0, 10)
+    service = ProjectService(db_session)
+    invalidate_project_stats()
+    before = service.get_project_stats()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    cached = service.get_project_stats()
+    # Counters and the serialized most viewed project both come from the cache
+    assert statements == []
+    assert cached == before
+
+    invalidate_project_stats()
+    _add_projects(db_session, 10, 11)
+    assert service.get_project_stats()["total_projects"] == before["total_projects"] + 1
+
+
+def _median_ms(call, runs: int = 50) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="benchmark: set RUN_BENCHMARKS=1")
+def test_stats_latency_is_flat_from_100_to_10k_projects(db_session):
+    service = ProjectService(db_session)
+
+    def cold():
+        invalidate_project_stats()
+        service.get_project_stats()
+
+    latencies = {}
+    for start, total in ((0, 100), (100, 10_000)):
+        _add_projects(db_session, start, total)
+        latencies[total] = (_median_ms(cold, runs=10), _median_ms(service.get_project_stats))
+
+    print("\n" + ", ".join(
+        f"{total} projects: cold {cold_ms:.2f}ms / cached {cached_ms:.3f}ms"
+        for total, (cold_ms, cached_ms) in latencies.items()
+    ))
+    # Cached requests do not touch the database, whatever the table size
+    assert latencies[10_000][1] < max(2 * latencies[100][1], 0.05)
@@ -0,0 +1,57 @@
+"""
+Public project endpoints: conditional GETs and the listing
+"""
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.services.view_counter as view_counter_module
+from app.models.project import Project
+from app.services.view_counter import view_counter
+
+
+@pytest.fixture
+def project(db_session):
+    project = Project(title="Portfolio", slug="portfolio", description="CMS", owner_id=1, is_published=True)
+    db_session.add(project)
+    db_session.commit()
+    return project
+
+
+@pytest.mark.asyncio
+async def test_project_etag_changes_when_buffered_views_are_flushed(client, engine, project, monkeypatch):
+    monkeypatch.setattr(view_counter_module, "SessionLocal", sessionmaker(bind=engine))
+
+    first = await client.get("/api/v1/projects/portfolio")
+    listing = await client.get("/api/v1/projects/")
+    view_counter.flush()
+
+    second = await client.get("/api/v1/projects/portfolio", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json()["view_count"] == first.json()["view_count"] + 1
+
+    listing_again = await client.get("/api/v1/projects/", headers={"If-None-Match": listing.headers["ETag"]})
+    assert listing_again.status_code == 200
+
+    unchanged = await client.get("/api/v1/projects/", headers={"If-None-Match": listing_again.headers["ETag"]})
+    assert unchanged.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_stops_at_an_exactly_full_last_page(client, db_session):
+    db_session.add_all([
+        Project(title=f"P{i}", slug=f"p{i}", description="d", owner_id=1, is_published=True, order_index=i)
+        for i in range(4)
+    ])
+    db_session.commit()
+
+    first = await client.get("/api/v1/projects/", params={"limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+    second = await client.get("/api/v1/projects/", params={"limit": 2, "cursor": cursor})
+
+    assert [p["slug"] for p in first.json() + second.json()] == ["p3", "p2", "p1", "p0"]
+    assert "X-Next-Cursor" not in second.headers
+
+    revalidated = await client.get(
+        "/api/v1/projects/", params={"limit": 2, "cursor": cursor}, headers={"If-None-Match": second.headers["ETag"]}
+    )
+    assert revalidated.status_code == 304
@@ -0,0 +1,41 @@
+"""
+Rate limiting: client IP resolution and Redis outages
+"""
+import pytest
+from starlette.requests import Request
+
+from app.core import rate_limit
+from app.core.config import settings
+
+
+def _request(forwarded_for: str = None, client_host: str = "10.0.0.1") -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "headers": headers, "client": (client_host, 50000)})
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", 0)
+    assert rate_limit.get_client_ip(_request("1.2.3.4")) == "10.0.0.1"
+
+
+@pytest.mark.parametrize("hops, expected", [(1, "203.0.113.7"), (2, "198.51.100.2"), (5, "1.2.3.4")])
+def test_forwarded_for_uses_the_entry_added_by_the_outermost_trusted_proxy(monkeypatch, hops, expected):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", hops)
+    # "1.2.3.4" was sent by the client itself to spoof its address
+    request = _request("1.2.3.4, 198.51.100.2, 203.0.113.7")
+    assert rate_limit.get_client_ip(request) == expected
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_process_limits():
+    pytest.importorskip("redis")
+    # Nothing listens on port 1: every Redis call fails to connect
+    backend = rate_limit.RedisRateLimitBackend("redis://127.0.0.1:1/0")
+
+    assert await backend.hit("login:1.2.3.4", 2, 60) == (True, 0.0)
+    assert (await backend.hit("login:1.2.3.4", 2, 60))[0] is True
+    assert (await backend.hit("login:1.2.3.4", 2, 60))[0] is False
+
+    stats = backend.stats()
+    assert stats["degraded"] is True
+    assert stats["errors"] == 1
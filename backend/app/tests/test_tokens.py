@@ -0,0 +1,72 @@
+"""
+Refresh token rotation: concurrent refreshes, reuse detection and password changes
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.security import revoked_sessions
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services.auth_service import AuthService
+from app.services.token_service import TokenService
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(email="admin@example.com", name="Admin", hashed_password="x", is_admin=True)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _live_tokens(db_session, family_id: str) -> int:
+    return db_session.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).count()
+
+
+def test_concurrent_refresh_loser_gets_401_without_closing_the_session(db_session, user):
+    service = TokenService(db_session)
+    first = service.issue_tokens(user, "tabs")
+
+    winner = service.refresh(first.refresh_token)
+    with pytest.raises(HTTPException) as error:
+        service.refresh(first.refresh_token)
+
+    assert error.value.status_code == 401
+    assert _live_tokens(db_session, "tabs") == 1
+    assert not revoked_sessions.is_revoked("tabs")
+    service.refresh(winner.refresh_token)
+
+
+def test_reusing_a_rotated_token_after_the_grace_period_closes_the_session(db_session, user):
+    service = TokenService(db_session)
+    first = service.issue_tokens(user, "stolen")
+    service.refresh(first.refresh_token)
+
+    db_session.query(RefreshToken).filter(RefreshToken.replaced_by.isnot(None)).update(
+        {RefreshToken.revoked_at: datetime.utcnow() - timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS + 1)}
+    )
+    db_session.commit()
+
+    with pytest.raises(HTTPException):
+        service.refresh(first.refresh_token)
+    assert _live_tokens(db_session, "stolen") == 0
+
+
+@pytest.mark.asyncio
+async def test_changing_the_password_revokes_every_session(db_session, user):
+    service = TokenService(db_session)
+    sessions = [service.issue_tokens(user, session_id) for session_id in ("laptop", "phone")]
+
+    await AuthService(db_session).update_user(user.id, UserUpdate(password="a-new-password"))
+
+    assert _live_tokens(db_session, "laptop") == _live_tokens(db_session, "phone") == 0
+    for tokens in sessions:
+        with pytest.raises(HTTPException):
+            service.refresh(tokens.refresh_token)
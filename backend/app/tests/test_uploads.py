@@ -0,0 +1,113 @@
+"""
+Content-addressed upload store: releasing blobs when their last reference goes away
+"""
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.models.project import Project
+from app.models.user import User
+from app.schemas.project import ProjectUpdate
+from app.services.project_service import ProjectService
+from app.services.upload_service import UploadService
+
+DAY = 24 * 3600
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    return UploadService()
+
+
+def _blob(store: UploadService, content: bytes, age: float = 2 * DAY) -> str:
+    """Store a blob with the given age (seconds since its last upload) and return its URL"""
+    key = hashlib.sha256(content).hexdigest()
+    path = store.cas_dir / key[:2] / f"{key}.png"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return store.url_for(path)
+
+
+def _owner(db_session) -> User:
+    owner = User(email="admin@example.com", name="Admin", hashed_password="x", is_admin=True)
+    db_session.add(owner)
+    db_session.commit()
+    return owner
+
+
+def _project(db_session, owner: User, slug: str, **urls) -> Project:
+    project = Project(title=slug, slug=slug, description="d", owner_id=owner.id, **urls)
+    db_session.add(project)
+    db_session.commit()
+    return project
+
+
+def _exists(store: UploadService, url: str) -> bool:
+    return (store.upload_dir / url[len("/uploads/"):]).exists()
+
+
+def test_release_keeps_recent_blobs_for_the_grace_period(store, db_session):
+    url = _blob(store, b"re-uploaded", age=10)
+
+    assert store.release(url, db_session) == {"deleted": False, "references": 0}
+    assert _exists(store, url)
+
+    assert store.release(url, db_session, grace_seconds=0)["deleted"] is True
+    assert not _exists(store, url)
+
+
+def test_release_only_loads_rows_that_mention_the_blob(store, db_session, monkeypatch):
+    owner = _owner(db_session)
+    url = _blob(store, b"shared")
+    for i in range(20):
+        _project(db_session, owner, f"other-{i}", thumbnail_url=_blob(store, f"other-{i}".encode()))
+    _project(db_session, owner, "user", demo_images=[{"url": url, "order": 1}])
+
+    scanned = []
+    collect = store._collect_references
+    monkeypatch.setattr(store, "_collect_references", lambda value, counts: (scanned.append(value), collect(value, counts)))
+
+    assert store.release(url, db_session) == {"deleted": False, "references": 1}
+    assert url in scanned
+    assert not any(isinstance(value, str) and "cas/" in value and value != url for value in scanned)
+
+
+def test_deleting_a_project_releases_blobs_nobody_else_uses(store, db_session):
+    owner = _owner(db_session)
+    own = _blob(store, b"own")
+    shared = _blob(store, b"shared")
+    project = _project(db_session, owner, "deleted", thumbnail_url=own, demo_images=[{"url": shared}])
+    _project(db_session, owner, "kept", thumbnail_url=shared)
+
+    ProjectService(db_session).delete_project(project.id, owner)
+
+    assert not _exists(store, own)
+    assert _exists(store, shared)
+
+
+def test_updating_a_project_releases_replaced_blobs(store, db_session):
+    owner = _owner(db_session)
+    old, new = _blob(store, b"old"), _blob(store, b"new")
+    project = _project(db_session, owner, "edited", thumbnail_url=old)
+
+    ProjectService(db_session).update_project(project.id, ProjectUpdate(thumbnail_url=new), owner)
+
+    assert not _exists(store, old)
+    assert _exists(store, new)
+
+
+def test_collect_garbage_skips_recent_and_referenced_blobs(store, db_session):
+    owner = _owner(db_session)
+    referenced = _blob(store, b"referenced")
+    _project(db_session, owner, "p", thumbnail_url=referenced)
+    recent = _blob(store, b"recent", age=10)
+    orphan = _blob(store, b"orphan")
+
+    assert store.collect_garbage(db_session)["deleted_blobs"] == 1
+    assert [_exists(store, url) for url in (referenced, recent, orphan)] == [True, True, False]
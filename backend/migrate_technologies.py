@@ -0,0 +1,39 @@
+"""
+Script para migrar las tecnologías de proyectos del formato antiguo (strings)
+al formato de objetos {"name", "icon", "enabled"} en una sola pasada
+"""
+
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.database import SessionLocal
+from app.services.project_service import ProjectService
+
+
+def migrate_technologies():
+    db = SessionLocal()
+    try:
+        service = ProjectService(db)
+
+        pending = service.count_legacy_technologies()
+        if not pending:
+            print("✅ Todas las tecnologías ya están en el formato nuevo")
+            return
+
+        print(f"📝 Migrando {pending} proyecto(s) con tecnologías en formato antiguo...")
+        migrated = service.migrate_legacy_technologies()
+        print(f"✅ {migrated} proyecto(s) migrados")
+
+    except Exception as e:
+        print(f"❌ Error al migrar las tecnologías: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_technologies()
@@ -7,6 +7,11 @@ import { sendChatMessage } from '@/lib/chatbot-api';
 import type { ChatMessage, ChatSession } from '@/types/chatbot';
 import { v4 as uuidv4 } from 'uuid';
 
+// Recent messages sent with each request (matches the server's CHATBOT_MAX_HISTORY).
+// The server keeps the history per session and only uses these to rebuild a
+// session it does not know (restart, another worker, idle eviction).
+const HISTORY_TAIL = 10;
+
 export default function ChatWidget() {
   const [isOpen, setIsOpen] = useState(false);
   const [isMinimized, setIsMinimized] = useState(false);
@@ -70,11 +75,10 @@ export default function ChatWidget() {
     setIsLoading(true);
 
     try {
-      // Send to backend
       const response = await sendChatMessage({
         message: userMessage.content,
-        conversation_history: session.messages.slice(-10), // Last 10 messages
-        session_id: session.id
+        session_id: session.id,
+        conversation_history: session.messages.slice(-HISTORY_TAIL)
       });
 
       // Add assistant response
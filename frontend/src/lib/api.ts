@@ -1,12 +1,14 @@
 /**
  * Cliente API para comunicación con el backend
  */
-import { CV, Token } from '@/types/api';
-import axios, { AxiosError, AxiosInstance, AxiosResponse } from 'axios';
+import { CV, ProjectSearchResponse, Token } from '@/types/api';
+import axios, { AxiosError, AxiosInstance, AxiosResponse, InternalAxiosRequestConfig } from 'axios';
 
 class ApiClient {
     private client: AxiosInstance;
     private token: string | null = null;
+    private refreshToken: string | null = null;
+    private refreshing: Promise<string | null> | null = null;
     private baseURL: string;
 
     constructor() {
@@ -29,7 +31,20 @@ class ApiClient {
         // Interceptor para manejo de errores
         this.client.interceptors.response.use(
             (response) => response,
-            (error: AxiosError) => {
+            async (error: AxiosError) => {
+                const request = error.config as (InternalAxiosRequestConfig & { _retried?: boolean }) | undefined;
+                const isAuthRequest = request?.url?.startsWith('/api/v1/auth/');
+
+                // Access token caducado: renovarlo con el refresh token y reintentar una vez
+                if (error.response?.status === 401 && request && !request._retried && !isAuthRequest) {
+                    request._retried = true;
+                    const newToken = await this.refreshAccessToken();
+                    if (newToken) {
+                        request.headers.Authorization = `Bearer ${newToken}`;
+                        return this.client(request);
+                    }
+                }
+
                 if (error.response?.status === 401) {
                     // Token expirado o inválido
                     this.clearToken();
@@ -48,6 +63,7 @@ class ApiClient {
             if (savedToken) {
                 this.token = savedToken;
             }
+            this.refreshToken = localStorage.getItem('refresh_token');
         }
     }
 
@@ -59,13 +75,65 @@ class ApiClient {
         }
     }
 
+    setRefreshToken(token: string | null) {
+        this.refreshToken = token;
+        if (typeof window !== 'undefined') {
+            if (token) {
+                localStorage.setItem('refresh_token', token);
+            } else {
+                localStorage.removeItem('refresh_token');
+            }
+        }
+    }
+
     clearToken() {
         this.token = null;
+        this.setRefreshToken(null);
         if (typeof window !== 'undefined') {
             localStorage.removeItem('auth_token');
         }
     }
 
+    // Renovar el access token (una sola petición aunque fallen varias a la vez)
+    private refreshAccessToken(): Promise<string | null> {
+        if (!this.refreshToken) return Promise.resolve(null);
+
+        if (!this.refreshing) {
+            const sentToken = this.refreshToken;
+            this.refreshing = this.client
+                .post<Token>('/api/v1/auth/refresh', { refresh_token: sentToken })
+                .then((response) => {
+                    this.setToken(response.data.access_token);
+                    this.setRefreshToken(response.data.refresh_token ?? null);
+                    return response.data.access_token;
+                })
+                .catch(() => this.adoptTokensFromOtherTab(sentToken))
+                .finally(() => {
+                    this.refreshing = null;
+                });
+        }
+        return this.refreshing;
+    }
+
+    // Otra pestaña pudo rotar el mismo refresh token a la vez (el servidor
+    // responde 401 sin cerrar la sesión): usar los tokens que guardó
+    private async adoptTokensFromOtherTab(sentToken: string): Promise<string | null> {
+        if (typeof window === 'undefined') return null;
+
+        for (const delay of [0, 1000]) {
+            // Su respuesta puede llegar un poco después de la nuestra
+            await new Promise((resolve) => setTimeout(resolve, delay));
+            const storedRefresh = localStorage.getItem('refresh_token');
+            const storedAccess = localStorage.getItem('auth_token');
+            if (storedRefresh && storedAccess && storedRefresh !== sentToken) {
+                this.token = storedAccess;
+                this.refreshToken = storedRefresh;
+                return storedAccess;
+            }
+        }
+        return null;
+    }
+
     getToken(): string | null {
         return this.token;
     }
@@ -109,10 +177,17 @@ class ApiClient {
         });
 
         this.setToken(response.data.access_token);
+        this.setRefreshToken(response.data.refresh_token ?? null);
         return response.data;
     }
 
     async logout() {
+        // Revocar la sesión en el servidor (si falla, igualmente se limpia localmente)
+        if (this.refreshToken) {
+            await this.client
+                .post('/api/v1/auth/logout', { refresh_token: this.refreshToken })
+                .catch(() => undefined);
+        }
         this.clearToken();
     }
 
@@ -131,6 +206,27 @@ class ApiClient {
         return this.get('/api/v1/projects/', params);
     }
 
+    // Paginación por cursor (scroll infinito): coste constante en cualquier página
+    async getProjectsPage<T = any>(params?: {
+        limit?: number;
+        featured_only?: boolean;
+        search?: string;
+        cursor?: string | null;
+    }): Promise<{ items: T[]; nextCursor: string | null }> {
+        const { cursor, ...rest } = params ?? {};
+        const response: AxiosResponse<T[]> = await this.client.get('/api/v1/projects/', {
+            params: cursor ? { ...rest, cursor } : rest,
+        });
+        return {
+            items: response.data,
+            nextCursor: response.headers['x-next-cursor'] ?? null,
+        };
+    }
+
+    async searchProjects(q: string, limit = 10): Promise<ProjectSearchResponse> {
+        return this.get('/api/v1/projects/search', { q, limit });
+    }
+
     async getFeaturedProjects(limit = 6) {
         return this.get('/api/v1/projects/featured', { limit });
     }
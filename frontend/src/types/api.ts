@@ -31,6 +31,7 @@ export interface UserLogin {
 
 export interface Token {
     access_token: string;
+    refresh_token?: string;
     token_type: string;
     expires_in: number;
 }
@@ -103,6 +104,19 @@ export interface ProjectStats {
     most_viewed?: Project;
 }
 
+export interface ProjectSearchHit {
+    project: Project;
+    rank: number;
+    match: 'fulltext' | 'fuzzy';
+    title_highlight?: string | null;  // HTML escapado con <mark>
+    snippet?: string | null;
+}
+
+export interface ProjectSearchResponse {
+    query: string;
+    results: ProjectSearchHit[];
+}
+
 // CV types
 export interface CV extends BaseEntity {
     filename: string;